@@ -8,7 +8,7 @@ from typing import Optional
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from fastapi import Request, HTTPException, status
-from .db import get_db_connection
+from .db import get_db_connection, releasing_db_connection
 
 
 # Session 配置
@@ -210,8 +210,10 @@ def _get_user_by_id(user_id: int) -> Optional[User]:
 
 # ============================================================================
 # FastAPI Dependencies
+# 同步依赖在线程池中单独执行（与 endpoint 不一定是同一线程），执行完即归还数据库连接
 # ============================================================================
 
+@releasing_db_connection
 def get_current_user(request: Request) -> Optional[User]:
     """
     获取当前用户（FastAPI Dependency）
@@ -238,6 +240,7 @@ def get_current_user(request: Request) -> Optional[User]:
     return _get_user_by_id(user_id)
 
 
+@releasing_db_connection
 def require_auth(request: Request) -> User:
     """
     强制要求登录（FastAPI Dependency）
@@ -263,6 +266,7 @@ def require_auth(request: Request) -> User:
     return user
 
 
+@releasing_db_connection
 def require_admin(request: Request) -> User:
     """
     强制要求管理员权限（FastAPI Dependency）
@@ -69,6 +69,12 @@ class Config:
         DB_PATH = os.path.join(BASE_DIR, "data", "fund.db")
         DB_URL = f"sqlite:///{DB_PATH}"
 
+    # Connection pool (shared by SQLite and PostgreSQL)
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "64"))
+    DB_POOL_IDLE_TIMEOUT = int(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))  # 空闲连接回收（秒）
+    DB_POOL_HEALTH_CHECK_INTERVAL = 30  # 同一连接两次 SELECT 1 探活的最小间隔（秒）
+    DB_POOL_TIMEOUT = 30                # 连接池用尽时的最长等待（秒）
+
     # Data Sources
     DEFAULT_DATA_SOURCE = "eastmoney"
 
@@ -80,6 +86,104 @@ class Config:
     # Update Intervals
     FUND_LIST_UPDATE_INTERVAL = 86400  # 24 hours
     STOCK_SPOT_CACHE_DURATION = 60     # 1 minute (for holdings calculation)
+    STOCK_QUOTE_CACHE_MAX_SIZE = int(os.getenv("STOCK_QUOTE_CACHE_MAX_SIZE", "5000"))
+    NAV_FULL_RESYNC_DAYS = 7           # full NAV history refetch interval (catches corrections)
+
+    # NAV publication tracker (fund_nav_publication table)
+    NAV_PUBLISH_HOUR = 16                  # 当日净值最早可能公布的时刻（学习到发布时间前的默认值）
+    NAV_CHECK_BACKOFF_BASE = 600           # 未公布时首次重查间隔（秒），之后指数退避
+    NAV_CHECK_BACKOFF_MAX = 2 * 3600
+    NAV_PUBLISH_DELAY_ALPHA = 0.3          # 发布时间 EWMA 平滑系数
+    NAV_PUBLISH_DELAY_MAX_HOURS = 72       # 学习到的发布延迟上限（QDII 等 T+2 基金）
+
+    # Valuation Cache (shared across users, keyed by fund code)
+    VALUATION_CACHE_TTL_TRADING = int(os.getenv("VALUATION_CACHE_TTL_TRADING", "30"))    # 盘中
+    VALUATION_CACHE_TTL_CLOSED = int(os.getenv("VALUATION_CACHE_TTL_CLOSED", "600"))     # 非交易时段
+    VALUATION_CACHE_MAX_SIZE = int(os.getenv("VALUATION_CACHE_MAX_SIZE", "5000"))
+    VALUATION_STALE_TTL = 3600             # 过期估值在请求预算耗尽时仍可返回的时长（"stale": true）
+
+    # Request deadline budgets (services/deadline.py)
+    DASHBOARD_DEADLINE = float(os.getenv("DASHBOARD_DEADLINE", "2.0"))  # 持仓 / 自选行情请求整体时限（秒）
+
+    # Fund detail component caches (stale-while-revalidate)
+    DETAIL_PINGZHONG_TTL = 3600            # 基本信息/历史净值
+    DETAIL_HOLDINGS_TTL = 6 * 3600         # 持仓构成（读数据库，同步任务写入后主动失效）
+    DETAIL_INDICATORS_TTL = 3600           # 技术指标
+    DETAIL_HOLDINGS_VIEW_STALE_TTL = 600   # 持仓股票涨跌幅过期后仍可先返回的时长
+    DETAIL_STALE_TTL = 86400               # 其余组件过期后仍可先返回的时长
+    DETAIL_CACHE_MAX_SIZE = int(os.getenv("DETAIL_CACHE_MAX_SIZE", "2000"))
+    DETAIL_DEADLINE = float(os.getenv("DETAIL_DEADLINE", "3.0"))  # 详情请求整体时限（秒），超时分支返回默认值
+    DETAIL_FETCH_WORKERS = 16
+
+    # PingZhongData raw responses on disk (services/pingzhong.py), revalidated with ETag / Last-Modified
+    PINGZHONG_DISK_CACHE_DIR = os.getenv("PINGZHONG_DISK_CACHE_DIR", os.path.join(BASE_DIR, "data", "pingzhong"))  # 留空则不启用
+    PINGZHONG_DISK_CACHE_MAX_AGE_DAYS = 7  # 超过该天数未使用的响应文件由夜间任务清理
+
+    # Technical indicators (fund_indicators table)
+    INDICATORS_BATCH_SIZE = 500            # 每批载入的基金数（一次向量化计算）
+    INDICATORS_RETENTION_DAYS = 30
+    INDICATORS_FULL_RECOMPUTE_EVERY = 20   # 增量更新 N 次后全量重算一次（防止浮点漂移）
+    INDICATORS_DRIFT_TOLERANCE = 1e-6
+
+    # Backtest engine (services/backtest.py)
+    BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", str(min(4, os.cpu_count() or 1))))  # 进程池大小，1 表示不用进程池
+    BACKTEST_PROCESS_MIN_FUNDS = 200       # 少于该基金数时在当前进程内计算（进程间传输开销大于计算本身）
+    BACKTEST_MAX_CODES = 200
+
+    # Quarterly holdings sync (fund_holdings table)
+    HOLDINGS_DISCLOSURE_WINDOW_DAYS = 30   # 季末后披露窗口：窗口内按 HOLDINGS_RECHECK_HOURS 检查新报告期
+    HOLDINGS_RECHECK_HOURS = 12
+    HOLDINGS_IDLE_RECHECK_DAYS = 7         # 窗口外仍缺新报告期时（债基/延迟披露）的检查间隔
+
+    # Per-fund valuation source routing (fund_source_capability table)
+    SOURCE_ROUTING_SKIP_BELOW = 0.25       # 覆盖概率低于该值时跳过该数据源
+    SOURCE_ROUTING_MAX_EVIDENCE = 10       # 证据总量上限（新观测始终有足够权重）
+    SOURCE_ROUTING_HALF_LIFE_HOURS = 72    # 证据半衰期
+    SOURCE_ROUTING_PROBE_INTERVAL = 1800   # 被跳过的数据源探测间隔（秒）
+    SOURCE_ROUTING_FLUSH_INTERVAL = 600    # 仅有命中时的落盘间隔（秒）
+
+    # Batch Valuation Fetch
+    VALUATION_FETCH_WORKERS = int(os.getenv("VALUATION_FETCH_WORKERS", "16"))  # Eastmoney 并发上限
+    SINA_BATCH_SIZE = 50               # symbols per Sina request
+
+    # Async source layer: max in-flight requests per upstream host
+    ASYNC_HOST_CONCURRENCY = {
+        "fundgz.1234567.com.cn": 32,
+        "hq.sinajs.cn": 8,
+        "fund.eastmoney.com": 8,
+    }
+    ASYNC_DEFAULT_HOST_CONCURRENCY = 16
+
+    # Live valuation stream (SSE)
+    VALUATION_STREAM_INTERVAL = int(os.getenv("VALUATION_STREAM_INTERVAL", "15"))  # 推送 tick（秒）
+    VALUATION_STREAM_KEEPALIVE = 20
+    VALUATION_STREAM_MAX_CODES = 500
+    QUOTES_MAX_CODES = 500             # /funds/quotes 单次查询上限
+
+    # Per-host token buckets: (requests per second, burst capacity)
+    HOST_RATE_LIMITS = {
+        "fundgz.1234567.com.cn": (20.0, 40),
+        "hq.sinajs.cn": (5.0, 10),
+        "fund.eastmoney.com": (3.0, 6),
+    }
+    DEFAULT_HOST_RATE_LIMIT = (5.0, 10)
+    RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "30"))  # 无请求预算时等待令牌的上限（秒）
+    AKSHARE_RATE_LIMIT_HOST = "fund.eastmoney.com"  # akshare 基金接口均指向东方财富
+
+    # Per-host circuit breakers (services/circuit_breaker.py)
+    CIRCUIT_WINDOW_SECONDS = 60            # 错误率 / p95 统计窗口
+    CIRCUIT_WINDOW_MAX_SAMPLES = 200
+    CIRCUIT_MIN_REQUESTS = 10              # 窗口内样本数达到该值才可能跳闸
+    CIRCUIT_ERROR_RATE = 0.5
+    CIRCUIT_SLOW_SECONDS = 4.0             # p95 达到该值视为降级（请求超时为 5 秒）
+    CIRCUIT_OPEN_SECONDS = 30              # 跳闸后多久放行试探请求
+    CIRCUIT_HEDGE_DEFAULT_DELAY = 1.0      # 尚无延迟样本时的对冲等待（秒）
+    CIRCUIT_HEDGE_MIN_DELAY = 0.2
+    CIRCUIT_REORDER_MARGIN = 0.25          # 健康度相差超过该值才调整数据源顺序
+
+    # Background jobs
+    SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+    NAV_UPDATE_WORKERS = int(os.getenv("NAV_UPDATE_WORKERS", "4"))
 
     # AI Configuration - 动态读取
     OPENAI_API_KEY = _get_setting("OPENAI_API_KEY", "")
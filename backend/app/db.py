@@ -1,7 +1,10 @@
 import sqlite3
+import functools
 import logging
 import os
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from contextlib import contextmanager
 from .config import Config
@@ -19,10 +22,6 @@ logger = logging.getLogger(__name__)
 # Current database schema version (after rebuild)
 CURRENT_SCHEMA_VERSION = 1
 
-# Thread-local storage for connection pooling
-_thread_local = threading.local()
-
-
 def get_db_type() -> str:
     """
     获取当前数据库类型
@@ -33,27 +32,8 @@ def get_db_type() -> str:
     return Config.DB_TYPE
 
 
-def get_db_connection():
-    """
-    Get database connection based on DB_TYPE configuration.
-
-    Supports both SQLite and PostgreSQL with thread-local connection pooling.
-
-    Returns:
-        Connection object (sqlite3.Connection or psycopg2.connection)
-    """
-    # Reuse connection within same thread to reduce lock contention
-    if hasattr(_thread_local, 'conn') and _thread_local.conn:
-        try:
-            # Test if connection is still alive
-            cursor = _thread_local.conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.close()
-            return _thread_local.conn
-        except:
-            # Connection is dead, create new one
-            _thread_local.conn = None
-
+def _connect():
+    """Open a new raw connection based on DB_TYPE configuration."""
     db_type = get_db_type()
 
     if db_type == "postgresql":
@@ -91,10 +71,289 @@ def get_db_connection():
         conn.execute("PRAGMA temp_store=MEMORY")   # Use memory for temp tables
         conn.execute("PRAGMA busy_timeout=30000")  # 30s timeout for lock contention
 
-    _thread_local.conn = conn
     return conn
 
 
+class _PooledConnection:
+    __slots__ = ("conn", "last_checked", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        now = time.monotonic()
+        self.last_checked = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Bounded connection pool with per-thread leases.
+
+    The codebase calls get_db_connection() many times per unit of work and relies on
+    getting the same connection (and transaction) back within a thread, so a
+    connection is leased to the calling thread until release() or until the thread
+    exits (dead threads' leases are reclaimed on checkout and by reap()).
+
+    - max_size: 同时打开的连接上限，用尽时等待（超时抛 RuntimeError）
+    - idle_timeout: 空闲超过该时长的连接被关闭
+    - health_check_interval: 取出/复用连接时最多每隔该时长做一次 SELECT 1
+    """
+
+    def __init__(self, factory, max_size: int, idle_timeout: float,
+                 health_check_interval: float, checkout_timeout: float):
+        self._factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+
+        self._cond = threading.Condition()
+        self._idle: list = []            # [_PooledConnection]，末尾为最近归还
+        self._leases: dict = {}          # {thread: _PooledConnection}
+        self._local = threading.local()
+        self._size = 0
+        self._waiting = 0
+        self.created = 0
+        self.closed = 0
+        self.reclaimed = 0
+        self.health_checks = 0
+        self.health_failures = 0
+        self.timeouts = 0
+
+    # ------------------------------------------------------------------ public
+
+    def get(self):
+        """Return the calling thread's connection, leasing one if needed."""
+        pooled = getattr(self._local, "pooled", None)
+        if pooled is not None:
+            if self._healthy(pooled):
+                pooled.last_used = time.monotonic()
+                return pooled.conn
+            self._discard_lease(pooled)
+
+        pooled = self._checkout()
+        self._local.pooled = pooled
+        return pooled.conn
+
+    def release(self) -> None:
+        """Return the calling thread's connection to the pool (rolls back open transactions)."""
+        pooled = getattr(self._local, "pooled", None)
+        if pooled is None:
+            return
+        self._local.pooled = None
+        with self._cond:
+            self._leases.pop(threading.current_thread(), None)
+        self._return(pooled)
+
+    def reap(self) -> None:
+        """Reclaim leases of dead threads and close connections idle past idle_timeout."""
+        with self._cond:
+            self._reclaim_dead_leases()
+            self._close_expired_idle()
+
+    def close_all(self) -> None:
+        with self._cond:
+            for pooled in self._idle:
+                self._close(pooled)
+            self._idle.clear()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "checked_out": len(self._leases),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "created": self.created,
+                "closed": self.closed,
+                "reclaimed": self.reclaimed,
+                "health_checks": self.health_checks,
+                "health_failures": self.health_failures,
+                "timeouts": self.timeouts,
+            }
+
+    # ---------------------------------------------------------------- internal
+
+    def _checkout(self) -> _PooledConnection:
+        deadline = time.monotonic() + self.checkout_timeout
+        thread = threading.current_thread()
+        with self._cond:
+            while True:
+                self._close_expired_idle()
+                while self._idle:
+                    pooled = self._idle.pop()
+                    if self._healthy(pooled):
+                        self._leases[thread] = pooled
+                        pooled.last_used = time.monotonic()
+                        return pooled
+                    self._close(pooled)
+
+                if self._size >= self.max_size:
+                    self._reclaim_dead_leases()
+                    if self._idle:
+                        continue
+
+                if self._size < self.max_size:
+                    # 预占名额后在锁外建连，避免阻塞其他线程
+                    self._size += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise RuntimeError(f"Database connection pool exhausted (max_size={self.max_size})")
+                self._waiting += 1
+                try:
+                    self._cond.wait(timeout=remaining)
+                finally:
+                    self._waiting -= 1
+
+        try:
+            pooled = _PooledConnection(self._factory())
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+            self._leases[thread] = pooled
+        return pooled
+
+    def _healthy(self, pooled: _PooledConnection) -> bool:
+        now = time.monotonic()
+        if now - pooled.last_checked < self.health_check_interval:
+            return True
+        self.health_checks += 1
+        try:
+            cursor = pooled.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            pooled.last_checked = now
+            return True
+        except Exception:
+            self.health_failures += 1
+            return False
+
+    def _discard_lease(self, pooled: _PooledConnection) -> None:
+        self._local.pooled = None
+        with self._cond:
+            self._leases.pop(threading.current_thread(), None)
+            self._close(pooled)
+
+    def _return(self, pooled: _PooledConnection) -> None:
+        try:
+            pooled.conn.rollback()
+        except Exception:
+            with self._cond:
+                self._close(pooled)
+            return
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    def _reclaim_dead_leases(self) -> None:
+        dead = [t for t in self._leases if not t.is_alive()]
+        for thread in dead:
+            pooled = self._leases.pop(thread)
+            self.reclaimed += 1
+            try:
+                pooled.conn.rollback()
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+            except Exception:
+                self._close(pooled)
+        if dead:
+            self._cond.notify_all()
+
+    def _close_expired_idle(self) -> None:
+        if not self._idle:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        keep = []
+        for pooled in self._idle:
+            if pooled.last_used < cutoff:
+                self._close(pooled)
+            else:
+                keep.append(pooled)
+        self._idle = keep
+
+    def _close(self, pooled: _PooledConnection) -> None:
+        """Close a connection and free its slot. Caller holds self._cond."""
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        self._size -= 1
+        self.closed += 1
+        self._cond.notify()
+
+
+_pool = ConnectionPool(
+    _connect,
+    max_size=Config.DB_POOL_MAX_SIZE,
+    idle_timeout=Config.DB_POOL_IDLE_TIMEOUT,
+    health_check_interval=Config.DB_POOL_HEALTH_CHECK_INTERVAL,
+    checkout_timeout=Config.DB_POOL_TIMEOUT,
+)
+
+
+def get_db_connection():
+    """
+    Get database connection based on DB_TYPE configuration.
+
+    Supports both SQLite and PostgreSQL. The connection comes from a bounded pool and
+    stays leased to the calling thread (same connection on every call) until
+    release_db_connection() or thread exit.
+
+    Returns:
+        Connection object (sqlite3.Connection or psycopg2.connection)
+    """
+    return _pool.get()
+
+
+def release_db_connection() -> None:
+    """
+    Return the calling thread's connection to the pool.
+    Call at the end of a unit of work on long-lived worker threads.
+    """
+    _pool.release()
+
+
+def releasing_db_connection(fn):
+    """
+    Wrap a unit of work so the calling thread's connection goes back to the pool when it ends.
+
+    For work that runs on long-lived threads (FastAPI's threadpool, executors):
+    their leases are otherwise only reclaimed when the thread exits.
+    Wrap whole units of work only: release rolls back an uncommitted transaction.
+    """
+    @functools.wraps(fn)
+    def _wrapped(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            release_db_connection()
+    return _wrapped
+
+
+class PooledConnectionExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor whose tasks return the worker's connection to the pool when they finish."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(releasing_db_connection(fn), *args, **kwargs)
+
+
+def reap_db_connections() -> None:
+    """Reclaim dead threads' leases and close idle connections (periodic job)."""
+    _pool.reap()
+
+
+def get_db_pool_stats() -> dict:
+    return _pool.stats()
+
+
 @contextmanager
 def db_connection():
     """
@@ -118,6 +377,28 @@ def db_connection():
         raise
 
 
+# 每条语句 IN (...) 中的参数个数（旧版 SQLite 的 SQLITE_MAX_VARIABLE_NUMBER 默认只有 999）
+IN_CHUNK_SIZE = 500
+
+
+def select_in_chunks(cursor, sql: str, keys, before=(), after=(), chunk_size: int = IN_CHUNK_SIZE):
+    """
+    Run `sql` once per chunk of `keys` and yield all result rows.
+
+    `sql` contains `{placeholders}` where the IN list goes; `before` / `after` are
+    the other parameters, placed before / after the keys in each execution.
+
+    Usage:
+        for row in select_in_chunks(cursor, "SELECT code, name FROM funds WHERE code IN ({placeholders})", codes):
+            ...
+    """
+    keys = list(keys)
+    for i in range(0, len(keys), chunk_size):
+        chunk = keys[i:i + chunk_size]
+        cursor.execute(sql.format(placeholders=','.join('?' * len(chunk))), [*before, *chunk, *after])
+        yield from cursor.fetchall()
+
+
 def check_database_version() -> int:
     """
     Check the current database schema version.
@@ -183,6 +464,19 @@ def drop_all_tables() -> None:
     logger.info(f"Dropped {len(tables)} tables")
 
 
+def _apply_migration(cursor, name: str, migrate) -> None:
+    """
+    Run a one-off migration unless schema_migrations already records it.
+    The record is written in the same transaction as the migration itself.
+    """
+    cursor.execute("SELECT 1 FROM schema_migrations WHERE name = ?", (name,))
+    if cursor.fetchone():
+        return
+    migrate(cursor)
+    cursor.execute("INSERT INTO schema_migrations (name) VALUES (?)", (name,))
+    logger.info(f"Applied migration: {name}")
+
+
 def init_db():
     """Initialize the database schema for multi-user mode. Drops all tables if version mismatch."""
     conn = get_db_connection()
@@ -216,6 +510,16 @@ def init_db():
         current_version = 0
         logger.info("All tables dropped. Rebuilding database...")
 
+    # One-off data migrations, recorded by name so each runs exactly once.
+    # (Not tracked via CURRENT_SCHEMA_VERSION: a version mismatch drops every
+    # table, which would discard the very data these migrations carry over.)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
     # ============================================================================
     # Multi-user tables
     # ============================================================================
@@ -311,16 +615,118 @@ def init_db():
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_fund_history_code ON fund_history(code)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_fund_history_date ON fund_history(date)")
 
-    # Intraday snapshots table - store intraday valuation data (shared across users)
+    # NAV sync state table - per-fund incremental sync bookkeeping (shared across users)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_nav_sync_state (
+            code TEXT PRIMARY KEY,
+            last_date TEXT NOT NULL,
+            last_nav REAL NOT NULL,
+            last_full_sync_at TIMESTAMP,
+            last_sync_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Fund holdings table - disclosed stock holdings per report period (shared across users)
+    # See services/holdings.py; report_period is YYYYQn
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_holdings (
+            code TEXT NOT NULL,
+            report_period TEXT NOT NULL,
+            stock_code TEXT NOT NULL,
+            stock_name TEXT,
+            percent REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (code, report_period, stock_code)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_holdings_sync (
+            code TEXT PRIMARY KEY,
+            report_period TEXT,
+            checked_at TIMESTAMP
+        )
+    """)
+
+    # Fund indicators table - batch-computed technical indicators per NAV date (shared across users)
+    # See services/indicators.py; values are ratios (not percent)
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS fund_intraday_snapshots (
+        CREATE TABLE IF NOT EXISTS fund_indicators (
+            code TEXT NOT NULL,
+            as_of_date TEXT NOT NULL,
+            sharpe REAL,
+            volatility REAL,
+            max_drawdown REAL,
+            annual_return REAL,
+            sample_size INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (code, as_of_date)
+        )
+    """)
+
+    # Incremental indicator state - running window sums per fund (see services/indicators.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_indicator_state (
+            code TEXT PRIMARY KEY,
+            first_date TEXT NOT NULL,
+            last_date TEXT NOT NULL,
+            first_nav REAL NOT NULL,
+            last_nav REAL NOT NULL,
+            sample_size INTEGER NOT NULL,
+            ret_count INTEGER NOT NULL,
+            ret_mean REAL NOT NULL,
+            ret_m2 REAL NOT NULL,
+            peak REAL NOT NULL,
+            max_drawdown REAL NOT NULL,
+            drawdown_peak REAL NOT NULL,
+            updates_since_full INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # NAV publication tracker - per-fund "checked, not yet published" state and learned
+    # publication delay (shared across users). See services/nav_publication.py
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_nav_publication (
+            code TEXT PRIMARY KEY,
+            pending_date TEXT,
+            misses INTEGER NOT NULL DEFAULT 0,
+            checked_at TIMESTAMP,
+            next_check_at TIMESTAMP,
+            delay_minutes REAL,
+            samples INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    # Valuation source capability - decayed per-fund coverage evidence for each
+    # valuation source (shared across users). See services/source_routing.py
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_source_capability (
+            code TEXT NOT NULL,
+            source TEXT NOT NULL,
+            successes REAL NOT NULL DEFAULT 0,
+            failures REAL NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP,
+            checked_at TIMESTAMP,
+            PRIMARY KEY (code, source)
+        )
+    """)
+
+    # Intraday series table - one packed float32 minute array per fund/day (shared across users)
+    # See services/intraday_store.py for the encoding
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_intraday_series (
             fund_code TEXT NOT NULL,
             date TEXT NOT NULL,
-            time TEXT NOT NULL,
-            estimate REAL NOT NULL,
-            PRIMARY KEY (fund_code, date, time)
+            start_minute INTEGER NOT NULL,
+            estimates BLOB NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (fund_code, date)
         )
     """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fund_intraday_series_date ON fund_intraday_series(date)")
+
+    # Migrate legacy row-per-snapshot table (fund_intraday_snapshots) into series
+    from .services.intraday_store import migrate_row_snapshots
+    _apply_migration(cursor, "intraday_snapshots_to_series", migrate_row_snapshots)
 
     # ============================================================================
     # User-specific tables
@@ -434,5 +840,4 @@ def init_db():
         logger.info(f"Database initialized with schema version {CURRENT_SCHEMA_VERSION}")
 
     conn.commit()
-    conn.close()
     logger.info("Database initialized.")
@@ -11,7 +11,7 @@ import json
 import logging
 from logging.handlers import RotatingFileHandler
 
-from .routers import funds, ai, account, settings, data, auth, system
+from .routers import funds, ai, account, settings, data, auth, system, stream
 from .db import init_db
 from .services.scheduler import start_scheduler
 
@@ -110,7 +110,14 @@ async def lifespan(app: FastAPI):
     start_scheduler()
     yield
     # Shutdown
-    pass
+    from .services.scheduler import stop_scheduler
+    stop_scheduler()
+    from .services.valuation_stream import hub
+    await hub.close()
+    from .services.fund_async import close_async_client
+    await close_async_client()
+    from .services.backtest import shutdown_backtest_pool
+    shutdown_backtest_pool()
 
 app = FastAPI(title="Fund Intraday Valuation API", lifespan=lifespan)
 
@@ -134,6 +141,7 @@ app.include_router(ai.router, prefix="/api")
 app.include_router(account.router, prefix="/api")
 app.include_router(settings.router, prefix="/api")
 app.include_router(data.router, prefix="/api")
+app.include_router(stream.router, prefix="/api")
 
 # Project info endpoint
 @app.get("/api/info")
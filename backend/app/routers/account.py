@@ -1,17 +1,22 @@
 from fastapi import APIRouter, HTTPException, Body, Query, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
 import logging
 
-from ..services.account import get_all_positions, upsert_position, remove_position
+from ..config import Config
+from ..services import deadline
+from ..services.account import get_all_positions_async, upsert_position, remove_position
+from ..services.fund import get_combined_valuations
+from ..services.portfolio import value_positions
 from ..services.trade import add_position_trade, reduce_position_trade, list_transactions
-from ..db import get_db_connection
+from ..db import get_db_connection, releasing_db_connection
 from ..auth import User, require_auth, get_current_user
-from ..utils import verify_account_ownership
+from ..utils import PooledConnectionRoute, verify_account_ownership
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=PooledConnectionRoute)
 
 class AccountModel(BaseModel):
     name: str
@@ -139,25 +144,6 @@ def get_aggregate_positions(current_user: User = Depends(require_auth)):
         account_ids = [row["id"] for row in cursor.fetchall()]
         
 
-        if not account_ids:
-            return {
-                "summary": {
-                    "total_market_value": 0.0,
-                    "total_cost": 0.0,
-                    "total_day_income": 0.0,
-                    "total_income": 0.0,
-                    "total_return_rate": 0.0
-                },
-                "positions": []
-            }
-
-        # 获取所有账户的持仓并聚合
-        from ..services.account import get_combined_valuation, get_fund_type
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
         # 获取所有持仓
         # Defensive: Limit batch size to prevent SQL statement overflow
         if len(account_ids) > 100:
@@ -166,182 +152,20 @@ def get_aggregate_positions(current_user: User = Depends(require_auth)):
                 detail=f"Too many accounts ({len(account_ids)}), maximum 100 allowed"
             )
 
-        placeholders = ",".join("?" * len(account_ids))
-        cursor.execute(
-            f"SELECT * FROM positions WHERE account_id IN ({placeholders}) AND shares > 0",
-            account_ids
-        )
-        rows = cursor.fetchall()
-        
-
-        # 按基金代码聚合
-        code_positions = {}
-        for row in rows:
-            code = row["code"]
-            if code not in code_positions:
-                code_positions[code] = {
-                    "cost": 0.0,
-                    "shares": 0.0,
-                    "total_cost_basis": 0.0
-                }
-            # 累加份额和成本基础
-            shares = float(row["shares"])
-            cost = float(row["cost"])
-            code_positions[code]["shares"] += shares
-            code_positions[code]["total_cost_basis"] += shares * cost
-
-        # 计算加权平均成本
-        position_map = {}
-        for code, data in code_positions.items():
-            if data["shares"] > 0:
-                weighted_avg_cost = data["total_cost_basis"] / data["shares"]
-                position_map[code] = {
-                    "code": code,
-                    "cost": weighted_avg_cost,
-                    "shares": data["shares"]
-                }
-
-        # 获取实时估值（复用 get_all_positions 的逻辑）
-        positions = []
-        total_market_value = 0.0
-        total_cost = 0.0
-        total_day_income = 0.0
-
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_code = {
-                executor.submit(get_combined_valuation, code): code
-                for code in position_map.keys()
-            }
-
-            for future in as_completed(future_to_code):
-                code = future_to_code[future]
-                row = position_map[code]
-
-                try:
-                    data = future.result() or {}
-                    name = data.get("name")
-                    fund_type = None
-
-                    if not name:
-                        conn_temp = get_db_connection()
-                        try:
-                            cursor_temp = conn_temp.cursor()
-                            cursor_temp.execute("SELECT name, type FROM funds WHERE code = ?", (code,))
-                            db_row = cursor_temp.fetchone()
-                            if db_row:
-                                name = db_row["name"]
-                                fund_type = db_row["type"]
-                            else:
-                                name = code
-                        finally:
-                            conn_temp.close()
-
-                    if not fund_type:
-                        fund_type = get_fund_type(code, name)
-
-                    from datetime import datetime
-                    today_str = datetime.now().strftime("%Y-%m-%d")
-                    conn_temp = get_db_connection()
-                    try:
-                        cursor_temp = conn_temp.cursor()
-                        cursor_temp.execute(
-                            "SELECT date FROM fund_history WHERE code = ? ORDER BY date DESC LIMIT 1",
-                            (code,)
-                        )
-                        latest_nav_row = cursor_temp.fetchone()
-                        nav_updated_today = latest_nav_row and latest_nav_row["date"] == today_str
-                    finally:
-                        conn_temp.close()
-
-                    nav = float(data.get("nav", 0.0))
-                    estimate = float(data.get("estimate", 0.0))
-                    current_price = estimate if estimate > 0 else nav
-
-                    cost = float(row["cost"])
-                    shares = float(row["shares"])
-
-                    nav_market_value = nav * shares
-                    cost_basis = cost * shares
-
-                    est_rate = data.get("est_rate", data.get("estRate", 0.0))
-
-                    is_est_valid = False
-                    if estimate > 0 and nav > 0:
-                        if abs(est_rate) < 10.0 or "ETF" in name or "联接" in name:
-                            is_est_valid = True
-
-                    accumulated_income = nav_market_value - cost_basis
-                    accumulated_return_rate = (accumulated_income / cost_basis * 100) if cost_basis > 0 else 0.0
-
-                    if is_est_valid:
-                        day_income = (estimate - nav) * shares
-                        est_market_value = estimate * shares
-                    else:
-                        day_income = 0.0
-                        est_market_value = nav_market_value
-
-                    total_income = accumulated_income + day_income
-                    total_return_rate = (total_income / cost_basis * 100) if cost_basis > 0 else 0.0
-
-                    positions.append({
-                        "code": code,
-                        "name": name,
-                        "type": fund_type,
-                        "cost": cost,
-                        "shares": shares,
-                        "nav": nav,
-                        "nav_date": data.get("navDate", "--"),
-                        "nav_updated_today": nav_updated_today,
-                        "estimate": estimate,
-                        "est_rate": est_rate,
-                        "is_est_valid": is_est_valid,
-                        "cost_basis": round(cost_basis, 2),
-                        "nav_market_value": round(nav_market_value, 2),
-                        "est_market_value": round(est_market_value, 2),
-                        "accumulated_income": round(accumulated_income, 2),
-                        "accumulated_return_rate": round(accumulated_return_rate, 2),
-                        "day_income": round(day_income, 2),
-                        "total_income": round(total_income, 2),
-                        "total_return_rate": round(total_return_rate, 2),
-                        "update_time": data.get("time", "--")
-                    })
-
-                    total_market_value += est_market_value
-                    total_day_income += day_income
-                    total_cost += cost_basis
-
-                except Exception as e:
-                    logger.error(f"Error processing position {code}: {e}")
-                    positions.append({
-                        "code": code,
-                        "name": "Error",
-                        "cost": float(row["cost"]),
-                        "shares": float(row["shares"]),
-                        "nav": 0.0,
-                        "estimate": 0.0,
-                        "est_market_value": 0.0,
-                        "day_income": 0.0,
-                        "total_income": 0.0,
-                        "total_return_rate": 0.0,
-                        "accumulated_income": 0.0,
-                        "est_rate": 0.0,
-                        "is_est_valid": False,
-                        "update_time": "--"
-                    })
-
-        total_income = total_market_value - total_cost
-        total_return_rate = (total_income / total_cost * 100) if total_cost > 0 else 0.0
+        rows = []
+        if account_ids:
+            placeholders = ",".join("?" * len(account_ids))
+            cursor.execute(
+                f"SELECT account_id, code, shares, cost FROM positions WHERE account_id IN ({placeholders}) AND shares > 0",
+                account_ids
+            )
+            rows = cursor.fetchall()
 
-        return {
-            "summary": {
-                "total_market_value": round(total_market_value, 2),
-                "total_cost": round(total_cost, 2),
-                "total_day_income": round(total_day_income, 2),
-                "total_income": round(total_income, 2),
-                "total_return_rate": round(total_return_rate, 2)
-            },
-            "positions": sorted(positions, key=lambda x: x["est_market_value"], reverse=True)
-        }
+        # 按基金代码聚合（份额相加、成本加权平均）并估值
+        codes = list(dict.fromkeys(row["code"] for row in rows))
+        with deadline.deadline_scope(Config.DASHBOARD_DEADLINE):
+            valuations = get_combined_valuations(codes) if codes else {}
+        return value_positions(rows, valuations, aggregate=True)
     except HTTPException:
         raise
     except Exception as e:
@@ -349,16 +173,17 @@ def get_aggregate_positions(current_user: User = Depends(require_auth)):
 
 
 @router.get("/account/positions")
-def get_positions(
+async def get_positions(
     account_id: int = Query(..., description="账户 ID"),
     current_user: User = Depends(require_auth)
 ):
     """获取指定账户的持仓"""
     # 验证所有权
-    verify_account_ownership(account_id, current_user)
+    await run_in_threadpool(releasing_db_connection(verify_account_ownership), account_id, current_user)
 
     try:
-        return get_all_positions(account_id, current_user.id)
+        with deadline.deadline_scope(Config.DASHBOARD_DEADLINE):
+            return await get_all_positions_async(account_id, current_user.id)
     except HTTPException:
         raise
     except Exception as e:
@@ -377,9 +202,8 @@ def update_positions_nav(
     # 验证所有权
     verify_account_ownership(account_id, current_user)
 
-    import time
     from datetime import datetime
-    from ..services.fund import get_fund_history
+    from ..services.fund import get_fund_histories
 
     try:
         # Get all holdings for this account
@@ -400,21 +224,19 @@ def update_positions_nav(
         pending = 0  # 当日净值未公布
         failed = []  # 拉取失败
 
-        for code in codes:
-            try:
-                history = get_fund_history(code, limit=5)
-                if history:
-                    # Check if latest NAV is today's
-                    latest_date = history[-1]["date"]
-                    if latest_date == today:
-                        updated += 1
-                    else:
-                        pending += 1
+        # Parallel fetch, paced by per-host rate limits
+        for code, history in get_fund_histories(codes, limit=5).items():
+            if isinstance(history, Exception):
+                failed.append({"code": code, "error": str(history)})
+            elif history:
+                # Check if latest NAV is today's
+                latest_date = history[-1]["date"]
+                if latest_date == today:
+                    updated += 1
                 else:
-                    failed.append({"code": code, "error": "无历史数据"})
-                time.sleep(0.3)  # Avoid API rate limiting
-            except Exception as e:
-                failed.append({"code": code, "error": str(e)})
+                    pending += 1
+            else:
+                failed.append({"code": code, "error": "无历史数据"})
 
         # Build message
         msg_parts = []
@@ -4,8 +4,9 @@ from pydantic import BaseModel, Field
 from ..services.ai import ai_service
 from ..db import get_db_connection
 from ..auth import get_current_user, User, require_auth
+from ..utils import PooledConnectionRoute
 
-router = APIRouter()
+router = APIRouter(route_class=PooledConnectionRoute)
 
 class PromptModel(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
@@ -18,9 +18,10 @@ from ..auth import (
     SESSION_EXPIRY_DAYS
 )
 from ..db import get_db_connection, check_database_version, CURRENT_SCHEMA_VERSION
+from ..utils import PooledConnectionRoute
 
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=PooledConnectionRoute)
 
 
 # ============================================================================
@@ -8,8 +8,9 @@ import datetime
 
 from ..services.data_io import export_data, import_data
 from ..auth import get_current_user, User, require_auth
+from ..utils import PooledConnectionRoute
 
-router = APIRouter()
+router = APIRouter(route_class=PooledConnectionRoute)
 
 # Valid module names
 VALID_MODULES = ["accounts", "positions", "transactions", "ai_prompts", "subscriptions", "settings"]
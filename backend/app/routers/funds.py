@@ -1,14 +1,17 @@
 import logging
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Query, Body, Depends
-from ..services.fund import search_funds, get_fund_intraday, get_fund_history
+from ..services.fund import search_funds, get_fund_history
+from ..services.fund_async import get_fund_intraday_async, get_fund_quotes_async
 from ..config import Config
+from ..services import deadline
 from ..auth import User, get_current_user, require_auth
 
 from ..services.subscription import add_subscription
+from ..utils import PooledConnectionRoute
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(route_class=PooledConnectionRoute)
 
 @router.get("/categories")
 def get_fund_categories():
@@ -72,10 +75,47 @@ def search(q: str = Query(..., min_length=1)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/funds/quotes")
+async def fund_quotes(codes: str = Query(..., min_length=1, description="逗号分隔的基金代码")):
+    """
+    批量获取基金实时估值（自选列表轮询用）。
+    只返回 name/nav/estimate/estRate/time，重量级详情请用 /fund/{fund_id}。
+    """
+    code_list = list(dict.fromkeys(c.strip() for c in codes.split(",") if c.strip()))
+    if len(code_list) > Config.QUOTES_MAX_CODES:
+        raise HTTPException(status_code=400, detail=f"最多查询 {Config.QUOTES_MAX_CODES} 个基金")
+    try:
+        with deadline.deadline_scope(Config.DASHBOARD_DEADLINE):
+            return {"quotes": await get_fund_quotes_async(code_list)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/funds/backtest")
+def funds_backtest(
+    codes: str = Query(..., min_length=1, description="逗号分隔的基金代码"),
+    days: int = Query(20, ge=1, le=250),
+    current_user: User = Depends(require_auth)
+):
+    """
+    批量回测估值算法（计算在进程池中并行，需登录）。
+
+    Returns:
+        {"results": [{"fund_id", "methods": {...}} 或 {"fund_id", "error"}, ...]}，顺序同请求
+    """
+    from ..services.backtest import load_and_backtest
+
+    code_list = list(dict.fromkeys(c.strip() for c in codes.split(",") if c.strip()))
+    if len(code_list) > Config.BACKTEST_MAX_CODES:
+        raise HTTPException(status_code=400, detail=f"最多回测 {Config.BACKTEST_MAX_CODES} 个基金")
+    try:
+        return {"results": list(load_and_backtest(code_list, days).values())}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/fund/{fund_id}")
-def fund_detail(fund_id: str):
+async def fund_detail(fund_id: str):
     try:
-        return get_fund_intraday(fund_id)
+        return await get_fund_intraday_async(fund_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -142,6 +182,7 @@ def fund_intraday(fund_id: str, date: str = None):
     """
     from datetime import datetime
     from ..db import db_connection
+    from ..services.intraday_store import read_snapshots
 
     if not date:
         date = datetime.now().strftime("%Y-%m-%d")
@@ -164,13 +205,8 @@ def fund_intraday(fund_id: str, date: str = None):
         row = cursor.fetchone()
         prev_nav = float(row["nav"]) if row else None
 
-        # 2. Get intraday snapshots
-        cursor.execute("""
-            SELECT time, estimate FROM fund_intraday_snapshots
-            WHERE fund_code = ? AND date = ?
-            ORDER BY time ASC
-        """, (fund_id, date))
-        snapshots = [{"time": r["time"], "estimate": float(r["estimate"])} for r in cursor.fetchall()]
+        # 2. Get intraday snapshots (single series row for the whole day)
+        snapshots = read_snapshots(fund_id, date)
 
     return {
         "date": date,
@@ -180,7 +216,7 @@ def fund_intraday(fund_id: str, date: str = None):
     }
 
 @router.get("/fund/{fund_id}/backtest")
-def fund_backtest(fund_id: str, days: int = 20):
+def fund_backtest(fund_id: str, days: int = Query(20, ge=1, le=250)):
     """
     回测基金估值算法准确率
 
@@ -189,87 +225,29 @@ def fund_backtest(fund_id: str, days: int = 20):
         days: 回测天数（默认20天）
 
     Returns:
-        回测结果，包括平均误差率、方向准确率等
+        回测结果，包括平均误差率、方向准确率等（顶层字段为加权移动平均，
+        methods 中包含所有估值算法的结果）
     """
-    from ..services.fund import get_fund_history
-    from ..services.estimate import estimate_with_weighted_ma, estimate_with_simple_ma
-    import statistics
+    from ..services.backtest import load_and_backtest
 
     try:
-        # 获取历史数据（需要额外的数据用于训练）
-        history = get_fund_history(fund_id, limit=days + 30)
-
-        if not history or len(history) < days + 10:
-            raise HTTPException(
-                status_code=400,
-                detail=f"历史数据不足（需要至少 {days + 10} 天）"
-            )
-
-        results = []
-
-        # 从倒数第 days 天开始，逐日预测并对比实际值
-        for i in range(days, 0, -1):
-            train_data = history[:-i]
-            actual_nav = float(history[-i]["nav"])
-            actual_date = history[-i]["date"]
-
-            # 使用加权移动平均预测
-            pred = estimate_with_weighted_ma(train_data)
-            if pred:
-                error = abs(pred["estimate"] - actual_nav)
-                error_rate = (error / actual_nav) * 100
-
-                # 计算实际涨跌幅
-                prev_nav = float(train_data[-1]["nav"])
-                actual_change = ((actual_nav - prev_nav) / prev_nav) * 100
-
-                # 判断方向是否正确
-                direction_correct = (
-                    (pred["est_rate"] > 0 and actual_change > 0) or
-                    (pred["est_rate"] < 0 and actual_change < 0) or
-                    (pred["est_rate"] == 0 and actual_change == 0)
-                )
-
-                results.append({
-                    "date": actual_date,
-                    "actual": actual_nav,
-                    "predicted": pred["estimate"],
-                    "error_rate": round(error_rate, 3),
-                    "direction_correct": direction_correct
-                })
-
-        if not results:
-            raise HTTPException(status_code=500, detail="回测失败")
-
-        # 统计结果
-        error_rates = [r["error_rate"] for r in results]
-        direction_correct_count = sum(1 for r in results if r["direction_correct"])
-
-        within_05 = sum(1 for e in error_rates if e <= 0.5)
-        within_10 = sum(1 for e in error_rates if e <= 1.0)
-        within_20 = sum(1 for e in error_rates if e <= 2.0)
-
-        return {
-            "fund_id": fund_id,
-            "test_days": len(results),
-            "avg_error_rate": round(statistics.mean(error_rates), 3),
-            "median_error_rate": round(statistics.median(error_rates), 3),
-            "max_error_rate": round(max(error_rates), 3),
-            "min_error_rate": round(min(error_rates), 3),
-            "direction_accuracy": round((direction_correct_count / len(results)) * 100, 1),
-            "error_distribution": {
-                "within_0_5": round((within_05 / len(results)) * 100, 1),
-                "within_1_0": round((within_10 / len(results)) * 100, 1),
-                "within_2_0": round((within_20 / len(results)) * 100, 1)
-            },
-            "method": "weighted_ma"
-        }
-
-    except HTTPException:
-        raise
+        result = load_and_backtest([fund_id], days)[fund_id]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    wma = result["methods"].get("weighted_ma")
+    if not wma:
+        raise HTTPException(status_code=500, detail="回测失败")
+
+    return {
+        "fund_id": fund_id,
+        **wma,
+        "method": "weighted_ma",
+        "methods": result["methods"]
+    }
+
 @router.post("/fund/{fund_id}/subscribe")
 def subscribe_fund(
     fund_id: str,
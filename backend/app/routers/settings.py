@@ -6,9 +6,10 @@ from ..db import get_db_connection
 from ..crypto import encrypt_value, decrypt_value
 from ..config import Config
 from ..auth import User, get_current_user, require_auth
+from ..utils import PooledConnectionRoute
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(route_class=PooledConnectionRoute)
 
 # 需要加密的字段
 ENCRYPTED_FIELDS = {"OPENAI_API_KEY", "SMTP_PASSWORD"}
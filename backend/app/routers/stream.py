@@ -0,0 +1,62 @@
+"""
+实时推送 API 端点（Server-Sent Events）
+"""
+import json
+import logging
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ..config import Config
+from ..services.valuation_stream import hub
+from ..utils import PooledConnectionRoute
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/stream", tags=["stream"], route_class=PooledConnectionRoute)
+
+
+@router.get("/valuations")
+async def stream_valuations(
+    request: Request,
+    codes: str = Query(..., description="逗号分隔的基金代码")
+):
+    """
+    订阅基金估值变化（SSE）。
+
+    连接建立后先推送已有估值快照，之后每个采集 tick 只推送发生变化的基金：
+        event: valuation
+        data: {"000001": {...}, ...}
+
+    无变化时定期发送注释行保活。
+    """
+    code_list = list(dict.fromkeys(c.strip() for c in codes.split(",") if c.strip()))
+    if not code_list:
+        raise HTTPException(status_code=400, detail="codes 不能为空")
+    if len(code_list) > Config.VALUATION_STREAM_MAX_CODES:
+        raise HTTPException(status_code=400, detail=f"最多订阅 {Config.VALUATION_STREAM_MAX_CODES} 个基金")
+
+    async def _events():
+        # 在生成器内订阅：只有响应真正开始迭代才会登记，且与 finally 中的退订成对出现；
+        # 若响应从未被迭代（客户端在发送前断开等），不会留下订阅
+        sub = hub.subscribe(code_list)
+        try:
+            # 断线重连间隔（毫秒）
+            yield f"retry: {int(Config.VALUATION_STREAM_INTERVAL * 1000)}\n\n"
+            while not await request.is_disconnected():
+                delta = await sub.next_delta(timeout=Config.VALUATION_STREAM_KEEPALIVE)
+                if delta:
+                    yield f"event: valuation\ndata: {json.dumps(delta, ensure_ascii=False)}\n\n"
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # 关闭 nginx 缓冲
+        },
+    )
@@ -9,11 +9,12 @@ from ..db import (
     init_db,
     CURRENT_SCHEMA_VERSION
 )
+from ..utils import PooledConnectionRoute
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/system", tags=["system"])
+router = APIRouter(prefix="/system", tags=["system"], route_class=PooledConnectionRoute)
 
 
 # ============================================================================
@@ -125,3 +126,40 @@ def rebuild_database():
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to rebuild database: {str(e)}"
         )
+
+
+@router.get("/metrics")
+def get_metrics():
+    """
+    获取运行时指标（缓存命中率等），用于监控
+
+    Note:
+        此端点无需认证，只返回聚合计数，不包含用户数据
+    """
+    from ..services.fund import get_valuation_cache_stats, get_detail_cache_stats, get_stock_quote_cache_stats
+    from ..services.rate_limit import get_rate_limit_stats
+    from ..services.nav_publication import get_publication_stats
+    from ..services.source_routing import get_routing_stats
+    from ..services.circuit_breaker import get_breaker_stats
+    from ..services.deadline import get_deadline_stats
+    from ..services.pingzhong import get_disk_cache_stats
+    from ..services.scheduler import get_scheduler_stats
+    from ..services.valuation_stream import hub
+    from ..db import get_db_pool_stats
+
+    return {
+        "caches": {
+            "valuation": get_valuation_cache_stats(),
+            "stock_quote": get_stock_quote_cache_stats(),
+            **get_detail_cache_stats(),
+            "pingzhong_disk": get_disk_cache_stats()
+        },
+        "rate_limits": get_rate_limit_stats(),
+        "circuit_breakers": get_breaker_stats(),
+        "deadlines": get_deadline_stats(),
+        "jobs": get_scheduler_stats(),
+        "nav_publication": get_publication_stats(),
+        "source_routing": get_routing_stats(),
+        "stream": hub.stats(),
+        "db_pool": get_db_pool_stats()
+    }
@@ -10,7 +10,7 @@ from langchain_core.output_parsers import StrOutputParser
 
 from ..config import Config
 from .prompts import LINUS_FINANCIAL_ANALYSIS_PROMPT
-from .fund import get_fund_history, _calculate_technical_indicators
+from .fund import get_fund_history
 from ..db import get_db_connection
 
 
@@ -197,9 +197,9 @@ class AIService:
             "annual_return": tech_data.get("annual_return", "--"),
         }
 
-        # Get history for trend analysis (use same source as technical indicators)
-        history = get_fund_history(fund_id, limit=250)
-        indicators = self._calculate_indicators(history[:30] if len(history) >= 30 else history)
+        # Get recent history for trend analysis (technical indicators come from the persisted store above)
+        history = get_fund_history(fund_id, limit=30)
+        indicators = self._calculate_indicators(history)
 
         # 1.5 Data Consistency Check
         consistency_note = ""
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+估值算法回测引擎（向量化 walk-forward）。
+
+对一只基金的整段净值序列一次性算出所有滚动预测：日涨跌幅序列与权重做
+卷积得到加权移动平均，前缀和得到简单移动平均，不再逐日切片 history[:-i]
+并重复调用 estimate_with_*。公式与 services/estimate.py 完全一致。
+
+多只基金的回测计算分发到进程池（净值在主进程中批量加载）。
+"""
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+# 与 estimate.estimate_with_weighted_ma / estimate_with_simple_ma 的默认参数一致
+WMA_WEIGHTS = np.array([0.4, 0.3, 0.2, 0.07, 0.03])
+SMA_DAYS = 5
+
+ESTIMATORS = ("weighted_ma", "simple_ma")
+
+# 训练数据至少比回测天数多出的天数（同原 /fund/{id}/backtest）
+MIN_EXTRA_DAYS = 10
+HISTORY_EXTRA_DAYS = 30
+
+
+def rolling_predictions(navs: np.ndarray, method: str) -> np.ndarray:
+    """
+    Predicted change (%) for every target index t, using navs[:t] as training data.
+
+    Returns:
+        shape (len(navs),) 的数组，out[t] 为预测 navs[t] 的涨跌幅；
+        训练数据不足（< 3 个净值）的位置为 NaN
+    """
+    navs = np.asarray(navs, dtype=float)
+    out = np.full(len(navs), np.nan)
+    if len(navs) < 3:
+        return out
+
+    # changes[m] = navs[m] -> navs[m + 1] 的涨跌幅；预测 navs[t] 时最近一个涨跌幅为 changes[t - 2]
+    changes = np.diff(navs) / navs[:-1] * 100
+    m = np.arange(len(changes))
+    n = np.minimum(m + 1, len(WMA_WEIGHTS) if method == "weighted_ma" else SMA_DAYS)
+
+    if method == "weighted_ma":
+        # conv[m] = Σ_i w_i · changes[m - i]（越近权重越大），不足 5 日时只用可用的权重
+        conv = np.convolve(changes, WMA_WEIGHTS)[:len(changes)]
+        weight_total = np.cumsum(WMA_WEIGHTS)[n - 1]
+        pred = conv / weight_total
+        pred[n < 2] = np.nan  # estimate_with_weighted_ma 至少需要 2 个涨跌幅
+    elif method == "simple_ma":
+        csum = np.concatenate(([0.0], np.cumsum(changes)))
+        pred = (csum[m + 1] - csum[m + 1 - n]) / n
+    else:
+        raise ValueError(f"Unknown estimator: {method}")
+
+    out[2:] = pred[:-1]
+    return out
+
+
+def backtest_series(navs: Sequence[float], test_days: int, methods: Sequence[str] = ESTIMATORS) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Walk-forward backtest of the last `test_days` NAVs for each estimator.
+
+    Returns:
+        {method: {"index", "actual", "predicted", "predicted_change", "actual_change", "error_rate"}}
+        各为对齐的数组（预测不可用的日期已剔除）
+    """
+    navs = np.asarray(navs, dtype=float)
+    target = np.arange(max(len(navs) - test_days, 1), len(navs))
+    actual = navs[target]
+    prev = navs[target - 1]
+    actual_change = (actual - prev) / prev * 100
+
+    results = {}
+    for method in methods:
+        raw_rate = rolling_predictions(navs, method)[target]
+        ok = ~np.isnan(raw_rate)
+        # 与 estimate_* 返回值一致：estimate 保留 4 位、est_rate 保留 2 位
+        predicted = np.round(prev[ok] * (1 + raw_rate[ok] / 100), 4)
+        results[method] = {
+            "index": target[ok],
+            "actual": actual[ok],
+            "predicted": predicted,
+            "predicted_change": np.round(raw_rate[ok], 2),
+            "actual_change": actual_change[ok],
+            "error_rate": np.abs(predicted - actual[ok]) / actual[ok] * 100,
+        }
+    return results
+
+
+def summarize(result: Dict[str, np.ndarray]) -> Optional[Dict[str, Any]]:
+    """Aggregate one estimator's backtest arrays (same fields as the original API)."""
+    error_rates = result["error_rate"]
+    count = len(error_rates)
+    if count == 0:
+        return None
+    pred, real = result["predicted_change"], result["actual_change"]
+    direction_correct = int(np.count_nonzero(np.sign(pred) == np.sign(real)))
+    return {
+        "test_days": count,
+        "avg_error_rate": round(float(error_rates.mean()), 3),
+        "median_error_rate": round(float(np.median(error_rates)), 3),
+        "max_error_rate": round(float(error_rates.max()), 3),
+        "min_error_rate": round(float(error_rates.min()), 3),
+        "stdev_error_rate": round(float(error_rates.std(ddof=1)), 3) if count > 1 else 0.0,
+        "direction_accuracy": round(direction_correct / count * 100, 1),
+        "error_distribution": {
+            "within_0_5": round(float(np.count_nonzero(error_rates <= 0.5)) / count * 100, 1),
+            "within_1_0": round(float(np.count_nonzero(error_rates <= 1.0)) / count * 100, 1),
+            "within_2_0": round(float(np.count_nonzero(error_rates <= 2.0)) / count * 100, 1)
+        },
+    }
+
+
+def run_backtest(code: str, dates: List[str], navs: List[float], test_days: int, with_points: bool = False) -> Dict[str, Any]:
+    """
+    Backtest one fund's history (ascending) with every estimator.
+
+    Pure computation (no I/O), safe to run in a worker process.
+
+    Returns:
+        {"fund_id", "methods": {method: summary (+ "points" when with_points)}}，
+        历史不足时为 {"fund_id", "error"}
+    """
+    if len(navs) < test_days + MIN_EXTRA_DAYS:
+        return {"fund_id": code, "error": f"历史数据不足（需要至少 {test_days + MIN_EXTRA_DAYS} 天）"}
+
+    methods = {}
+    for method, result in backtest_series(navs, test_days).items():
+        summary = summarize(result)
+        if summary is None:
+            continue
+        if with_points:
+            summary["points"] = [
+                {
+                    "date": dates[int(i)],
+                    "actual": float(a),
+                    "predicted": float(p),
+                    "error_rate": round(float(e), 3),
+                    "predicted_change": float(pc),
+                    "actual_change": round(float(ac), 3),
+                }
+                for i, a, p, e, pc, ac in zip(
+                    result["index"], result["actual"], result["predicted"],
+                    result["error_rate"], result["predicted_change"], result["actual_change"]
+                )
+            ]
+        methods[method] = summary
+    return {"fund_id": code, "methods": methods}
+
+
+def _run_backtest_job(args) -> Dict[str, Any]:
+    return run_backtest(*args)
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # spawn：服务进程里有多个线程，fork 不安全
+        _process_pool = ProcessPoolExecutor(
+            max_workers=Config.BACKTEST_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+def shutdown_backtest_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def backtest_funds(
+    histories: Dict[str, List[Dict[str, Any]]],
+    test_days: int,
+    with_points: bool = False
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Backtest many funds; computation fans out to the process pool once there
+    are at least BACKTEST_PROCESS_MIN_FUNDS funds and more than one worker
+    (below that, the pickling overhead outweighs the work).
+
+    Args:
+        histories: {code: history (ascending [{"date", "nav"}, ...])}
+
+    Returns:
+        {code: run_backtest result}
+    """
+    jobs = [
+        (code, [item["date"] for item in history], [float(item["nav"]) for item in history], test_days, with_points)
+        for code, history in histories.items()
+    ]
+    if len(jobs) < Config.BACKTEST_PROCESS_MIN_FUNDS or Config.BACKTEST_WORKERS <= 1:
+        results = [_run_backtest_job(job) for job in jobs]
+    else:
+        chunksize = max(1, len(jobs) // (Config.BACKTEST_WORKERS * 4))
+        results = list(_get_process_pool().map(_run_backtest_job, jobs, chunksize=chunksize))
+    return {result["fund_id"]: result for result in results}
+
+
+def load_and_backtest(
+    codes: List[str],
+    test_days: int,
+    with_points: bool = False,
+    history_days: Optional[int] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Load histories (shared NAV cache, thread pool) then backtest them all.
+
+    Args:
+        history_days: 加载的净值天数，默认 test_days + HISTORY_EXTRA_DAYS
+    """
+    from .fund import get_fund_histories
+
+    codes = list(dict.fromkeys(c for c in codes if c))
+    loaded = get_fund_histories(codes, limit=history_days or test_days + HISTORY_EXTRA_DAYS)
+    histories = {}
+    results = {}
+    for code in codes:
+        history = loaded.get(code)
+        if isinstance(history, Exception):
+            results[code] = {"fund_id": code, "error": str(history)}
+        else:
+            histories[code] = history or []
+    results.update(backtest_funds(histories, test_days, with_points))
+    return {code: results[code] for code in codes}
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+进程内共享缓存：TTL 过期 + LRU 容量上限 + 按 key 的 single-flight。
+
+多个线程同时 miss 同一个 key 时，只有第一个线程（leader）真正去上游拉取，
+其余线程等待 leader 的结果，避免同一只基金被重复请求。
+
+可选 stale-while-revalidate：过期后 stale_ttl 秒内仍可返回旧值，同时由后台线程
+刷新一次（同一 key 只会有一个刷新在进行）。
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from ..db import PooledConnectionExecutor
+
+logger = logging.getLogger(__name__)
+
+TTLValue = Union[float, Callable[[], float]]
+
+# 所有缓存共享的后台刷新线程池（loader 多数会读写数据库，任务结束即归还连接）
+_refresh_pool = PooledConnectionExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+
+
+class _Flight:
+    """一次进行中的上游加载，供并发 miss 的线程共享结果"""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self) -> Any:
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class TTLCache:
+    """
+    线程安全的 TTL + LRU 缓存，支持 single-flight 加载。
+
+    Args:
+        name: 缓存名称（用于统计输出）
+        max_size: 最大条目数，超出后淘汰最久未使用的条目
+        ttl: 过期秒数，或返回秒数的函数（每次写入时求值，可随交易时段变化）
+        stale_ttl: 过期后仍可作为旧值返回的秒数（配合 get_or_refresh 使用），0 表示不启用
+    """
+
+    def __init__(self, name: str, max_size: int = 1024, ttl: TTLValue = 60.0, stale_ttl: float = 0.0):
+        self.name = name
+        self.max_size = max_size
+        self._ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._inflight: Dict[Any, _Flight] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def _current_ttl(self) -> float:
+        return self._ttl() if callable(self._ttl) else self._ttl
+
+    def _lookup_locked(self, key: Any, now: float):
+        """命中返回 (True, value)，未命中或已过期返回 (False, None)。必须在持有锁时调用。"""
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= now:
+            return False, None
+        self._data.move_to_end(key)
+        return True, entry[1]
+
+    def _store_locked(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        if ttl is None:
+            ttl = self._current_ttl()
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Any) -> Optional[Any]:
+        """读取未过期的缓存值，不存在返回 None"""
+        with self._lock:
+            found, value = self._lookup_locked(key, time.monotonic())
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return None
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存，ttl 为空时使用默认 TTL"""
+        with self._lock:
+            self._store_locked(key, value, ttl)
+
+    def invalidate(self, key: Any) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def get_or_load(
+        self,
+        key: Any,
+        loader: Callable[[Any], Any],
+        should_cache: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        读取缓存，未命中时调用 loader(key) 加载。
+
+        同一 key 的并发 miss 只会触发一次 loader 调用，其余调用方等待并共享结果
+        （包括异常）。
+
+        Args:
+            key: 缓存 key
+            loader: 加载函数，参数为 key
+            should_cache: 判断结果是否写入缓存的函数，默认非 None 即缓存
+
+        Returns:
+            缓存值或 loader 的返回值
+        """
+        with self._lock:
+            found, value = self._lookup_locked(key, time.monotonic())
+            if found:
+                self.hits += 1
+                return value
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return flight.wait()
+
+        try:
+            value = loader(key)
+            flight.value = value
+            if value is not None and (should_cache is None or should_cache(value)):
+                self.set(key, value)
+            return value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def _peek_locked(self, key: Any, now: float) -> Tuple[Optional[Any], Optional[str]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None, None
+        expires_at, value = entry
+        if expires_at > now:
+            self._data.move_to_end(key)
+            return value, "fresh"
+        if expires_at + self.stale_ttl > now:
+            return value, "stale"
+        return None, None
+
+    def peek(self, key: Any) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Read without loading.
+
+        Returns:
+            (value, "fresh") / (value, "stale")（过期但在 stale_ttl 内）/ (None, None)
+        """
+        with self._lock:
+            value, state = self._peek_locked(key, time.monotonic())
+            if state == "fresh":
+                self.hits += 1
+            elif state == "stale":
+                self.stale_hits += 1
+            else:
+                self.misses += 1
+            return value, state
+
+    def refresh_in_background(
+        self,
+        key: Any,
+        loader: Callable[[Any], Any],
+        should_cache: Optional[Callable[[Any], bool]] = None,
+    ) -> bool:
+        """
+        Reload `key` on the shared refresh pool unless a load for it is already in flight.
+        Concurrent get_or_load callers for the same key join this flight.
+
+        Returns:
+            True if a refresh was started
+        """
+        with self._lock:
+            if key in self._inflight:
+                return False
+            flight = self._inflight[key] = _Flight()
+            self.refreshes += 1
+
+        def _run():
+            try:
+                value = loader(key)
+                flight.value = value
+                if value is not None and (should_cache is None or should_cache(value)):
+                    self.set(key, value)
+            except BaseException as e:
+                flight.error = e
+                with self._lock:
+                    self.refresh_failures += 1
+                logger.warning(f"Background refresh failed for {self.name}:{key}: {e}")
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                flight.event.set()
+
+        _refresh_pool.submit(_run)
+        return True
+
+    def get_or_refresh(
+        self,
+        key: Any,
+        loader: Callable[[Any], Any],
+        should_cache: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Stale-while-revalidate 读取：
+        - 未过期：直接返回
+        - 过期但在 stale_ttl 内：立即返回旧值，并在后台刷新一次
+        - 不存在：同 get_or_load（并发 miss 合并为一次加载）
+        """
+        with self._lock:
+            value, state = self._peek_locked(key, time.monotonic())
+            if state == "fresh":
+                self.hits += 1
+                return value
+            if state == "stale":
+                self.stale_hits += 1
+        if state == "stale":
+            self.refresh_in_background(key, loader, should_cache)
+            return value
+        # miss 统计由 get_or_load 负责
+        return self.get_or_load(key, loader, should_cache)
+
+    def get_or_load_many(
+        self,
+        keys: Iterable[Any],
+        batch_loader: Callable[[list], Dict[Any, Any]],
+        should_cache: Optional[Callable[[Any], bool]] = None,
+    ) -> Dict[Any, Any]:
+        """
+        批量版 get_or_load：命中的直接返回，其他线程正在加载的 key 等待其结果，
+        剩余 key 一次性交给 batch_loader(keys) 加载。
+
+        Returns:
+            Dict[key, value]，加载失败的 key 不会出现在结果中
+        """
+        results: Dict[Any, Any] = {}
+        leading = []
+        waiting: Dict[Any, _Flight] = {}
+
+        with self._lock:
+            now = time.monotonic()
+            for key in dict.fromkeys(keys):
+                found, value = self._lookup_locked(key, now)
+                if found:
+                    self.hits += 1
+                    results[key] = value
+                    continue
+                flight = self._inflight.get(key)
+                if flight is not None:
+                    self.coalesced += 1
+                    waiting[key] = flight
+                else:
+                    self._inflight[key] = _Flight()
+                    self.misses += 1
+                    leading.append(key)
+
+        if leading:
+            flights = {key: self._inflight[key] for key in leading}
+            try:
+                loaded = batch_loader(leading) or {}
+                for key in leading:
+                    value = loaded.get(key)
+                    flights[key].value = value
+                    if value is None:
+                        continue
+                    results[key] = value
+                    if should_cache is None or should_cache(value):
+                        self.set(key, value)
+            except BaseException as e:
+                for flight in flights.values():
+                    flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in leading:
+                        self._inflight.pop(key, None)
+                for flight in flights.values():
+                    flight.event.set()
+
+        for key, flight in waiting.items():
+            try:
+                value = flight.wait()
+            except Exception:
+                continue
+            if value is not None:
+                results[key] = value
+
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """命中/未命中/合并请求等统计"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": round(self._current_ttl(), 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "stale_hits": self.stale_hits,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "inflight": len(self._inflight),
+                "hit_rate": round((self.hits + self.coalesced + self.stale_hits) / (lookups + self.stale_hits), 4) if lookups + self.stale_hits else 0.0,
+            }
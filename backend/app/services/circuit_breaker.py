@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+按上游 host 的熔断器。
+
+上游降级时，每次请求都要等满超时和 urllib3 重试才轮到备用数据源，
+持仓列表里每只基金都付一遍这个延迟。熔断器按 host 统计最近
+CIRCUIT_WINDOW_SECONDS 内的错误率和 p95 延迟：
+
+- closed：正常放行；样本数达到 CIRCUIT_MIN_REQUESTS 且错误率 >= CIRCUIT_ERROR_RATE
+  或 p95 >= CIRCUIT_SLOW_SECONDS 时跳闸
+- open：直接拒绝（CircuitOpenError），CIRCUIT_OPEN_SECONDS 后进入 half_open
+- half_open：同一时刻只放行一个试探请求，成功则 closed，失败则重新 open
+
+p95 同时用作对冲请求的等待时长（见 fund._fetch_upstream_valuations），
+错误率和 p95 用于按健康度调整数据源顺序。
+"""
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+from ..config import Config
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_RANK = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose breaker is open."""
+
+    def __init__(self, host: str):
+        super().__init__(f"circuit open for {host}")
+        self.host = host
+
+
+class CircuitBreaker:
+    """
+    Thread-safe breaker for one upstream host.
+
+    Call allow() before a request and record() with its outcome afterwards.
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = CLOSED
+        self._window: deque = deque(maxlen=Config.CIRCUIT_WINDOW_MAX_SAMPLES)  # (ts, ok, latency)
+        self._opened_at = 0.0
+        self._trial_inflight = False
+        self._lock = threading.Lock()
+        self._trips = 0
+        self._rejected = 0
+
+    def _prune(self, now: float) -> None:
+        horizon = now - Config.CIRCUIT_WINDOW_SECONDS
+        while self._window and self._window[0][0] < horizon:
+            self._window.popleft()
+
+    def _p95(self) -> Optional[float]:
+        if not self._window:
+            return None
+        latencies = sorted(sample[2] for sample in self._window)
+        return latencies[min(len(latencies) - 1, math.ceil(0.95 * len(latencies)) - 1)]
+
+    def _error_rate(self) -> float:
+        if not self._window:
+            return 0.0
+        return sum(1 for sample in self._window if not sample[1]) / len(self._window)
+
+    def _trip(self, now: float) -> None:
+        self.state = OPEN
+        self._opened_at = now
+        self._trial_inflight = False
+        self._trips += 1
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= Config.CIRCUIT_OPEN_SECONDS:
+                self.state = HALF_OPEN
+                self._trial_inflight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_inflight:
+                self._trial_inflight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record(self, ok: bool, latency: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                if ok:
+                    self.state = CLOSED
+                    self._window.clear()
+                    self._window.append((now, ok, latency))
+                else:
+                    self._trip(now)
+                return
+            if self.state == OPEN:
+                return  # 跳闸前已发出的请求
+            self._window.append((now, ok, latency))
+            self._prune(now)
+            if len(self._window) < Config.CIRCUIT_MIN_REQUESTS:
+                return
+            if self._error_rate() >= Config.CIRCUIT_ERROR_RATE or self._p95() >= Config.CIRCUIT_SLOW_SECONDS:
+                self._trip(now)
+
+    def release(self) -> None:
+        """A request ended without an outcome (e.g. cancelled); free the half-open trial slot."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial_inflight = False
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            self._prune(time.monotonic())
+            return self._p95()
+
+    def hedge_delay(self) -> float:
+        """How long to wait on this host before firing a hedged request elsewhere."""
+        p95 = self.p95()
+        if p95 is None:
+            return Config.CIRCUIT_HEDGE_DEFAULT_DELAY
+        return min(max(p95, Config.CIRCUIT_HEDGE_MIN_DELAY), Config.CIRCUIT_SLOW_SECONDS)
+
+    def penalty(self) -> tuple:
+        """Sort key for source ordering: state first, then error rate + p95 in coarse buckets."""
+        with self._lock:
+            self._prune(time.monotonic())
+            p95 = self._p95() or 0.0
+            score = self._error_rate() + p95 / Config.CIRCUIT_SLOW_SECONDS
+            return _STATE_RANK[self.state], math.floor(score / Config.CIRCUIT_REORDER_MARGIN)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune(time.monotonic())
+            p95 = self._p95()
+            return {
+                "state": self.state,
+                "requests": len(self._window),
+                "error_rate": round(self._error_rate(), 3),
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "trips": self._trips,
+                "rejected": self._rejected,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(host: str) -> CircuitBreaker:
+    """Get (or lazily create) the shared breaker for an upstream host."""
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(host)
+            if breaker is None:
+                breaker = _breakers[host] = CircuitBreaker(host)
+    return breaker
+
+
+def breaker_for_url(url: str) -> CircuitBreaker:
+    return get_breaker(urlsplit(url).hostname or "")
+
+
+def order_hosts(hosts: Sequence[str]) -> List[str]:
+    """
+    Healthiest first. Hosts within the same state and penalty bucket keep the
+    given (preferred) order, so ordering only changes on a material difference.
+    """
+    return sorted(hosts, key=lambda host: get_breaker(host).penalty())
+
+
+def get_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    return {host: breaker.stats() for host, breaker in list(_breakers.items())}
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+请求级时间预算（deadline），经 contextvar 贯穿估值 / 历史净值调用链。
+
+路由层用 deadline_scope(秒) 建立预算（嵌套时取更早的截止时刻），
+fund.py / fund_async.py 中的抓取函数据此：
+- 把单次请求超时收缩到剩余预算（clamp_timeout）
+- 跳过剩余预算内完成不了的重试（can_retry）
+- 预算耗尽时改用缓存数据（标记为 stale）而不是继续等上游
+没有预算时（后台任务、CLI）所有函数都退化为原有行为。
+
+contextvar 会随 asyncio 任务和 run_in_threadpool 传递，但不会传进
+ThreadPoolExecutor，向线程池提交任务时用 bind() 包一层。
+"""
+import threading
+import time
+from concurrent.futures import Executor, TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+_stats_lock = threading.Lock()
+_stats = {"exceeded": 0, "retries_skipped": 0, "stale_served": 0}
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before the operation could finish."""
+
+
+def count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """Run the block under a budget of `seconds` (None: inherit the current one)."""
+    if seconds is None:
+        yield
+        return
+    current = _deadline.get()
+    target = time.monotonic() + seconds
+    token = _deadline.set(target if current is None else min(current, target))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget (None when no deadline is set)."""
+    current = _deadline.get()
+    if current is None:
+        return None
+    return current - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check() -> None:
+    if expired():
+        count("exceeded")
+        raise DeadlineExceeded()
+
+
+def clamp_timeout(timeout: float) -> float:
+    """Shrink a per-call timeout to the remaining budget; raise if nothing is left."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        count("exceeded")
+        raise DeadlineExceeded()
+    return min(timeout, left)
+
+
+def can_retry(expected_duration: float, backoff: float) -> bool:
+    """Whether a retry (after `backoff` seconds, taking about `expected_duration`) fits the budget."""
+    left = remaining()
+    if left is None or left > backoff + expected_duration:
+        return True
+    count("retries_skipped")
+    return False
+
+
+def bind(fn: Callable) -> Callable:
+    """Carry the caller's deadline into a worker thread."""
+    captured = _deadline.get()
+    if captured is None:
+        return fn
+
+    def _bound(*args, **kwargs):
+        token = _deadline.set(captured)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+    return _bound
+
+
+def run_within(pool: Executor, fn: Callable, *args) -> Any:
+    """
+    Run a blocking call that cannot take a timeout itself (e.g. akshare) within
+    the remaining budget. On expiry DeadlineExceeded is raised and the call keeps
+    running in the pool, so its side effects (DB writes) still land.
+    """
+    left = remaining()
+    if left is None:
+        return fn(*args)
+    if left <= 0:
+        count("exceeded")
+        raise DeadlineExceeded()
+    future = pool.submit(fn, *args)
+    try:
+        return future.result(timeout=left)
+    except FuturesTimeoutError:
+        count("exceeded")
+        raise DeadlineExceeded()
+
+
+def get_deadline_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+上游原始响应的磁盘缓存（每个 key 一个文件），保存 ETag / Last-Modified 供条件请求复用。
+
+文件格式：第一行为 JSON 元数据（etag / last_modified / stored_at），其后为原始响应体。
+写入先落临时文件再 os.replace，读到半截文件的情况不会出现；文件 mtime 记录最近一次
+使用时间，prune() 按此清理长期不用的条目。
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+
+class ResponseDiskCache:
+    """
+    Thread-safe (per-file atomic) store of raw response bodies plus validators.
+
+    Errors (full disk, permissions) are logged and treated as misses; the cache
+    never makes a request fail.
+    """
+
+    def __init__(self, name: str, directory: str, suffix: str = ".bin"):
+        self.name = name
+        self.directory = directory
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def _count(self, attr: str) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def load(self, key: str) -> Optional[CachedResponse]:
+        try:
+            with open(self._path(key), "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except OSError as e:
+            logger.warning(f"Disk cache {self.name}: failed to read {key}: {e}")
+            self._count("errors")
+            return None
+
+        header, sep, body = raw.partition(b"\n")
+        try:
+            meta = orjson.loads(header) if sep else None
+        except orjson.JSONDecodeError:
+            meta = None
+        if not meta:
+            self._count("errors")
+            return None
+        self._count("hits")
+        return CachedResponse(body, meta.get("etag"), meta.get("last_modified"), float(meta.get("stored_at") or 0))
+
+    def store(self, key: str, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        header = orjson.dumps({"etag": etag, "last_modified": last_modified, "stored_at": time.time()})
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{key}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(header)
+                    f.write(b"\n")
+                    f.write(body)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Disk cache {self.name}: failed to store {key}: {e}")
+            self._count("errors")
+            return
+        self._count("stores")
+
+    def touch(self, key: str) -> None:
+        """Mark an entry as used (revalidated with 304) so prune() keeps it."""
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Delete entries not used for `max_age_seconds` (and stray temp files)."""
+        horizon = time.time() - max_age_seconds
+        removed = 0
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            if not entry.is_file() or not (entry.name.endswith(self.suffix) or entry.name.endswith(".tmp")):
+                continue
+            try:
+                if entry.stat().st_mtime < horizon:
+                    os.unlink(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -4,11 +4,18 @@
 用于在 API 无法获取估值时，基于历史数据计算估值
 """
 import logging
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Sequence, Tuple
 from datetime import datetime
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+# 持仓估值：已报价持仓占净值比例低于该值时不估算（交给移动平均兜底）
+HOLDINGS_MIN_COVERAGE = 0.2
+# 已报价持仓占净值比例达到该值时置信度为 1
+HOLDINGS_FULL_COVERAGE = 0.6
+
 
 def estimate_with_weighted_ma(history: List[Dict], weights: List[float] = None) -> Optional[Dict[str, float]]:
     """
@@ -128,11 +135,228 @@ def estimate_with_simple_ma(history: List[Dict], days: int = 5) -> Optional[Dict
         return None
 
 
-def estimate_nav(code: str, history: List[Dict]) -> Optional[Dict[str, float]]:
+def estimate_with_holdings(
+    navs: np.ndarray,
+    fund_index: np.ndarray,
+    stock_index: np.ndarray,
+    weights: np.ndarray,
+    stock_changes: np.ndarray,
+) -> List[Optional[Dict[str, float]]]:
+    """
+    持仓加权估值算法（批量）
+
+    原理：
+    - 基金×股票的稀疏权重矩阵 W（COO 形式：fund_index, stock_index, weights）
+    - 股票今日涨跌幅向量 r（无报价为 NaN）
+    - 一次稀疏矩阵-向量乘 W·r 得到所有基金的持仓贡献，
+      除以已报价持仓权重，即以前十大持仓代表整个股票仓位的涨跌幅
+
+    Args:
+        navs: 各基金昨日净值，shape (n_funds,)
+        fund_index / stock_index: 每条持仓的基金 / 股票下标
+        weights: 每条持仓占净值比例（0-1）
+        stock_changes: 各股票今日涨跌幅(%)，shape (n_stocks,)
+
+    Returns:
+        与 navs 对齐的列表，元素格式同 estimate_with_weighted_ma（method="holdings"），
+        已报价持仓不足 HOLDINGS_MIN_COVERAGE 或净值无效时为 None
+    """
+    n_funds = len(navs)
+    if n_funds == 0:
+        return []
+
+    changes = stock_changes[stock_index]
+    quoted = ~np.isnan(changes)
+    contribution = np.bincount(fund_index, weights=np.where(quoted, weights * changes, 0.0), minlength=n_funds)
+    coverage = np.bincount(fund_index, weights=np.where(quoted, weights, 0.0), minlength=n_funds)
+
+    valid = (coverage >= HOLDINGS_MIN_COVERAGE) & (navs > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        est_rate = np.where(valid, contribution / coverage, 0.0)
+    estimate = navs * (1 + est_rate / 100)
+    confidence = np.minimum(coverage / HOLDINGS_FULL_COVERAGE, 1.0)
+
+    return [
+        {
+            "estimate": round(float(estimate[i]), 4),
+            "est_rate": round(float(est_rate[i]), 2),
+            "confidence": round(float(confidence[i]), 2),
+            "method": "holdings"
+        } if valid[i] else None
+        for i in range(n_funds)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# 估值算法注册表（批量 / 矩阵计算）
+# ---------------------------------------------------------------------------
+
+class Estimator:
+    """
+    历史涨跌幅估值算法基类。
+
+    estimate_batch 一次处理 基金×lookback 的涨跌幅矩阵（第 0 列为最近一日），
+    子类只需实现矩阵运算；注册后可按基金类别组合成估值链。
+    """
+    name = ""
+    lookback = 5       # 使用的最近涨跌幅个数
+    min_history = 2    # 至少需要的净值个数（= 涨跌幅个数 + 1）
+
+    def estimate_batch(self, returns: np.ndarray, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            returns: shape (n_funds, lookback)，涨跌幅(%)，returns[:, 0] 为最近一日，无效位置为 0
+            mask: 同形状布尔矩阵，True 为有效涨跌幅（每行从第 0 列起连续）
+
+        Returns:
+            (est_rate(%), confidence)，shape (n_funds,)；无法估算的基金为 NaN
+        """
+        raise NotImplementedError
+
+
+class WeightedMAEstimator(Estimator):
+    """批量版 estimate_with_weighted_ma：越近权重越大"""
+    name = "weighted_ma"
+    min_history = 5
+
+    def __init__(self, weights: Sequence[float] = (0.4, 0.3, 0.2, 0.07, 0.03)):
+        self.weights = np.asarray(weights, dtype=float)
+        self.lookback = len(self.weights)
+
+    def estimate_batch(self, returns, mask):
+        n = mask.sum(axis=1)
+        weights = np.where(mask, self.weights[:returns.shape[1]], 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = (returns * weights).sum(axis=1) / weights.sum(axis=1)
+            volatility = np.abs(returns).sum(axis=1) / n  # 平均波动率
+        confidence = np.minimum(n / self.lookback, 1.0)
+        confidence = np.where(volatility > 3.0, confidence * 0.8, confidence)  # 高波动降低置信度
+        ok = n >= 2
+        return np.where(ok, rate, np.nan), np.where(ok, confidence, np.nan)
+
+
+class SimpleMAEstimator(Estimator):
+    """批量版 estimate_with_simple_ma：近 N 日等权平均"""
+    name = "simple_ma"
+
+    def __init__(self, days: int = 5):
+        self.lookback = days
+
+    def estimate_batch(self, returns, mask):
+        n = mask.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(mask, returns, 0.0).sum(axis=1) / n
+        ok = n >= 1
+        return np.where(ok, rate, np.nan), np.where(ok, 0.6, np.nan)  # 简单平均置信度较低
+
+
+_ESTIMATORS: Dict[str, Estimator] = {}
+
+
+def register_estimator(estimator: Estimator) -> Estimator:
+    _ESTIMATORS[estimator.name] = estimator
+    return estimator
+
+
+def get_estimator(name: str) -> Estimator:
+    try:
+        return _ESTIMATORS[name]
+    except KeyError:
+        raise ValueError(f"Unknown estimator: {name}")
+
+
+register_estimator(WeightedMAEstimator())
+register_estimator(SimpleMAEstimator())
+
+# 按基金类别（fund.get_fund_category）选择估值链：依次尝试，取第一个能估算的结果。
+# 货币 / 偏债基金波动小，近期权重放大的是噪声，直接用等权平均。
+DEFAULT_ESTIMATOR_CHAIN = ("weighted_ma", "simple_ma")
+ESTIMATOR_CHAINS = {
+    "货币类": ("simple_ma",),
+    "偏债类": ("simple_ma",),
+}
+
+
+def estimator_chain(category: Optional[str]) -> Tuple[str, ...]:
+    return ESTIMATOR_CHAINS.get(category, DEFAULT_ESTIMATOR_CHAIN)
+
+
+def returns_matrix(nav_series: Sequence[Sequence[float]], lookback: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build the funds × lookback daily-change matrix from ascending NAV lists.
+
+    Returns:
+        (returns(%)，第 0 列为最近一日；mask)
+    """
+    navs = np.full((len(nav_series), lookback + 1), np.nan)
+    for i, values in enumerate(nav_series):
+        values = values[-(lookback + 1):]
+        if len(values):
+            navs[i, lookback + 1 - len(values):] = values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        changes = np.diff(navs, axis=1) / navs[:, :-1] * 100
+    changes = changes[:, ::-1]
+    mask = np.isfinite(changes)
+    return np.where(mask, changes, 0.0), mask
+
+
+def estimate_navs(
+    histories: Dict[str, List[Dict]],
+    categories: Optional[Dict[str, str]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    批量估值：每个估值算法对所有用到它的基金只做一次矩阵运算。
+
+    Args:
+        histories: {code: 历史净值（按日期升序）}
+        categories: {code: 基金类别}，决定估值链；缺省用 DEFAULT_ESTIMATOR_CHAIN
+
+    Returns:
+        {code: 估值结果字典（格式同 estimate_with_weighted_ma）}，无法估算的基金不出现在结果中
+    """
+    categories = categories or {}
+    nav_series = {}
+    for code, history in histories.items():
+        try:
+            nav_series[code] = [float(item["nav"]) for item in history or []]
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Fund {code}: invalid history for estimation: {e}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = {code: list(estimator_chain(categories.get(code))) for code in nav_series}
+    while pending:
+        # 按各基金估值链中下一个算法分组，每组一次批量计算
+        groups: Dict[str, List[str]] = {}
+        for code, chain in pending.items():
+            groups.setdefault(chain.pop(0), []).append(code)
+
+        for name, codes in groups.items():
+            estimator = get_estimator(name)
+            codes = [c for c in codes if len(nav_series[c]) >= estimator.min_history]
+            if not codes:
+                continue
+            returns, mask = returns_matrix([nav_series[c] for c in codes], estimator.lookback)
+            rates, confidences = estimator.estimate_batch(returns, mask)
+            for code, rate, confidence in zip(codes, rates, confidences):
+                if np.isnan(rate):
+                    continue
+                nav = nav_series[code][-1]
+                results[code] = {
+                    "estimate": round(nav * (1 + float(rate) / 100), 4),
+                    "est_rate": round(float(rate), 2),
+                    "confidence": round(float(confidence), 2),
+                    "method": name
+                }
+
+        pending = {code: chain for code, chain in pending.items() if chain and code not in results}
+    return results
+
+
+def estimate_nav(code: str, history: List[Dict], category: Optional[str] = None) -> Optional[Dict[str, float]]:
     """
     智能估值入口函数
 
-    根据历史数据量自动选择最佳算法：
+    按基金类别选择估值链（见 ESTIMATOR_CHAINS），默认：
     - 数据充足（>=5天）：使用加权移动平均
     - 数据较少（2-4天）：使用简单移动平均
     - 数据不足（<2天）：返回 None
@@ -140,6 +364,7 @@ def estimate_nav(code: str, history: List[Dict]) -> Optional[Dict[str, float]]:
     Args:
         code: 基金代码
         history: 历史净值数据
+        category: 基金类别（可选）
 
     Returns:
         估值结果字典
@@ -148,17 +373,7 @@ def estimate_nav(code: str, history: List[Dict]) -> Optional[Dict[str, float]]:
         logger.info(f"Fund {code}: insufficient history for estimation")
         return None
 
-    # 优先使用加权移动平均
-    if len(history) >= 5:
-        result = estimate_with_weighted_ma(history)
-        if result:
-            logger.info(f"Fund {code}: estimated using weighted MA, confidence={result['confidence']}")
-            return result
-
-    # 兜底：简单移动平均
-    result = estimate_with_simple_ma(history)
+    result = estimate_navs({code: history}, {code: category}).get(code)
     if result:
-        logger.info(f"Fund {code}: estimated using simple MA (fallback)")
-        return result
-
-    return None
+        logger.info(f"Fund {code}: estimated using {result['method']}, confidence={result['confidence']}")
+    return result
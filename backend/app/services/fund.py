@@ -3,22 +3,53 @@ import json
 import re
 import logging
 import atexit
-from typing import List, Dict, Any
+from concurrent.futures import FIRST_COMPLETED, TimeoutError as FuturesTimeoutError, wait
+from typing import List, Dict, Any, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import akshare as ak
 import requests
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
-from ..db import get_db_connection
+from ..db import PooledConnectionExecutor, get_db_connection, select_in_chunks
 from ..config import Config
+from .cache import TTLCache
+from . import circuit_breaker, deadline, pingzhong, rate_limit, source_routing
+from .indicators import get_fund_indicators, indicators_from_history, apply_nav, rebuild_indicator_state
+from .holdings import get_holdings_composition, get_holdings_cache_stats, load_latest_holdings
+from .trading_calendar import is_trading_time, seconds_until_next_session, next_trading_day, latest_session_date
+from .nav_publication import expected_nav_date, refresh_due, record_check
+from .pingzhong import parse_pingzhong
 
 logger = logging.getLogger(__name__)
 
-# Global HTTP session with connection pooling and retry strategy
+# Global HTTP session with connection pooling. No urllib3 retries: _http_get retries
+# explicitly so every attempt goes through the rate limiter, and under a deadline
+# only when the retry still fits the remaining budget
 _http_session = None
 
+_RETRY_TOTAL = 3
+_RETRY_BACKOFF = 0.5
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _new_session(max_retries) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        max_retries=max_retries,
+        pool_connections=10,
+        pool_maxsize=20,
+        pool_block=False  # 不阻塞，避免死锁
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    # 进程退出时关闭 session
+    atexit.register(session.close)
+    return session
+
+
 def _get_http_session():
     """
     Get or create a global HTTP session with connection pooling.
@@ -26,28 +57,74 @@ def _get_http_session():
     """
     global _http_session
     if _http_session is None:
-        _http_session = requests.Session()
-        # Configure retry strategy
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=0.5,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET", "POST"]
-        )
-        adapter = HTTPAdapter(
-            max_retries=retry_strategy,
-            pool_connections=10,
-            pool_maxsize=20,
-            pool_block=False  # 不阻塞，避免死锁
-        )
-        _http_session.mount("http://", adapter)
-        _http_session.mount("https://", adapter)
-
-        # 进程退出时关闭 session
-        atexit.register(_http_session.close)
+        _http_session = _new_session(0)
     return _http_session
 
 
+def _http_get(url: str, **kwargs) -> requests.Response:
+    """
+    GET through the shared session, throttled by the per-host token bucket and
+    guarded by the per-host circuit breaker (raises CircuitOpenError while open).
+    Transient failures (connection errors, timeouts, 429/5xx) are retried with
+    exponential backoff; every attempt, retries included, takes a token.
+
+    Under a request deadline (services/deadline.py) the timeout and the token wait
+    shrink to the remaining budget, retries are skipped when they cannot finish in
+    time, and DeadlineExceeded is raised once the budget is gone. Without one the
+    token wait is capped by RATE_LIMIT_MAX_WAIT (RateLimitTimeout).
+    """
+    breaker = circuit_breaker.breaker_for_url(url)
+    deadline.check()
+    if not breaker.allow():
+        raise circuit_breaker.CircuitOpenError(breaker.host)
+
+    requested = kwargs.pop("timeout", 5)
+    started = time.monotonic()
+    for attempt in range(_RETRY_TOTAL + 1):
+        budget = deadline.remaining()
+        wait_started = time.monotonic()
+        if not rate_limit.acquire_for_url(url, timeout=None if budget is None else max(0.0, budget)):
+            breaker.release()
+            if budget is None:
+                raise rate_limit.RateLimitTimeout(breaker.host)
+            deadline.count("exceeded")
+            raise deadline.DeadlineExceeded()
+        # 等令牌的时间不计入上游耗时（熔断统计 / 对冲用的 p95）
+        started += time.monotonic() - wait_started
+        try:
+            timeout = deadline.clamp_timeout(requested)
+        except deadline.DeadlineExceeded:
+            breaker.release()
+            raise
+        attempt_started = time.monotonic()
+        backoff = _RETRY_BACKOFF * (2 ** attempt)
+        try:
+            response = _get_http_session().get(url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if isinstance(e, requests.Timeout) and timeout < requested:
+                # 超时是预算截断造成的，不代表上游故障
+                breaker.release()
+                deadline.count("exceeded")
+                raise deadline.DeadlineExceeded() from e
+            if attempt < _RETRY_TOTAL and deadline.can_retry(time.monotonic() - attempt_started, backoff):
+                time.sleep(backoff)
+                continue
+            breaker.record(False, time.monotonic() - started)
+            raise
+        except Exception:
+            breaker.record(False, time.monotonic() - started)
+            raise
+        if (
+            response.status_code in _RETRY_STATUS and attempt < _RETRY_TOTAL
+            and deadline.can_retry(time.monotonic() - attempt_started, backoff)
+        ):
+            time.sleep(backoff)
+            continue
+        breaker.record(response.status_code not in _RETRY_STATUS, time.monotonic() - started)
+        return response
+    raise RuntimeError("unreachable")
+
+
 def get_fund_type(code: str, name: str) -> str:
     """
     Get fund type from database official_type field.
@@ -68,8 +145,11 @@ def get_fund_type(code: str, name: str) -> str:
     if row and row["type"]:
         return row["type"]
 
+    return guess_fund_type(name)
+
 
-    # Fallback: simple heuristics based on name
+def guess_fund_type(name: str) -> str:
+    """Fallback: simple heuristics based on name"""
     if "债" in name or "纯债" in name or "固收" in name:
         return "债券"
     if "QDII" in name or "纳斯达克" in name or "标普" in name or "恒生" in name:
@@ -124,33 +204,179 @@ def get_fund_category(fund_type: str) -> str:
     return "未分类"
 
 
-def get_eastmoney_valuation(code: str) -> Dict[str, Any]:
+def _parse_eastmoney_jsonp(text: str) -> Dict[str, Any]:
+    """
+    Parse fundgz response: jsonpgz({...});
+    """
+    # Regex to capture JSON content inside jsonpgz(...)
+    # Allow optional semicolon at end
+    match = re.search(r"jsonpgz\((.*)\)", text)
+    if match and match.group(1):
+        data = json.loads(match.group(1))
+        return {
+            "name": data.get("name"),
+            "nav": float(data.get("dwjz", 0.0)),
+            "estimate": float(data.get("gsz", 0.0)),
+            "estRate": float(data.get("gszzl", 0.0)),
+            "time": data.get("gztime"),
+            "navDate": data.get("jzrq")
+        }
+    return {}
+
+
+# Request / response handling below is shared with the async path (services/fund_async.py);
+# only the I/O differs between the two.
+EASTMONEY_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36)"
+}
+SINA_HEADERS = {"Referer": "http://finance.sina.com.cn"}
+
+
+def eastmoney_valuation_url(code: str) -> str:
+    return f"http://fundgz.1234567.com.cn/js/{code}.js?rt={int(time.time()*1000)}"
+
+
+def eastmoney_valuation_from_response(status_code: int, text: str) -> Optional[Dict[str, Any]]:
+    """
+    fundgz response -> valuation.
+
+    Returns:
+        估值字典；上游没有该基金（404）时为 {}，其他状态码为 None（按请求失败处理）
+    """
+    if status_code == 200:
+        return _parse_eastmoney_jsonp(text)
+    if status_code == 404:
+        return {}
+    return None
+
+
+def _fetch_eastmoney_valuation(code: str) -> Optional[Dict[str, Any]]:
     """
     Fetch real-time valuation from Tiantian Jijin (Eastmoney) API.
+
+    Returns:
+        估值字典；上游没有该基金时为 {}，请求失败时为 None
     """
-    url = f"http://fundgz.1234567.com.cn/js/{code}.js?rt={int(time.time()*1000)}"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36)"
-    }
     try:
-        response = _get_http_session().get(url, headers=headers, timeout=5)
-        if response.status_code == 200:
-            text = response.text
-            # Regex to capture JSON content inside jsonpgz(...)
-            # Allow optional semicolon at end
-            match = re.search(r"jsonpgz\((.*)\)", text)
-            if match and match.group(1):
-                data = json.loads(match.group(1))
-                return {
-                    "name": data.get("name"),
-                    "nav": float(data.get("dwjz", 0.0)),
-                    "estimate": float(data.get("gsz", 0.0)),
-                    "estRate": float(data.get("gszzl", 0.0)),
-                    "time": data.get("gztime")
-                }
+        response = _http_get(eastmoney_valuation_url(code), headers=EASTMONEY_HEADERS, timeout=5)
+        return eastmoney_valuation_from_response(response.status_code, response.text)
+    except (circuit_breaker.CircuitOpenError, deadline.DeadlineExceeded):
+        pass
     except Exception as e:
         logger.warning(f"Eastmoney API error for {code}: {e}")
-    return {}
+    return None
+
+
+def get_eastmoney_valuation(code: str) -> Dict[str, Any]:
+    """
+    Fetch real-time valuation from Tiantian Jijin (Eastmoney) API.
+    """
+    return _fetch_eastmoney_valuation(code) or {}
+
+
+# Bounded pool for per-code upstream fan-out (shared, avoids per-request executors)
+_valuation_pool = PooledConnectionExecutor(
+    max_workers=Config.VALUATION_FETCH_WORKERS,
+    thread_name_prefix="valuation"
+)
+
+
+def get_eastmoney_valuations(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch Eastmoney valuations for many codes concurrently.
+    fundgz only serves one code per request, so requests fan out on a bounded pool.
+
+    Returns:
+        Dict[code, valuation]，失败的基金不出现在结果中
+    """
+    results = {}
+    for code, data in zip(codes, _valuation_pool.map(deadline.bind(get_eastmoney_valuation), codes)):
+        if data:
+            results[code] = data
+    return results
+
+
+def _parse_sina_fund_line(line: str):
+    """
+    Parse one line of Sina fund response.
+    var hq_str_fu_005827="Name,15:00:00,1.234,1.230,...";
+
+    Returns:
+        (code, valuation) or None
+    """
+    if "hq_str_fu_" not in line or '"' not in line:
+        return None
+    code = line.split("=")[0].split("hq_str_fu_")[-1].strip()
+    data_part = line.split('"')[1]
+    if not code or not data_part:
+        return None
+    parts = data_part.split(',')
+    if len(parts) < 8:
+        return None
+    return code, {
+        # parts[0] is name (GBK), often garbled in utf-8 env, ignore it
+        "estimate": float(parts[2]),
+        "nav": float(parts[3]),
+        "estRate": float(parts[6]),
+        "time": f"{parts[7]} {parts[1]}"
+    }
+
+
+def sina_valuation_batches(codes: List[str]) -> List[Tuple[List[str], str]]:
+    """
+    The endpoint accepts a comma-separated symbol list, so N codes cost
+    ceil(N / SINA_BATCH_SIZE) requests.
+
+    Returns:
+        [(该批次的基金代码, 请求 URL), ...]
+    """
+    batch_size = Config.SINA_BATCH_SIZE
+    chunks = [codes[i:i + batch_size] for i in range(0, len(codes), batch_size)]
+    return [(chunk, f"http://hq.sinajs.cn/list={','.join(f'fu_{c}' for c in chunk)}") for chunk in chunks]
+
+
+def parse_sina_valuations(text: str) -> Dict[str, Dict[str, Any]]:
+    """Parse a multi-symbol Sina response (one line per fund, malformed lines skipped)."""
+    results = {}
+    for line in text.strip().split('\n'):
+        try:
+            parsed = _parse_sina_fund_line(line)
+        except ValueError:
+            continue
+        if parsed:
+            results[parsed[0]] = parsed[1]
+    return results
+
+
+def _fetch_sina_valuations(codes: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    Backup source: Sina Fund API, batched (see sina_valuation_batches).
+
+    Returns:
+        (Dict[code, valuation], 请求失败的批次中的基金代码)
+    """
+    results = {}
+    failed = []
+    for chunk, url in sina_valuation_batches(codes):
+        try:
+            response = _http_get(url, headers=SINA_HEADERS, timeout=5)
+            results.update(parse_sina_valuations(response.text))
+        except (circuit_breaker.CircuitOpenError, deadline.DeadlineExceeded):
+            failed.extend(chunk)
+        except Exception as e:
+            logger.warning(f"Sina Valuation API error for {len(chunk)} codes: {e}")
+            failed.extend(chunk)
+    return results, failed
+
+
+def get_sina_valuations(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Backup source: Sina Fund API, batched.
+
+    Returns:
+        Dict[code, valuation]，失败的基金不出现在结果中
+    """
+    return _fetch_sina_valuations(codes)[0]
 
 
 def get_sina_valuation(code: str) -> Dict[str, Any]:
@@ -158,83 +384,540 @@ def get_sina_valuation(code: str) -> Dict[str, Any]:
     Backup source: Sina Fund API.
     Format: Name, Time, Estimate, NAV, ..., Rate, Date
     """
-    url = f"http://hq.sinajs.cn/list=fu_{code}"
-    headers = {"Referer": "http://finance.sina.com.cn"}
-    try:
-        response = _get_http_session().get(url, headers=headers, timeout=5)
-        text = response.text
-        # var hq_str_fu_005827="Name,15:00:00,1.234,1.230,...";
-        match = re.search(r'="(.*)"', text)
-        if match and match.group(1):
-            parts = match.group(1).split(',')
-            if len(parts) >= 8:
-                return {
-                    # parts[0] is name (GBK), often garbled in utf-8 env, ignore it
-                    "estimate": float(parts[2]),
-                    "nav": float(parts[3]),
-                    "estRate": float(parts[6]),
-                    "time": f"{parts[7]} {parts[1]}"
-                }
-    except Exception as e:
-        logger.warning(f"Sina Valuation API error for {code}: {e}")
-    return {}
+    return get_sina_valuations([code]).get(code, {})
+
+
+def _routed_eastmoney_valuations(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Eastmoney valuations for the codes it is known to cover (see services/source_routing.py).
+
+    Returns:
+        Dict[code, valuation]，跳过或失败的基金不出现在结果中
+    """
+    queried = source_routing.select_codes(source_routing.EASTMONEY, codes)
+    if len(queried) == 1:
+        fetched = [_fetch_eastmoney_valuation(queried[0])]
+    else:
+        fetched = list(_valuation_pool.map(deadline.bind(_fetch_eastmoney_valuation), queried))
+    return record_eastmoney_results(queried, fetched)
+
+
+def _routed_sina_valuations(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Sina counterpart of _routed_eastmoney_valuations."""
+    queried = source_routing.select_codes(source_routing.SINA, codes)
+    if not queried:
+        return {}
+    results, failed = _fetch_sina_valuations(queried)
+    record_source_results(source_routing.SINA, queried, results, failed)
+    return results
+
+
+def record_source_results(
+    source: str, queried: List[str], results: Dict[str, Dict[str, Any]], failed: List[str]
+) -> None:
+    """Feed one source's outcome to source_routing: a hit is a fund that came back with an estimate."""
+    source_routing.record_results(
+        source, queried,
+        hits=[c for c, data in results.items() if _has_estimate(data)],
+        failed=failed
+    )
+
+
+def record_eastmoney_results(
+    queried: List[str], fetched: List[Optional[Dict[str, Any]]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-code Eastmoney fetches ({} = not covered, None = request failed) -> results,
+    recorded to source_routing.
+    """
+    results = {code: data for code, data in zip(queried, fetched) if data}
+    record_source_results(
+        source_routing.EASTMONEY, queried, results,
+        [c for c, data in zip(queried, fetched) if data is None]
+    )
+    return results
+
+
+def _valuation_ttl() -> float:
+    """
+    估值缓存 TTL：盘中短 TTL 跟随估值刷新；非交易时段使用长 TTL，
+    但不超过下一个交易时段开盘，保证开盘后第一次请求拿到新估值。
+    """
+    if is_trading_time():
+        return Config.VALUATION_CACHE_TTL_TRADING
+    return max(1.0, min(Config.VALUATION_CACHE_TTL_CLOSED, seconds_until_next_session()))
+
+
+# Process-wide valuation cache (shared across users and background jobs)
+# (expired entries stay readable for VALUATION_STALE_TTL, served only when a
+# request deadline runs out before upstream answers)
+_valuation_cache = TTLCache(
+    "valuation",
+    max_size=Config.VALUATION_CACHE_MAX_SIZE,
+    ttl=_valuation_ttl,
+    stale_ttl=Config.VALUATION_STALE_TTL
+)
+
+
+def _is_cacheable_valuation(data: Dict[str, Any]) -> bool:
+    """上游全部失败时的空结果、预算耗尽时返回的旧值不缓存，下次请求重新尝试"""
+    return bool(data) and float(data.get("nav") or 0) > 0 and not data.get("stale")
+
+
+def _serve_stale_valuations(codes: List[str], results: Dict[str, Dict[str, Any]]) -> List[str]:
+    """
+    请求预算耗尽时，用过期缓存（VALUATION_STALE_TTL 内）补齐缺失的估值，标记 "stale": true。
+
+    Returns:
+        仍缺失估值的基金（交给估值算法兜底）
+    """
+    if not deadline.expired():
+        return codes
+    remaining = []
+    for code in codes:
+        value, state = _valuation_cache.peek(code)
+        if state == "stale":
+            deadline.count("stale_served")
+            results[code] = {**value, "stale": True}
+        else:
+            remaining.append(code)
+    return remaining
+
+
+def get_valuation_cache_stats() -> Dict[str, Any]:
+    return _valuation_cache.stats()
 
 
 def get_combined_valuation(code: str) -> Dict[str, Any]:
     """
-    获取基金估值，优先级：
-    1. Eastmoney API
-    2. Sina API
-    3. 自定义算法估值（基于历史数据）
-    4. 兜底：返回昨日净值
+    获取基金估值（带进程级缓存）。
+
+    同一基金在 TTL 内只请求一次上游，并发 miss 合并为一次请求。
+    返回副本，调用方可以自由修改。
     """
-    # 1. Try Eastmoney
-    data = get_eastmoney_valuation(code)
-    if data and data.get("estimate") and data.get("estimate") > 0:
+    data = _valuation_cache.get_or_load(
+        code, _fetch_combined_valuation, should_cache=_is_cacheable_valuation
+    )
+    return dict(data) if data else {}
+
+
+def _has_estimate(data: Dict[str, Any]) -> bool:
+    return bool(data) and bool(data.get("estimate")) and data.get("estimate") > 0
+
+
+def _merge_sina_valuation(data: Dict[str, Any], sina_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Sina 估值覆盖 Eastmoney 的空估值，保留 Eastmoney 的基金名称"""
+    if data:
+        data.update(sina_data)
         return data
+    return sina_data
 
-    # 2. Fallback to Sina
-    sina_data = get_sina_valuation(code)
-    if sina_data and sina_data.get("estimate") and sina_data.get("estimate") > 0:
-        if data:
-            data.update(sina_data)
-            return data
-        return sina_data
 
-    # 3. Try custom estimation algorithm
-    from .estimate import estimate_nav
-    from datetime import datetime
+# Valuation sources in preferred order (Eastmoney keeps the fund name) and their hosts
+VALUATION_SOURCE_HOSTS = {
+    source_routing.EASTMONEY: "fundgz.1234567.com.cn",
+    source_routing.SINA: "hq.sinajs.cn",
+}
+
+# Runs the primary source while the caller waits for its hedge deadline
+# (separate from _valuation_pool, which the Eastmoney fan-out itself uses)
+_hedge_pool = PooledConnectionExecutor(
+    max_workers=Config.VALUATION_FETCH_WORKERS,
+    thread_name_prefix="valuation-hedge"
+)
+
+
+def valuation_source_order() -> List[str]:
+    """Valuation sources, healthiest first (see circuit_breaker.order_hosts)."""
+    hosts = circuit_breaker.order_hosts(list(VALUATION_SOURCE_HOSTS.values()))
+    by_host = {host: source for source, host in VALUATION_SOURCE_HOSTS.items()}
+    return [by_host[host] for host in hosts]
+
+
+def hedge_delay(source: str, n_codes: int) -> float:
+    """
+    等待主数据源多久后发出对冲请求：单次请求的 p95 × 请求轮数
+    （Eastmoney 每只基金一个请求、按并发上限分轮；Sina 每 SINA_BATCH_SIZE 只一个请求）。
+    """
+    per_round = Config.VALUATION_FETCH_WORKERS if source == source_routing.EASTMONEY else Config.SINA_BATCH_SIZE
+    rounds = max(1, -(-n_codes // per_round))
+    return circuit_breaker.get_breaker(VALUATION_SOURCE_HOSTS[source]).hedge_delay() * rounds
+
+
+def _merge_source_results(
+    codes: List[str], maps: Dict[str, Dict[str, Dict[str, Any]]]
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    em_map = maps.get(source_routing.EASTMONEY, {})
+    sina_map = maps.get(source_routing.SINA, {})
+    results, partial = {}, {}
+    for code in codes:
+        data = em_map.get(code, {})
+        if _has_estimate(data):
+            results[code] = data
+        elif _has_estimate(sina_map.get(code, {})):
+            results[code] = _merge_sina_valuation(dict(data), sina_map[code])
+        else:
+            partial[code] = data
+    return results, partial
+
+
+def _covered(codes: List[str], maps: Dict[str, Dict[str, Dict[str, Any]]]) -> bool:
+    return all(any(_has_estimate(m.get(code, {})) for m in maps.values()) for code in codes)
+
+
+def _bounded_wait(timeout: Optional[float]) -> Optional[float]:
+    """Cap a wait by the request deadline (None: no limit)."""
+    left = deadline.remaining()
+    if left is None:
+        return timeout
+    return max(0.0, left) if timeout is None else max(0.0, min(timeout, left))
 
+
+def _fetch_upstream_valuations(codes: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """
+    Eastmoney / Sina valuations with health-based ordering and hedging.
+
+    主数据源在 hedge_delay 内返回：缺估值的基金再问备用源（与原先的顺序降级一致）；
+    超时未返回：立即对同一批基金发出备用源请求，先拿到完整估值的一方胜出，
+    另一方继续在后台完成（结果仍计入数据源路由和熔断统计）。
+
+    Returns:
+        (Dict[code, 有估值的结果], Dict[code, 无估值时 Eastmoney 的原始数据（名称 / 净值，供兜底使用）])
+    """
+    fetchers = {
+        source_routing.EASTMONEY: _routed_eastmoney_valuations,
+        source_routing.SINA: _routed_sina_valuations,
+    }
+    race = ValuationRace(codes)
+
+    future = _hedge_pool.submit(deadline.bind(fetchers[race.primary]), codes)
+    done, _ = wait([future], timeout=race.hedge_after())
+    if done:
+        race.add(race.primary, future)
+        missing = race.missing()
+        if missing:
+            race.maps[race.secondary] = fetchers[race.secondary](missing)
+    else:
+        # Hedge: primary is slower than its p95, ask the secondary too
+        pending = {future: race.primary}
+        if race.should_hedge():
+            pending[_hedge_pool.submit(deadline.bind(fetchers[race.secondary]), codes)] = race.secondary
+        while pending and not race.covered():
+            done, _ = wait(pending, timeout=_bounded_wait(None), return_when=FIRST_COMPLETED)
+            if not done:
+                break  # 请求预算耗尽，缺失的基金由调用方用旧值 / 估值算法补齐
+            for finished in done:
+                race.add(pending.pop(finished), finished)
+    return race.merged()
+
+
+class ValuationRace:
+    """
+    State of one hedged Eastmoney / Sina lookup (see _fetch_upstream_valuations).
+
+    Source order, hedge timing, when the secondary is asked and how results merge
+    are decided here; the sync (thread futures) and async (asyncio tasks) drivers
+    only submit fetches and wait.
+    """
+
+    def __init__(self, codes: List[str]):
+        self.codes = codes
+        self.primary, self.secondary = valuation_source_order()
+        self.maps: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def hedge_after(self) -> Optional[float]:
+        """How long to wait for the primary before hedging (capped by the request deadline)."""
+        return _bounded_wait(hedge_delay(self.primary, len(self.codes)))
+
+    def should_hedge(self) -> bool:
+        return not deadline.expired()
+
+    def add(self, source: str, finished) -> None:
+        """Record a finished fetch (concurrent.futures.Future or asyncio.Task); a failed source counts as empty."""
+        try:
+            self.maps[source] = finished.result()
+        except Exception as e:
+            logger.warning(f"Valuation source failed: {e}")
+            self.maps[source] = {}
+
+    def missing(self) -> List[str]:
+        """Codes the primary returned without an estimate (asked of the secondary next)."""
+        return [c for c in self.codes if not _has_estimate(self.maps[self.primary].get(c, {}))]
+
+    def covered(self) -> bool:
+        return _covered(self.codes, self.maps)
+
+    def merged(self) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        return _merge_source_results(self.codes, self.maps)
+
+
+def _fetch_combined_valuation(code: str) -> Dict[str, Any]:
+    """
+    获取基金估值，优先级：
+    1. Eastmoney API / Sina API（按健康度排序，主源慢于 p95 时对冲请求备用源）
+    2. 自定义算法估值（基于历史数据）
+    3. 兜底：返回昨日净值
+    """
+    results, partial = _fetch_upstream_valuations([code])
+    if code in results:
+        return results[code]
+    if not _serve_stale_valuations([code], results):
+        return results[code]
+    return _fallback_valuation(code, partial.get(code, {}))
+
+
+def _fetch_combined_valuations(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    批量获取估值，优先级同 _fetch_combined_valuation：
+    Eastmoney 并发拉取 / Sina 批量请求 -> 仍缺失的走估值算法兜底。
+    已知不覆盖某基金的数据源直接跳过（见 services/source_routing.py）。
+    """
+    return fill_missing_valuations(codes, *_fetch_upstream_valuations(codes))
+
+
+def fill_missing_valuations(
+    codes: List[str], results: Dict[str, Dict[str, Any]], partial: Dict[str, Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    补齐上游没有给出估值的基金：请求预算耗尽时先用过期缓存，其余走估值算法兜底
+    （_valuation_pool 并发）。阻塞调用，异步路径放到线程池执行。
+
+    Args:
+        results: 上游有估值的结果（原地补齐）
+        partial: 无估值时 Eastmoney 的原始数据（名称 / 净值）
+    """
+    still_missing = _serve_stale_valuations([c for c in codes if c not in results], results)
+    if still_missing:
+        estimates = _precompute_fallback_estimates(still_missing)
+        fallbacks = _valuation_pool.map(
+            deadline.bind(lambda c: _fallback_valuation(c, partial.get(c, {}), estimates)), still_missing
+        )
+        results.update(zip(still_missing, fallbacks))
+    return results
+
+
+def get_combined_valuations(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    批量获取基金估值（带进程级缓存）。
+
+    缓存命中的直接返回，其余基金一次性批量拉取。
+
+    Args:
+        codes: 基金代码列表
+
+    Returns:
+        Dict[code, valuation]，每个 code 都有结果（获取失败时为零值兜底）
+    """
+    codes = list(dict.fromkeys(c for c in codes if c))
+    if not codes:
+        return {}
+    cached = _valuation_cache.get_or_load_many(
+        codes, _fetch_combined_valuations, should_cache=_is_cacheable_valuation
+    )
+    return valuation_copies(codes, cached)
+
+
+def valuation_copies(codes: List[str], found: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per-code copies of (cached) valuations, zero-valued placeholders for the ones still missing."""
+    return {
+        code: dict(found[code]) if found.get(code) else _empty_valuation(code)
+        for code in codes
+    }
+
+
+def _empty_valuation(code: str) -> Dict[str, Any]:
+    return {"code": code, "name": code, "nav": 0, "estimate": 0, "estRate": 0}
+
+
+def estimate_by_holdings(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Holdings-weighted estimates for many funds at once.
+
+    用数据库中的最新季报持仓构建基金×股票稀疏权重矩阵，一次批量股票行情请求
+    加一次稀疏矩阵-向量乘得到所有基金的估值（见 estimate.estimate_with_holdings）。
+    行情对应交易日的净值已公布的基金不估算（否则涨跌幅会重复计入）。
+
+    Returns:
+        {code: {"estimate", "est_rate", "confidence", "method", "nav", "navDate"}}，
+        无法估算的基金不出现在结果中
+    """
+    from .estimate import estimate_with_holdings
+
+    codes = list(dict.fromkeys(c for c in codes if c))
+    if not codes:
+        return {}
+    holdings = load_latest_holdings(codes)
+    if not holdings:
+        return {}
+
+    # 最新净值（批量）
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    latest_nav = {}
+    fund_codes = list(holdings)
+    for row in select_in_chunks(cursor, """
+        SELECT h.code, h.date, h.nav FROM fund_history h
+        JOIN (
+            SELECT code, MAX(date) AS date FROM fund_history
+            WHERE code IN ({placeholders})
+            GROUP BY code
+        ) latest ON latest.code = h.code AND latest.date = h.date
+    """, fund_codes):
+        latest_nav[row["code"]] = (row["date"], float(row["nav"]))
+
+    session_str = latest_session_date().strftime("%Y-%m-%d")
+    fund_codes = [c for c in fund_codes if c in latest_nav and latest_nav[c][0] < session_str]
+    if not fund_codes:
+        return {}
+
+    # COO triplets of the fund × stock weight matrix
+    stock_ids: Dict[str, int] = {}
+    fund_index, stock_index, weights = [], [], []
+    for i, code in enumerate(fund_codes):
+        for stock_code, percent in holdings[code]:
+            fund_index.append(i)
+            stock_index.append(stock_ids.setdefault(stock_code, len(stock_ids)))
+            weights.append(float(percent) / 100)
+
+    spot_map = _fetch_stock_spots_sina(list(stock_ids))
+    stock_changes = np.full(len(stock_ids), np.nan)
+    for stock_code, idx in stock_ids.items():
+        if stock_code in spot_map:
+            stock_changes[idx] = spot_map[stock_code]
+
+    navs = np.array([latest_nav[c][1] for c in fund_codes])
+    estimates = estimate_with_holdings(
+        navs,
+        np.array(fund_index, dtype=np.intp),
+        np.array(stock_index, dtype=np.intp),
+        np.array(weights),
+        stock_changes,
+    )
+
+    results = {}
+    for code, nav, est in zip(fund_codes, navs, estimates):
+        if est:
+            results[code] = {**est, "nav": float(nav), "navDate": latest_nav[code][0]}
+    return results
+
+
+def _estimate_by_holdings_safe(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    if not codes:
+        return {}
     try:
-        history = get_fund_history(code, limit=30)
-        if history and len(history) >= 2:
-            ml_result = estimate_nav(code, history)
-            if ml_result:
-                yesterday_nav = float(history[-1]["nav"])
-
-                # Get fund name from database if not available from API
-                fund_name = data.get("name") if data else None
-                if not fund_name or fund_name == code:
-                    conn = get_db_connection()
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT name FROM funds WHERE code = ?", (code,))
-                    row = cursor.fetchone()
-                    fund_name = row["name"] if row else code
-
-                return {
-                    "code": code,
-                    "name": fund_name,
-                    "nav": yesterday_nav,
-                    "navDate": history[-1]["date"],
-                    "estimate": ml_result["estimate"],
-                    "estRate": ml_result["est_rate"],
-                    "time": datetime.now().strftime("%H:%M"),
-                    "source": "ml_estimate",  # 标记来源
-                    "confidence": ml_result.get("confidence", 0),
-                    "method": ml_result.get("method", "unknown")
-                }
+        return estimate_by_holdings(codes)
     except Exception as e:
-        logger.error(f"Custom estimation failed for {code}: {e}")
+        logger.error(f"Holdings estimation failed: {e}")
+        return {}
+
+
+def _load_fund_categories(codes: List[str]) -> Dict[str, str]:
+    """Batch get_fund_category from funds.type (codes missing from the table are omitted)."""
+    categories = {}
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    for row in select_in_chunks(cursor, "SELECT code, name, type FROM funds WHERE code IN ({placeholders})", codes):
+        categories[row["code"]] = get_fund_category(row["type"] or guess_fund_type(row["name"] or ""))
+    return categories
+
+
+def estimate_by_history(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    History-based estimates for many funds at once.
+
+    历史净值经共享缓存批量加载，按基金类别选择估值链，
+    每个估值算法对所有基金只做一次矩阵运算（见 estimate.estimate_navs）。
+
+    Returns:
+        {code: {"estimate", "est_rate", "confidence", "method", "nav", "navDate"}}，
+        无法估算的基金不出现在结果中
+    """
+    from .estimate import estimate_navs
+
+    codes = list(dict.fromkeys(c for c in codes if c))
+    if not codes:
+        return {}
+    histories = {}
+    for code, history in get_fund_histories(codes, limit=30).items():
+        if isinstance(history, Exception):
+            logger.error(f"Custom estimation failed for {code}: {history}")
+        elif history and len(history) >= 2:
+            histories[code] = history
+
+    results = {}
+    for code, est in estimate_navs(histories, _load_fund_categories(list(histories))).items():
+        last = histories[code][-1]
+        results[code] = {**est, "nav": float(last["nav"]), "navDate": last["date"]}
+    return results
+
+
+def _estimate_by_history_safe(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    if not codes:
+        return {}
+    try:
+        return estimate_by_history(codes)
+    except Exception as e:
+        logger.error(f"Custom estimation failed: {e}")
+        return {}
+
+
+def _precompute_fallback_estimates(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    批量路径的兜底估值：持仓加权优先，其余基金一次性走历史估值算法。
+
+    Returns:
+        {code: estimate}，供 _fallback_valuation 直接使用
+    """
+    estimates = _estimate_by_holdings_safe(codes)
+    estimates.update(_estimate_by_history_safe([c for c in codes if c not in estimates]))
+    return estimates
+
+
+def _lookup_fund_name(code: str, data: Dict[str, Any]) -> str:
+    # Get fund name from database if not available from API
+    fund_name = data.get("name") if data else None
+    if not fund_name or fund_name == code:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM funds WHERE code = ?", (code,))
+        row = cursor.fetchone()
+        fund_name = row["name"] if row else code
+    return fund_name
+
+
+def _fallback_valuation(
+    code: str,
+    data: Dict[str, Any],
+    estimates: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    上游均无估值时的兜底：
+    3a. 持仓加权估值（季报持仓 × 股票实时涨跌幅）
+    3b. 自定义算法估值（基于历史数据）
+    4. 兜底：返回昨日净值
+
+    Args:
+        estimates: 批量路径预先计算好的 _precompute_fallback_estimates 结果
+    """
+    from datetime import datetime
+
+    if estimates is None:
+        estimates = _precompute_fallback_estimates([code])
+
+    est = estimates.get(code)
+    if est:
+        return {
+            "code": code,
+            "name": _lookup_fund_name(code, data),
+            "nav": est["nav"],
+            "navDate": est["navDate"],
+            "estimate": est["estimate"],
+            "estRate": est["est_rate"],
+            "time": datetime.now().strftime("%H:%M"),
+            "source": "holdings_estimate" if est["method"] == "holdings" else "ml_estimate",  # 标记来源
+            "confidence": est["confidence"],
+            "method": est["method"]
+        }
 
     # 4. Final fallback: return yesterday's NAV as estimate
     if data:
@@ -267,7 +950,7 @@ def get_combined_valuation(code: str) -> Dict[str, Any]:
     except:
         pass
 
-    return {"code": code, "name": code, "nav": 0, "estimate": 0, "estRate": 0}
+    return _empty_valuation(code)
 
 
 def search_funds(q: str) -> List[Dict[str, Any]]:
@@ -315,75 +998,52 @@ def search_funds(q: str) -> List[Dict[str, Any]]:
 def get_eastmoney_pingzhong_data(code: str) -> Dict[str, Any]:
     """
     Fetch static detailed data from Eastmoney (PingZhongData).
+
+    条件请求：磁盘上有上次的响应时带 ETag / Last-Modified，304 直接解析本地副本。
     """
     url = Config.EASTMONEY_DETAILED_API_URL.format(code=code)
+    cached = pingzhong.load_cached(code)
     try:
-        response = _get_http_session().get(url, timeout=5)
-        if response.status_code == 200:
-            text = response.text
-            data = {}
-            name_match = re.search(r'fS_name\s*=\s*"(.*?)";', text)
-            if name_match: data["name"] = name_match.group(1)
-            
-            code_match = re.search(r'fS_code\s*=\s*"(.*?)";', text)
-            if code_match: data["code"] = code_match.group(1)
-            
-            manager_match = re.search(r'Data_currentFundManager\s*=\s*(\[.+?\])\s*;\s*/\*', text)
-            if manager_match:
-                try:
-                    managers = json.loads(manager_match.group(1))
-                    if managers:
-                        data["manager"] = ", ".join([m["name"] for m in managers])
-                except:
-                    pass
-
-            # Extract Performance Metrics
-            for key in ["syl_1n", "syl_6y", "syl_3y", "syl_1y"]:
-                m = re.search(rf'{key}\s*=\s*"(.*?)";', text)
-                if m: data[key] = m.group(1)
-
-            # Extract Performance Evaluation (Capability Scores)
-            # var Data_performanceEvaluation = {"avr":"72.25","categories":[...],"data":[80.0,70.0...]};
-            # Match until `};`
-            perf_match = re.search(r'Data_performanceEvaluation\s*=\s*(\{.+?\})\s*;\s*/\*', text)
-            if perf_match:
-                try:
-                    perf = json.loads(perf_match.group(1))
-                    if perf and "data" in perf and "categories" in perf:
-                        data["performance"] = dict(zip(perf["categories"], perf["data"]))
-                except:
-                    pass
-
-            # Extract Full History (Data_netWorthTrend)
-            # var Data_netWorthTrend = [{"x":1536076800000,"y":1.0,...},...];
-            # Relaxed regex: allow various endings (;/* or ; or ;\n)
-            history_match = re.search(r'Data_netWorthTrend\s*=\s*(\[.+?\])\s*;', text, re.DOTALL)
-            if history_match:
-                try:
-                    raw_hist = json.loads(history_match.group(1))
-                    if not raw_hist:
-                        logger.warning(f"Empty Data_netWorthTrend for {code}")
-                    else:
-                        # Convert to standard format: [{"date": "YYYY-MM-DD", "nav": 1.23}, ...]
-                        # x is ms timestamp
-                        data["history"] = [
-                            {
-                                "date": time.strftime('%Y-%m-%d', time.localtime(item['x']/1000)),
-                                "nav": float(item['y'])
-                            }
-                            for item in raw_hist
-                            if 'x' in item and 'y' in item  # Validate data structure
-                        ]
-                except Exception as e:
-                    logger.error(f"Failed to parse Data_netWorthTrend for {code}: {e}")
-            else:
-                # Data_netWorthTrend not found - may be 货币基金 or new page structure
-                logger.warning(f"Data_netWorthTrend not found for {code}")
-
-            return data
+        response = _http_get(url, timeout=5, headers=pingzhong.conditional_headers(cached))
+        payload = pingzhong.payload_from_response(
+            code, cached, response.status_code, response.content, response.headers
+        )
     except Exception as e:
         logger.warning(f"PingZhong API error for {code}: {e}")
-    return {}
+        payload = pingzhong.payload_from_response(code, cached)
+    return parse_pingzhong(payload, code) if payload else {}
+
+
+def get_fund_names(codes: List[str]) -> Dict[str, str]:
+    """Batch lookup of fund names from the local funds table."""
+    names = {}
+    if not codes:
+        return names
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    for row in select_in_chunks(cursor, "SELECT code, name FROM funds WHERE code IN ({placeholders})", codes):
+        names[row["code"]] = row["name"]
+    return names
+
+
+def build_fund_quotes(codes: List[str], valuations: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Lightweight quote rows (the headline fields of the fund detail payload).
+    """
+    names = get_fund_names(codes)
+    quotes = []
+    for code in codes:
+        data = valuations.get(code) or {}
+        quotes.append({
+            "id": code,
+            "name": data.get("name") or names.get(code) or code,
+            "nav": float(data.get("nav", 0.0) or 0.0),
+            "estimate": float(data.get("estimate", 0.0) or 0.0),
+            "estRate": float(data.get("estRate", 0.0) or 0.0),
+            "time": data.get("time"),
+            "source": data.get("source"),
+        })
+    return quotes
 
 
 def _get_fund_info_from_db(code: str) -> Dict[str, Any]:
@@ -402,105 +1062,129 @@ def _get_fund_info_from_db(code: str) -> Dict[str, Any]:
     return {}
 
 
-def _fetch_stock_spots_sina(codes: List[str]) -> Dict[str, float]:
+def _to_sina_stock_symbol(code: str) -> Optional[str]:
     """
-    Fetch real-time stock prices from Sina API in batch.
+    Normalize a stock code to its Sina symbol.
     Supports A-share (sh/sz), HK (hk), US (gb_).
     """
-    if not codes:
-        return {}
-    
-    formatted = []
-    # Map cleaned code back to original for result dict
-    code_map = {} 
-    
-    for c in codes:
-        if not c: continue
-        c_str = str(c).strip()
-        prefix = ""
-        clean_c = c_str
-        
-        # Detect Market
-        if c_str.isdigit():
-            if len(c_str) == 6:
-                # A-share
-                prefix = "sh" if c_str.startswith(('60', '68', '90', '11')) else "sz"
-            elif len(c_str) == 5:
-                # HK
-                prefix = "hk"
-        elif c_str.isalpha():
-            # US
-            prefix = "gb_"
-            clean_c = c_str.lower()
-        
-        if prefix:
-            sina_code = f"{prefix}{clean_c}"
-            formatted.append(sina_code)
-            code_map[sina_code] = c_str
-            
-    if not formatted:
-        return {}
+    c_str = str(code).strip() if code else ""
+    if not c_str:
+        return None
+
+    # Detect Market
+    if c_str.isdigit():
+        if len(c_str) == 6:
+            # A-share
+            prefix = "sh" if c_str.startswith(('60', '68', '90', '11')) else "sz"
+            return f"{prefix}{c_str}"
+        if len(c_str) == 5:
+            # HK
+            return f"hk{c_str}"
+    elif c_str.isalpha():
+        # US
+        return f"gb_{c_str.lower()}"
+    return None
 
-    url = f"http://hq.sinajs.cn/list={','.join(formatted)}"
+
+def _parse_sina_stock_change(symbol: str, data_part: str) -> float:
+    parts = data_part.split(',')
+    if symbol.startswith("gb_"):
+        # US: name, price, change_percent, ...
+        # Example: "英伟达,135.20,2.55,..."
+        if len(parts) > 2:
+            return float(parts[2])
+    elif symbol.startswith("hk"):
+        # HK: en, ch, open, prev_close, high, low, last, ...
+        if len(parts) > 6:
+            prev_close = float(parts[3])
+            last = float(parts[6])
+            if prev_close > 0:
+                return round((last - prev_close) / prev_close * 100, 2)
+    else:
+        # A-share: name, open, prev_close, last, ...
+        if len(parts) > 3:
+            prev_close = float(parts[2])
+            last = float(parts[3])
+            if prev_close > 0:
+                return round((last - prev_close) / prev_close * 100, 2)
+    return 0.0
+
+
+def _fetch_sina_stock_changes(symbols: List[str]) -> Dict[str, float]:
+    """
+    Fetch today's change (%) for Sina symbols, SINA_BATCH_SIZE per request.
+    Failed requests are left out of the result (not cached).
+    """
     headers = {"Referer": "http://finance.sina.com.cn"}
-    
-    try:
-        response = _get_http_session().get(url, headers=headers, timeout=5)
-        results = {}
+    results = {}
+    for i in range(0, len(symbols), Config.SINA_BATCH_SIZE):
+        chunk = symbols[i:i + Config.SINA_BATCH_SIZE]
+        url = f"http://hq.sinajs.cn/list={','.join(chunk)}"
+        try:
+            response = _http_get(url, headers=headers, timeout=5)
+        except Exception as e:
+            logger.warning(f"Sina fetch failed: {e}")
+            continue
+
+        requested = set(chunk)
         for line in response.text.strip().split('\n'):
             if not line or '=' not in line or '"' not in line: continue
-            
+
             # var hq_str_sh600519="..."
-            line_key = line.split('=')[0].split('_str_')[-1] # sh600519 or hk00700 or gb_nvda
-            original_code = code_map.get(line_key)
-            if not original_code: continue
+            symbol = line.split('=')[0].split('_str_')[-1] # sh600519 or hk00700 or gb_nvda
+            if symbol not in requested: continue
 
             data_part = line.split('"')[1]
             if not data_part: continue
-            parts = data_part.split(',')
-            
-            change = 0.0
             try:
-                if line_key.startswith("gb_"):
-                    # US: name, price, change_percent, ...
-                    # Example: "英伟达,135.20,2.55,..."
-                    if len(parts) > 2:
-                        change = float(parts[2])
-                elif line_key.startswith("hk"):
-                    # HK: en, ch, open, prev_close, high, low, last, ...
-                    if len(parts) > 6:
-                        prev_close = float(parts[3])
-                        last = float(parts[6])
-                        if prev_close > 0:
-                            change = round((last - prev_close) / prev_close * 100, 2)
-                else:
-                    # A-share: name, open, prev_close, last, ...
-                    if len(parts) > 3:
-                        prev_close = float(parts[2])
-                        last = float(parts[3])
-                        if prev_close > 0:
-                            change = round((last - prev_close) / prev_close * 100, 2)
-                
-                results[original_code] = change
-            except:
+                results[symbol] = _parse_sina_stock_change(symbol, data_part)
+            except (ValueError, IndexError):
                 continue
-                
-        return results
-    except Exception as e:
-        logger.warning(f"Sina fetch failed: {e}")
-        return {}
+    return results
 
 
-def get_fund_history(code: str, limit: int = 30) -> List[Dict[str, Any]]:
+# Process-wide stock quote cache keyed by Sina symbol: funds share top holdings,
+# so one quote serves every fund detail view within STOCK_SPOT_CACHE_DURATION.
+_stock_quote_cache = TTLCache(
+    "stock_quote",
+    max_size=Config.STOCK_QUOTE_CACHE_MAX_SIZE,
+    ttl=Config.STOCK_SPOT_CACHE_DURATION
+)
+
+
+def get_stock_quote_cache_stats() -> Dict[str, Any]:
+    return _stock_quote_cache.stats()
+
+
+def _fetch_stock_spots_sina(codes: List[str]) -> Dict[str, float]:
     """
-    Get historical NAV data with database caching.
-    If limit >= 9999, fetch all available history.
+    Real-time stock changes (%) via the shared quote cache.
+
+    Cached symbols are served directly; concurrent misses for the same symbol
+    wait for one request, and the remaining symbols go out as one batched
+    Sina request.
+
+    Returns:
+        {original_code: change_percent}
     """
-    from ..db import get_db_connection
-    import time
+    if not codes:
+        return {}
 
-    # 1. Try to get from database cache first
-    conn = get_db_connection()
+    # Map Sina symbol back to original code for result dict
+    code_map = {}
+    for c in codes:
+        symbol = _to_sina_stock_symbol(c)
+        if symbol:
+            code_map.setdefault(symbol, str(c).strip())
+    if not code_map:
+        return {}
+
+    quotes = _stock_quote_cache.get_or_load_many(list(code_map), _fetch_sina_stock_changes)
+    return {code_map[symbol]: change for symbol, change in quotes.items()}
+
+
+def _read_cached_history(conn, code: str, limit: int) -> list:
+    """Read cached NAV rows, newest first."""
     cursor = conn.cursor()
 
     # If limit is very large, get all data
@@ -518,35 +1202,51 @@ def get_fund_history(code: str, limit: int = 30) -> List[Dict[str, Any]]:
             LIMIT ?
         """, (code, limit))
 
-    rows = cursor.fetchall()
+    return cursor.fetchall()
+
+
+def get_fund_history(code: str, limit: int = 30) -> List[Dict[str, Any]]:
+    """
+    Get historical NAV data with database caching.
+    If limit >= 9999, fetch all available history.
+
+    Stale caches are first topped up incrementally (one NAV from fundgz);
+    the full akshare history download is used only on cold cache, gaps or corrections.
+    Checks for a not-yet-published NAV are paced by services/nav_publication.py.
+    """
+    from datetime import datetime
+
+    # 1. Try to get from database cache first
+    conn = get_db_connection()
+    rows = _read_cached_history(conn, code, limit)
+
+    # For "all history" requests, require more data to consider cache valid
+    min_rows = 10 if limit < 9999 else 100
+    enough_rows = len(rows) >= min(limit, min_rows)
 
     # Check if cache is fresh
     cache_valid = False
+    awaiting_nav = None  # 缓存最新净值日期（最新一期净值可能已公布但尚未入库时）
+    now = datetime.now()
     if rows:
         latest_update = rows[0]["updated_at"]
-        latest_nav_date = rows[0]["date"]
+        latest_nav_date = str(rows[0]["date"])[:10]
         # Parse timestamp
         try:
-            from datetime import datetime
-            update_time = datetime.fromisoformat(latest_update)
-            age_hours = (datetime.now() - update_time).total_seconds() / 3600
-
-            # Get today's date
-            today_str = datetime.now().strftime("%Y-%m-%d")
-            current_hour = datetime.now().hour
-
-            # For "all history" requests, require more data to consider cache valid
-            min_rows = 10 if limit < 9999 else 100
+            update_time = datetime.fromisoformat(str(latest_update))
+            age_hours = (now - update_time).total_seconds() / 3600
 
             # Cache invalidation logic:
-            # 1. If it's after 16:00 on a trading day and cache doesn't have today's NAV, invalidate
+            # 1. If the latest publishable NAV (today's after 16:00) is missing, the
+            #    publication tracker decides whether to check upstream (backoff +
+            #    learned publication time), instead of re-checking on every call
             # 2. Otherwise, use 24-hour cache
-            if current_hour >= 16 and latest_nav_date < today_str:
-                # After 16:00, if we don't have today's NAV, force refresh
-                cache_valid = False
+            if latest_nav_date < expected_nav_date(now):
+                awaiting_nav = latest_nav_date
+                cache_valid = enough_rows and not refresh_due(code, latest_nav_date, now)
             else:
                 # Normal 24-hour cache
-                cache_valid = age_hours < 24 and len(rows) >= min(limit, min_rows)
+                cache_valid = age_hours < 24 and enough_rows
         except:
             pass
 
@@ -555,39 +1255,300 @@ def get_fund_history(code: str, limit: int = 30) -> List[Dict[str, Any]]:
         # Reverse to ascending order (oldest to newest) for chart display
         return [{"date": row["date"], "nav": float(row["nav"])} for row in reversed(rows)]
 
-    # 2. Cache miss or stale, fetch from API
+    def _record(history):
+        if awaiting_nav:
+            try:
+                record_check(code, awaiting_nav, str(history[-1]["date"])[:10] if history else None, now)
+            except Exception as e:
+                logger.warning(f"NAV publication tracking failed for {code}: {e}")
+        return history
+
+    # 2. Cache only stale: try incremental sync (fetch the delta, not the whole history)
+    if enough_rows:
+        try:
+            if sync_fund_history_incremental(code):
+                rows = _read_cached_history(conn, code, limit)
+                return _record([{"date": row["date"], "nav": float(row["nav"])} for row in reversed(rows)])
+        except Exception as e:
+            logger.warning(f"Incremental history sync failed for {code}: {e}")
+
+    # 3. Cache miss, gap or correction: full fetch from API
+    #    (within the request deadline, if any; on expiry the download finishes in
+    #    the background and the cached rows are served as-is)
     try:
-        df = ak.fund_open_fund_info_em(symbol=code, indicator="单位净值走势")
-        if df is None or df.empty:
-            
-            return []
+        frame = deadline.run_within(_history_pool, _fetch_full_history, code)
+        if frame.empty:
+            return _record([])
 
         # If limit < 9999, take only the most recent N records
         if limit < 9999:
-            df = df.sort_values(by="净值日期", ascending=False).head(limit)
+            frame = frame.tail(limit)
+
+        # Ascending order for chart display
+        return _record([
+            {"date": d, "nav": v}
+            for d, v in zip(frame["date"].tolist(), frame["nav"].tolist())
+        ])
+    except deadline.DeadlineExceeded:
+        if rows:
+            deadline.count("stale_served")
+        return [{"date": row["date"], "nav": float(row["nav"])} for row in reversed(rows)]
+    except Exception as e:
+        logger.error(f"History fetch error for {code}: {e}")
+        return _record([])
 
-        # Sort ascending for chart display
-        df = df.sort_values(by="净值日期", ascending=True)
 
-        results = []
-        for _, row in df.iterrows():
-            d = row["净值日期"]
-            date_str = d.strftime("%Y-%m-%d") if hasattr(d, "strftime") else str(d)[:10]
-            nav_value = float(row["单位净值"])
-            results.append({"date": date_str, "nav": nav_value})
+# Full history downloads started under a request deadline (finish in the background on expiry)
+_history_pool = PooledConnectionExecutor(max_workers=4, thread_name_prefix="history-fetch")
 
-            # 3. Save to database cache
-            cursor.execute("""
-                INSERT OR REPLACE INTO fund_history (code, date, nav, updated_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            """, (code, date_str, nav_value))
+# Batch history loads (nightly NAV update, history-based valuation fallback, backtests).
+# Separate from _history_pool: its tasks submit into _history_pool themselves.
+_nav_update_pool = PooledConnectionExecutor(
+    max_workers=Config.NAV_UPDATE_WORKERS,
+    thread_name_prefix="nav-update"
+)
+
+
+def get_fund_histories(codes: List[str], limit: int = 30) -> Dict[str, Any]:
+    """
+    get_fund_history for many codes on the shared nav-update worker pool.
+    Upstream pacing comes from the per-host token buckets, not sleeps.
+
+    Returns:
+        Dict[code, history list or Exception]
+    """
+    def _load(code):
+        try:
+            return get_fund_history(code, limit=limit)
+        except Exception as e:
+            return e
+
+    if len(codes) == 1:
+        return {codes[0]: _load(codes[0])}
+    return dict(zip(codes, _nav_update_pool.map(deadline.bind(_load), codes)))
+
+
+def _fetch_full_history(code: str) -> pd.DataFrame:
+    """
+    Download the complete NAV history via akshare, persist new and corrected rows,
+    record a full sync in fund_nav_sync_state and rebuild the indicator state.
+    """
+    rate_limit.wait(Config.AKSHARE_RATE_LIMIT_HOST)
+    df = ak.fund_open_fund_info_em(symbol=code, indicator="单位净值走势")
+    if df is None or df.empty:
+        return pd.DataFrame(columns=["date", "nav"])
+
+    frame = _normalize_history_frame(df)
+
+    # Save to database cache (new dates and upstream corrections of cached NAVs)
+    conn = get_db_connection()
+    changed, corrected = _changed_history_rows(conn, code, frame)
+    _upsert_fund_history(conn, code, changed)
+    if corrected:
+        logger.info(f"Applied {corrected} NAV corrections for {code}")
+        _indicators_cache.invalidate(code)
+    if not frame.empty:
+        _save_sync_state(conn, code, frame["date"].iloc[-1], float(frame["nav"].iloc[-1]), full=True)
+        try:
+            rebuild_indicator_state(code)
+        except Exception as e:
+            logger.warning(f"Indicator rebuild failed for {code}: {e}")
+    return frame
 
+
+def _get_sync_state(conn, code: str) -> Dict[str, Any]:
+    """
+    Per-fund sync state. Falls back to the newest fund_history row when the
+    state row does not exist yet (caches populated before sync state existed).
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT last_date, last_nav, last_full_sync_at FROM fund_nav_sync_state
+        WHERE code = ?
+    """, (code,))
+    row = cursor.fetchone()
+    if row:
+        return dict(row)
+
+    cursor.execute("""
+        SELECT date, nav FROM fund_history WHERE code = ?
+        ORDER BY date DESC LIMIT 1
+    """, (code,))
+    row = cursor.fetchone()
+    if row:
+        return {"last_date": row["date"], "last_nav": float(row["nav"]), "last_full_sync_at": None}
+    return {}
+
+
+def _save_sync_state(conn, code: str, last_date: str, last_nav: float, full: bool = False) -> None:
+    cursor = conn.cursor()
+    if full:
+        cursor.execute("""
+            INSERT INTO fund_nav_sync_state (code, last_date, last_nav, last_full_sync_at, last_sync_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ON CONFLICT(code) DO UPDATE SET
+                last_date = excluded.last_date,
+                last_nav = excluded.last_nav,
+                last_full_sync_at = CURRENT_TIMESTAMP,
+                last_sync_at = CURRENT_TIMESTAMP
+        """, (code, last_date, last_nav))
+    else:
+        cursor.execute("""
+            INSERT INTO fund_nav_sync_state (code, last_date, last_nav, last_sync_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(code) DO UPDATE SET
+                last_date = excluded.last_date,
+                last_nav = excluded.last_nav,
+                last_sync_at = CURRENT_TIMESTAMP
+        """, (code, last_date, last_nav))
+    conn.commit()
+
+
+def sync_fund_history_incremental(code: str) -> bool:
+    """
+    Incrementally sync fund_history using fundgz's latest published NAV (dwjz/jzrq).
+
+    Returns:
+        True if the cache is now up to date (new NAV appended, or nothing newer
+        published yet); False if a full fetch is required (no state, gap,
+        correction, periodic full resync due, or source unavailable).
+    """
+    from datetime import datetime, date as date_cls
+
+    conn = get_db_connection()
+    state = _get_sync_state(conn, code)
+    if not state or not state.get("last_date"):
+        return False
+
+    # Periodic full resync guards against silent upstream corrections of older NAVs
+    last_full = state.get("last_full_sync_at")
+    if last_full:
+        try:
+            full_age_days = (datetime.now() - datetime.fromisoformat(str(last_full))).days
+            if full_age_days >= Config.NAV_FULL_RESYNC_DAYS:
+                return False
+        except ValueError:
+            return False
+
+    latest = get_eastmoney_valuation(code)
+    nav_date = latest.get("navDate")
+    nav = float(latest.get("nav") or 0)
+    if not nav_date or nav <= 0:
+        return False
+
+    last_date = state["last_date"]
+    last_nav = float(state["last_nav"])
+
+    if nav_date == last_date:
+        if abs(nav - last_nav) > 1e-6:
+            # Same date, different value: upstream corrected the NAV
+            logger.info(f"NAV correction detected for {code} on {nav_date}, full resync")
+            return False
+        # Nothing new published yet: refresh updated_at so the cache counts as fresh
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE fund_history SET updated_at = CURRENT_TIMESTAMP WHERE code = ? AND date = ?",
+            (code, last_date)
+        )
         conn.commit()
-        
-        return results
+        _save_sync_state(conn, code, last_date, last_nav)
+        return True
+
+    if nav_date < last_date:
+        return False
+
+    # Only a single-step delta can be filled from fundgz; anything larger is a gap
+    expected = next_trading_day(date_cls.fromisoformat(last_date)).strftime("%Y-%m-%d")
+    if nav_date != expected:
+        logger.info(f"NAV gap for {code}: cached {last_date}, upstream {nav_date}, full resync")
+        return False
+
+    _upsert_fund_history(conn, code, pd.DataFrame({"date": [nav_date], "nav": [nav]}))
+    _save_sync_state(conn, code, nav_date, nav)
+    try:
+        apply_nav(code, nav_date, nav)
     except Exception as e:
-        logger.error(f"History fetch error for {code}: {e}")
-        return []
+        logger.warning(f"Incremental indicator update failed for {code}: {e}")
+    return True
+
+
+def _normalize_history_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert akshare NAV DataFrame to a (date, nav) frame column-wise.
+
+    Returns:
+        DataFrame with "date" (YYYY-MM-DD str) and "nav" (float), ascending, unique dates
+    """
+    dates = pd.to_datetime(df["净值日期"], errors="coerce")
+    frame = pd.DataFrame({
+        "date": dates.dt.strftime("%Y-%m-%d"),
+        "nav": pd.to_numeric(df["单位净值"], errors="coerce"),
+    }).dropna()
+    return (
+        frame.sort_values("date", kind="stable")
+        .drop_duplicates("date", keep="last")
+        .reset_index(drop=True)
+    )
+
+
+def _changed_history_rows(conn, code: str, frame: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """
+    Select rows of a full download that need writing: dates not cached yet, cached
+    dates whose NAV differs (upstream corrections of older NAVs, picked up by the
+    periodic full resync), and the latest cached row, rewritten so its updated_at
+    (cache freshness) advances.
+
+    Returns:
+        (rows to write, number of corrected cached rows)
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT date, nav FROM fund_history WHERE code = ?", (code,))
+    cached = {str(row["date"])[:10]: float(row["nav"]) for row in cursor.fetchall()}
+    if not cached:
+        return frame, 0
+    cached_nav = frame["date"].map(cached)
+    corrected = cached_nav.notna() & ((frame["nav"] - cached_nav).abs() > 1e-6)
+    mask = cached_nav.isna() | corrected | (frame["date"] >= max(cached))
+    return frame[mask], int(corrected.sum())
+
+
+def _upsert_fund_history(conn, code: str, frame: pd.DataFrame) -> int:
+    """
+    Bulk upsert (date, nav) rows into fund_history inside one explicit transaction.
+    SQLite uses executemany; PostgreSQL uses psycopg2 execute_values.
+
+    Returns:
+        Number of rows written
+    """
+    if frame is None or frame.empty:
+        return 0
+
+    rows = list(zip([code] * len(frame), frame["date"].tolist(), frame["nav"].astype(float).tolist()))
+
+    from ..db import get_db_type
+    try:
+        if get_db_type() == "postgresql":
+            from psycopg2.extras import execute_values
+            with conn.cursor() as cursor:
+                execute_values(cursor, """
+                    INSERT INTO fund_history (code, date, nav) VALUES %s
+                    ON CONFLICT (code, date) DO UPDATE SET
+                        nav = EXCLUDED.nav,
+                        updated_at = CURRENT_TIMESTAMP
+                """, rows, page_size=1000)
+        else:
+            # Use IMMEDIATE to acquire write lock once for the whole batch
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("""
+                INSERT OR REPLACE INTO fund_history (code, date, nav, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            """, rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows)
 
 
 def get_nav_on_date(code: str, date_str: str) -> float | None:
@@ -605,64 +1566,195 @@ def get_nav_on_date(code: str, date_str: str) -> float | None:
 def _calculate_technical_indicators(history: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Calculate real technical indicators from NAV history.
+    See services/indicators.py for the vectorized engine.
     """
-    if not history or len(history) < 10:
-        return {
-            "sharpe": "--",
-            "volatility": "--",
-            "max_drawdown": "--",
-            "annual_return": "--"
-        }
-    
+    return indicators_from_history(history)
+
+# Fund detail components, each with its own TTL. Expired entries are served
+# for DETAIL_STALE_TTL while one background refresh runs (stale-while-revalidate).
+_pingzhong_cache = TTLCache(
+    "pingzhong", max_size=Config.DETAIL_CACHE_MAX_SIZE,
+    ttl=Config.DETAIL_PINGZHONG_TTL, stale_ttl=Config.DETAIL_STALE_TTL
+)
+_holdings_view_cache = TTLCache(
+    "holdings_view", max_size=Config.DETAIL_CACHE_MAX_SIZE,
+    ttl=Config.STOCK_SPOT_CACHE_DURATION, stale_ttl=Config.DETAIL_HOLDINGS_VIEW_STALE_TTL
+)
+_indicators_cache = TTLCache(
+    "indicators", max_size=Config.DETAIL_CACHE_MAX_SIZE,
+    ttl=Config.DETAIL_INDICATORS_TTL, stale_ttl=Config.DETAIL_STALE_TTL
+)
+
+
+def get_detail_cache_stats() -> Dict[str, Dict[str, Any]]:
+    stats = {
+        cache.name: cache.stats()
+        for cache in (_pingzhong_cache, _holdings_view_cache, _indicators_cache)
+    }
+    stats["holdings"] = get_holdings_cache_stats()
+    return stats
+
+
+def get_pingzhong_cached(code: str) -> Dict[str, Any]:
+    """PingZhong data through the SWR cache (empty results are not cached)."""
+    return _pingzhong_cache.get_or_refresh(code, get_eastmoney_pingzhong_data, should_cache=bool) or {}
+
+
+def _load_holdings_view(code: str) -> Dict[str, Any]:
+    composition = get_holdings_composition(code)
+    if not composition or not composition["rows"]:
+        return {"holdings": [], "concentration": 0.0}
+
+    spot_map = _fetch_stock_spots_sina([row[0] for row in composition["rows"]])
+
+    holdings = []
+    seen_codes = set()
+    for stock_code, stock_name, percent in composition["rows"]:
+        if stock_code in seen_codes or percent < 0.01: continue
+        seen_codes.add(stock_code)
+        holdings.append({
+            "name": stock_name,
+            "percent": percent,
+            "change": spot_map.get(stock_code, 0.0),
+        })
+    return {"holdings": holdings[:20], "concentration": composition["concentration"]}
+
+
+def get_fund_holdings(code: str) -> Dict[str, Any]:
+    """
+    Top holdings with today's stock changes, plus top-10 concentration.
+
+    Returns:
+        {"holdings": [{"name", "percent", "change"}, ...], "concentration": float}
+    """
+    view = _holdings_view_cache.get_or_refresh(code, _load_holdings_view)
+    return view or {"holdings": [], "concentration": 0.0}
+
+
+def _get_indicators(code: str, pz_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _compute(_code):
+        # We take last 250 trading days (approx 1 year)
+        history_data = pz_data.get("history", [])
+        if not history_data:
+            # Fallback to AkShare if PingZhong missed it (unlikely)
+            history_data = get_fund_history(code, limit=250)
+        # Persisted row (nightly batch) when current, otherwise computed and persisted
+        return get_fund_indicators(code, history_data)
+
+    return _indicators_cache.get_or_refresh(code, _compute)
+
+
+# Bounded pool for the concurrent branches of the fund detail request
+_detail_pool = PooledConnectionExecutor(
+    max_workers=Config.DETAIL_FETCH_WORKERS,
+    thread_name_prefix="detail"
+)
+
+
+def _empty_holdings() -> Dict[str, Any]:
+    return {"holdings": [], "concentration": 0.0}
+
+
+def _timed_branch(timings: Dict[str, float], name: str, fn, *args):
+    """Run one detail branch, recording its duration (ms) in timings."""
+    started = time.monotonic()
     try:
-        import numpy as np
-        # Convert to numpy array of NAVs
-        navs = np.array([item['nav'] for item in history])
-        
-        # 1. Returns (Daily)
-        daily_returns = np.diff(navs) / navs[:-1]
-        
-        # 2. Annualized Return
-        total_return = (navs[-1] - navs[0]) / navs[0]
-        # Approximate years based on history length
-        years = len(history) / 250.0
-        annual_return = (1 + total_return)**(1/years) - 1 if years > 0 else 0
-        
-        # 3. Annualized Volatility
-        volatility = np.std(daily_returns) * np.sqrt(250)
-        
-        # 4. Sharpe Ratio (Risk-free rate = 2%)
-        rf = 0.02
-        sharpe = (annual_return - rf) / volatility if volatility > 0 else 0
-        
-        # 5. Max Drawdown
-        # Running max
-        rolling_max = np.maximum.accumulate(navs)
-        drawdowns = (navs - rolling_max) / rolling_max
-        max_drawdown = np.min(drawdowns)
-        
-        return {
-            "sharpe": round(float(sharpe), 2),
-            "volatility": f"{round(float(volatility) * 100, 2)}%",
-            "max_drawdown": f"{round(float(max_drawdown) * 100, 2)}%",
-            "annual_return": f"{round(float(annual_return) * 100, 2)}%"
-        }
-    except Exception as e:
-        logger.error(f"Indicator calculation error: {e}")
-        return {
-            "sharpe": "--",
-            "volatility": "--",
-            "max_drawdown": "--",
-            "annual_return": "--"
-        }
+        return fn(*args)
+    finally:
+        timings[name] = round((time.monotonic() - started) * 1000, 1)
+
 
 def get_fund_intraday(code: str) -> Dict[str, Any]:
     """
     Get fund holdings + real-time valuation estimate.
+
+    Independent branches run concurrently under one per-request deadline:
+        valuation ─┐
+        pingzhong ─┼─> indicators ─> assemble
+        holdings (akshare -> sina spots) ─┘
+    A branch that misses the deadline is replaced by its empty default
+    ("partial": true); it keeps running in the background and fills its cache
+    for the next request. Per-branch durations are returned in "timings".
+    """
+    ends_at = time.monotonic() + Config.DETAIL_DEADLINE
+    timings: Dict[str, float] = {}
+    timed_out: List[str] = []
+
+    futures = {
+        # 1) Get real-time valuation (Multi-source)
+        "valuation": _detail_pool.submit(_timed_branch, timings, "valuation", get_combined_valuation, code),
+        # 1.5) Detailed info from PingZhong
+        "pingzhong": _detail_pool.submit(_timed_branch, timings, "pingzhong", get_pingzhong_cached, code),
+        # 3) Holdings (stock spots depend on holdings, chained inside the branch)
+        "holdings": _detail_pool.submit(_timed_branch, timings, "holdings", get_fund_holdings, code),
+    }
+
+    branches: Dict[str, Any] = {}
+
+    def _collect(name: str) -> None:
+        try:
+            branches[name] = futures[name].result(timeout=max(0.0, ends_at - time.monotonic()))
+        except FuturesTimeoutError:
+            timed_out.append(name)
+        except Exception as e:
+            logger.warning(f"Fund detail branch {name} failed for {code}: {e}")
+
+    _collect("pingzhong")
+    # 2) Indicators depend on PingZhong history
+    futures["indicators"] = _detail_pool.submit(
+        _timed_branch, timings, "indicators", _get_indicators, code, branches.get("pingzhong", {})
+    )
+    for name in ("valuation", "holdings", "indicators"):
+        _collect(name)
+
+    return finish_fund_detail(code, branches, timings, timed_out)
+
+
+# Branches of the fund detail request, in the order their timings are reported
+DETAIL_BRANCHES = ("valuation", "pingzhong", "holdings", "indicators")
+
+
+def _detail_branch_default(name: str) -> Dict[str, Any]:
+    """Value for a detail branch that missed the deadline or failed."""
+    if name == "holdings":
+        return _empty_holdings()
+    if name == "indicators":
+        return _calculate_technical_indicators([])
+    return {}
+
+
+def finish_fund_detail(
+    code: str, branches: Dict[str, Any], timings: Dict[str, float], timed_out: List[str]
+) -> Dict[str, Any]:
+    """
+    Assemble the detail response from the branch results that arrived in time
+    (missing ones replaced by their defaults). Shared by the sync and async detail paths.
+    """
+    results = {
+        name: branches[name] if name in branches else _detail_branch_default(name)
+        for name in DETAIL_BRANCHES
+    }
+    detail = _build_fund_detail(
+        code, results["valuation"], results["pingzhong"], results["holdings"], results["indicators"]
+    )
+    detail["partial"] = bool(timed_out)
+    detail["timings"] = {name: timings.get(name) for name in DETAIL_BRANCHES}
+    if timed_out:
+        logger.warning(f"Fund detail for {code} partial, timed out: {timed_out}")
+    return detail
+
+
+def _build_fund_detail(
+    code: str,
+    em_data: Dict[str, Any],
+    pz_data: Dict[str, Any],
+    holdings_view: Optional[Dict[str, Any]] = None,
+    tech_indicators: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Assemble fund detail response from valuation + PingZhong data (+ holdings / indicators
+    when already fetched by the caller). Shared by the sync and async detail paths.
     """
-    # 1) Get real-time valuation (Multi-source)
-    em_data = get_combined_valuation(code)
-    
     name = em_data.get("name")
     nav = float(em_data.get("nav", 0.0))
     estimate = float(em_data.get("estimate", 0.0))
@@ -673,7 +1765,6 @@ def get_fund_intraday(code: str) -> Dict[str, Any]:
     confidence = em_data.get("confidence")
 
     # 1.5) Enrich with detailed info
-    pz_data = get_eastmoney_pingzhong_data(code)
     extra_info = {}
     if pz_data.get("name"): extra_info["full_name"] = pz_data["name"]
     if pz_data.get("manager"): extra_info["manager"] = pz_data["manager"]
@@ -689,56 +1780,15 @@ def get_fund_intraday(code: str) -> Dict[str, Any]:
         name = extra_info.get("full_name", f"基金 {code}")
     manager = extra_info.get("manager", "--")
 
-    # 2) Use history from PingZhong for Indicators
-    # We take last 250 trading days (approx 1 year)
-    history_data = pz_data.get("history", [])
-    if history_data:
-        # Indicators need 1 year
-        tech_indicators = _calculate_technical_indicators(history_data[-250:])
-    else:
-        # Fallback to AkShare if PingZhong missed it (unlikely)
-        history_data = get_fund_history(code, limit=250)
-        tech_indicators = _calculate_technical_indicators(history_data)
+    # 2) Technical indicators (cached per fund, from PingZhong history)
+    if tech_indicators is None:
+        tech_indicators = _get_indicators(code, pz_data)
 
-    # 3) Get holdings from AkShare
-    holdings = []
-    concentration_rate = 0.0
-    try:
-        current_year = str(time.localtime().tm_year)
-        holdings_df = ak.fund_portfolio_hold_em(symbol=code, date=current_year)
-        if holdings_df is None or holdings_df.empty:
-             prev_year = str(time.localtime().tm_year - 1)
-             holdings_df = ak.fund_portfolio_hold_em(symbol=code, date=prev_year)
-             
-        if not holdings_df.empty:
-            holdings_df = holdings_df.copy()
-            if "占净值比例" in holdings_df.columns:
-                holdings_df["占净值比例"] = (
-                    holdings_df["占净值比例"].astype(str).str.replace("%", "", regex=False)
-                )
-                holdings_df["占净值比例"] = pd.to_numeric(holdings_df["占净值比例"], errors="coerce").fillna(0.0)
-            
-            sorted_holdings = holdings_df.sort_values(by="占净值比例", ascending=False)
-            top10 = sorted_holdings.head(10)
-            concentration_rate = top10["占净值比例"].sum()
-
-            stock_codes = [str(c) for c in holdings_df["股票代码"].tolist() if c]
-            spot_map = _fetch_stock_spots_sina(stock_codes)
-            
-            seen_codes = set()
-            for _, row in sorted_holdings.iterrows():
-                stock_code = str(row.get("股票代码"))
-                percent = float(row.get("占净值比例", 0.0))
-                if stock_code in seen_codes or percent < 0.01: continue
-                seen_codes.add(stock_code)
-                holdings.append({
-                    "name": row.get("股票名称"),
-                    "percent": percent,
-                    "change": spot_map.get(stock_code, 0.0), 
-                })
-            holdings = holdings[:20]
-    except:
-        pass
+    # 3) Holdings (composition cached for hours, stock changes for ~1 minute)
+    if holdings_view is None:
+        holdings_view = get_fund_holdings(code)
+    holdings = holdings_view["holdings"]
+    concentration_rate = holdings_view["concentration"]
 
     # 4) Determine sector/type
     sector = get_fund_type(code, name)
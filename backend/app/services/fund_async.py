@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+"""
+异步数据源层（httpx + asyncio）。
+
+与 services/fund.py 中的同步抓取共用同一套请求构造 / 响应解析、数据源路由记录、
+对冲决策（ValuationRace）、兜底和详情组装，以及同一个估值缓存；这里只负责 I/O：
+上游请求以协程方式进行，数百个进行中的估值请求只占用协程，不占用 FastAPI
+线程池中的线程。每个上游 host 有独立的并发上限（信号量）。
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+
+from ..config import Config
+from ..db import releasing_db_connection
+from . import circuit_breaker, deadline, pingzhong, rate_limit, source_routing
+from .fund import (
+    EASTMONEY_HEADERS,
+    SINA_HEADERS,
+    ValuationRace,
+    _bounded_wait,
+    _get_indicators,
+    _is_cacheable_valuation,
+    _pingzhong_cache,
+    _valuation_cache,
+    build_fund_quotes,
+    eastmoney_valuation_from_response,
+    eastmoney_valuation_url,
+    fill_missing_valuations,
+    finish_fund_detail,
+    get_eastmoney_pingzhong_data,
+    get_fund_holdings,
+    parse_sina_valuations,
+    record_eastmoney_results,
+    record_source_results,
+    sina_valuation_batches,
+    valuation_copies,
+)
+from .pingzhong import parse_pingzhong
+
+logger = logging.getLogger(__name__)
+
+# 与同步 _http_get 的重试策略保持一致
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+_MAX_RETRIES = 3
+_BACKOFF_FACTOR = 0.5
+
+_client: Optional[httpx.AsyncClient] = None
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+_inflight: Dict[str, asyncio.Future] = {}
+_pz_inflight: Dict[str, asyncio.Future] = {}
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Get or create the shared AsyncClient (connection pooling across requests)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(5.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_async_client() -> None:
+    """应用关闭时释放连接"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _in_threadpool(fn, *args):
+    """run_in_threadpool for blocking (DB) work; the worker's connection is returned to the pool afterwards."""
+    return await run_in_threadpool(releasing_db_connection(fn), *args)
+
+
+def _get_host_semaphore(host: str) -> asyncio.Semaphore:
+    sem = _host_semaphores.get(host)
+    if sem is None:
+        limit = Config.ASYNC_HOST_CONCURRENCY.get(host, Config.ASYNC_DEFAULT_HOST_CONCURRENCY)
+        sem = _host_semaphores[host] = asyncio.Semaphore(limit)
+    return sem
+
+
+async def _get(url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    """
+    GET with per-host concurrency limit, circuit breaker and retry on transient errors.
+    Every attempt takes a token from the per-host bucket shared with the sync path
+    (services/rate_limit.py), so both paths together stay within the configured rate.
+    Under a request deadline the timeout and token wait shrink to the remaining budget
+    and retries that cannot finish in time are skipped (see services/deadline.py).
+    """
+    host = urlsplit(url).hostname or ""
+    sem = _get_host_semaphore(host)
+    breaker = circuit_breaker.get_breaker(host)
+    deadline.check()
+    if not breaker.allow():
+        raise circuit_breaker.CircuitOpenError(host)
+    started = time.monotonic()
+    default_timeout = _get_client().timeout.read or 5.0
+    for attempt in range(_MAX_RETRIES + 1):
+        backoff = _BACKOFF_FACTOR * (2 ** attempt)
+        try:
+            budget = deadline.remaining()
+            wait_started = time.monotonic()
+            if not await rate_limit.acquire_async(host, timeout=None if budget is None else max(0.0, budget)):
+                if budget is None:
+                    raise rate_limit.RateLimitTimeout(host)
+                deadline.count("exceeded")
+                raise deadline.DeadlineExceeded()
+            attempt_started = time.monotonic()
+            # 等令牌的时间不计入上游耗时（熔断统计 / 对冲用的 p95）
+            started += attempt_started - wait_started
+            # 排队等待信号量也受请求预算约束；拿到后再按剩余预算计算本次超时
+            await asyncio.wait_for(sem.acquire(), _bounded_wait(None))
+            try:
+                timeout = deadline.clamp_timeout(default_timeout)
+                response = await asyncio.wait_for(
+                    _get_client().get(url, headers=headers, timeout=timeout),
+                    _bounded_wait(None)
+                )
+            finally:
+                sem.release()
+            if (
+                response.status_code not in _RETRY_STATUS or attempt == _MAX_RETRIES
+                or not deadline.can_retry(time.monotonic() - attempt_started, backoff)
+            ):
+                breaker.record(response.status_code not in _RETRY_STATUS, time.monotonic() - started)
+                return response
+        except rate_limit.RateLimitTimeout:
+            breaker.release()
+            raise
+        except (deadline.DeadlineExceeded, asyncio.TimeoutError) as e:
+            # 预算耗尽（含等待信号量的时间），不代表上游故障
+            breaker.release()
+            if isinstance(e, deadline.DeadlineExceeded):
+                raise
+            deadline.count("exceeded")
+            raise deadline.DeadlineExceeded() from e
+        except httpx.TransportError as e:
+            if isinstance(e, httpx.TimeoutException) and timeout < default_timeout:
+                breaker.release()
+                deadline.count("exceeded")
+                raise deadline.DeadlineExceeded() from e
+            if attempt == _MAX_RETRIES or not deadline.can_retry(time.monotonic() - attempt_started, backoff):
+                breaker.record(False, time.monotonic() - started)
+                raise
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception:
+            breaker.record(False, time.monotonic() - started)
+            raise
+        # 退避期间不占用信号量
+        await asyncio.sleep(backoff)
+    raise RuntimeError("unreachable")
+
+
+async def _fetch_eastmoney_valuation_async(code: str) -> Optional[Dict[str, Any]]:
+    """Async version of fund._fetch_eastmoney_valuation ({} = not covered, None = request failed)"""
+    try:
+        response = await _get(eastmoney_valuation_url(code), headers=EASTMONEY_HEADERS)
+        return eastmoney_valuation_from_response(response.status_code, response.text)
+    except (circuit_breaker.CircuitOpenError, deadline.DeadlineExceeded):
+        pass
+    except Exception as e:
+        logger.warning(f"Eastmoney API error for {code}: {e}")
+    return None
+
+
+async def get_eastmoney_valuation_async(code: str) -> Dict[str, Any]:
+    """Async version of fund.get_eastmoney_valuation"""
+    return await _fetch_eastmoney_valuation_async(code) or {}
+
+
+async def _fetch_sina_valuations_async(codes: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """Async version of fund._fetch_sina_valuations (multi-symbol chunks fetched concurrently)"""
+    batches = sina_valuation_batches(codes)
+
+    async def _fetch_chunk(chunk: List[str], url: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        try:
+            response = await _get(url, headers=SINA_HEADERS)
+            return parse_sina_valuations(response.text)
+        except (circuit_breaker.CircuitOpenError, deadline.DeadlineExceeded):
+            return None
+        except Exception as e:
+            logger.warning(f"Sina Valuation API error for {len(chunk)} codes: {e}")
+            return None
+
+    merged, failed = {}, []
+    for (chunk, _), part in zip(batches, await asyncio.gather(*(_fetch_chunk(*b) for b in batches))):
+        if part is None:
+            failed.extend(chunk)
+        else:
+            merged.update(part)
+    return merged, failed
+
+
+async def get_sina_valuations_async(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Async version of fund.get_sina_valuations"""
+    return (await _fetch_sina_valuations_async(codes))[0]
+
+
+async def _routed_eastmoney_valuations_async(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Async version of fund._routed_eastmoney_valuations"""
+    queried = await _in_threadpool(source_routing.select_codes, source_routing.EASTMONEY, codes)
+    fetched = await asyncio.gather(*(_fetch_eastmoney_valuation_async(c) for c in queried))
+    return await _in_threadpool(record_eastmoney_results, queried, fetched)
+
+
+async def _routed_sina_valuations_async(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Async version of fund._routed_sina_valuations"""
+    queried = await _in_threadpool(source_routing.select_codes, source_routing.SINA, codes)
+    if not queried:
+        return {}
+    results, failed = await _fetch_sina_valuations_async(queried)
+    await _in_threadpool(record_source_results, source_routing.SINA, queried, results, failed)
+    return results
+
+
+async def get_pingzhong_data_async(code: str) -> Dict[str, Any]:
+    """Async version of fund.get_eastmoney_pingzhong_data"""
+    url = Config.EASTMONEY_DETAILED_API_URL.format(code=code)
+    cached = await _in_threadpool(pingzhong.load_cached, code)
+    try:
+        response = await _get(url, headers=pingzhong.conditional_headers(cached))
+        status_code, content, headers = response.status_code, response.content, response.headers
+    except Exception as e:
+        logger.warning(f"PingZhong API error for {code}: {e}")
+        status_code, content, headers = None, None, None
+    # 写磁盘缓存和解析（JSON 解码）放到线程池，避免阻塞事件循环
+    return await _in_threadpool(_pingzhong_from_response, code, cached, status_code, content, headers)
+
+
+def _pingzhong_from_response(code, cached, status_code, content, headers) -> Dict[str, Any]:
+    payload = pingzhong.payload_from_response(code, cached, status_code, content, headers)
+    return parse_pingzhong(payload, code) if payload else {}
+
+
+# 对冲请求中落败、仍在进行的任务（保持引用直到完成）
+_background_tasks: set = set()
+
+
+async def _fetch_upstream_valuations_async(
+    codes: List[str]
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """Async version of fund._fetch_upstream_valuations"""
+    fetchers = {
+        source_routing.EASTMONEY: _routed_eastmoney_valuations_async,
+        source_routing.SINA: _routed_sina_valuations_async,
+    }
+    race = ValuationRace(codes)
+
+    task = asyncio.ensure_future(fetchers[race.primary](codes))
+    done, _ = await asyncio.wait({task}, timeout=race.hedge_after())
+    if done:
+        race.add(race.primary, task)
+        missing = race.missing()
+        if missing:
+            race.maps[race.secondary] = await fetchers[race.secondary](missing)
+    else:
+        # Hedge: primary is slower than its p95, ask the secondary too
+        pending = {task: race.primary}
+        if race.should_hedge():
+            pending[asyncio.ensure_future(fetchers[race.secondary](codes))] = race.secondary
+        while pending and not race.covered():
+            done, _ = await asyncio.wait(pending, timeout=_bounded_wait(None), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break  # 请求预算耗尽
+            for finished in done:
+                race.add(pending.pop(finished), finished)
+        for loser in pending:
+            _background_tasks.add(loser)
+            loser.add_done_callback(_background_tasks.discard)
+    return race.merged()
+
+
+async def _fetch_combined_valuations_async(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Async version of fund._fetch_combined_valuations:
+    Eastmoney (concurrent) / Sina (batched), health-ordered and hedged ->
+    stale cache / estimator fallback (threadpool), skipping sources known not to cover a fund.
+    """
+    results, partial = await _fetch_upstream_valuations_async(codes)
+    if len(results) == len(codes):
+        return results
+    return await _in_threadpool(fill_missing_valuations, codes, results, partial)
+
+
+async def get_combined_valuations_async(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Async version of fund.get_combined_valuations.
+
+    共享同步路径的估值缓存；并发协程对同一基金的 miss 合并为一次上游请求。
+    """
+    codes = list(dict.fromkeys(c for c in codes if c))
+    results: Dict[str, Dict[str, Any]] = {}
+    waiting: Dict[str, asyncio.Future] = {}
+    leading: List[str] = []
+
+    for code in codes:
+        cached = _valuation_cache.get(code)
+        if cached is not None:
+            results[code] = cached
+        elif code in _inflight:
+            waiting[code] = _inflight[code]
+        else:
+            leading.append(code)
+
+    if leading:
+        loop = asyncio.get_running_loop()
+        futures = {code: loop.create_future() for code in leading}
+        _inflight.update(futures)
+        try:
+            loaded = await _fetch_combined_valuations_async(leading)
+            for code in leading:
+                data = loaded.get(code)
+                if data and _is_cacheable_valuation(data):
+                    _valuation_cache.set(code, data)
+                if data:
+                    results[code] = data
+                futures[code].set_result(data)
+        except BaseException as e:
+            for future in futures.values():
+                if future.done():
+                    continue
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+                    # 没有等待者时避免 "exception was never retrieved" 警告
+                    future.exception()
+            raise
+        finally:
+            for code in leading:
+                _inflight.pop(code, None)
+
+    for code, future in waiting.items():
+        try:
+            data = await future
+        except (Exception, asyncio.CancelledError):
+            continue
+        if data:
+            results[code] = data
+
+    return valuation_copies(codes, results)
+
+
+async def _get_pingzhong_cached_async(code: str) -> Dict[str, Any]:
+    """
+    Async read-through of the shared PingZhong SWR cache.
+    Stale entries are returned immediately and refreshed on the background pool;
+    concurrent cold misses for the same code share one download.
+    """
+    value, state = _pingzhong_cache.peek(code)
+    if state == "stale":
+        _pingzhong_cache.refresh_in_background(code, get_eastmoney_pingzhong_data, should_cache=bool)
+    if state is not None:
+        return value
+
+    future = _pz_inflight.get(code)
+    if future is not None:
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            return {}
+
+    future = _pz_inflight[code] = asyncio.get_running_loop().create_future()
+    try:
+        data = await get_pingzhong_data_async(code)
+        if data:
+            _pingzhong_cache.set(code, data)
+        future.set_result(data)
+        return data
+    except BaseException as e:
+        if isinstance(e, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(e)
+            future.exception()
+        raise
+    finally:
+        _pz_inflight.pop(code, None)
+
+
+async def get_fund_intraday_async(code: str) -> Dict[str, Any]:
+    """
+    Async version of fund.get_fund_intraday (same branch graph and deadline).
+    Valuation and PingZhong run as coroutines; holdings and indicators (blocking
+    akshare / DB work) run on the threadpool. Branches still running at the deadline
+    are left to finish in the background so they fill their caches.
+    """
+    ends_at = time.monotonic() + Config.DETAIL_DEADLINE
+    timings: Dict[str, float] = {}
+    timed_out: List[str] = []
+
+    async def _timed(name: str, awaitable):
+        started = time.monotonic()
+        try:
+            return await awaitable
+        finally:
+            timings[name] = round((time.monotonic() - started) * 1000, 1)
+
+    async def _valuation() -> Dict[str, Any]:
+        return (await get_combined_valuations_async([code])).get(code, {})
+
+    tasks = {
+        "valuation": asyncio.ensure_future(_timed("valuation", _valuation())),
+        "pingzhong": asyncio.ensure_future(_timed("pingzhong", _get_pingzhong_cached_async(code))),
+        "holdings": asyncio.ensure_future(_timed("holdings", _in_threadpool(get_fund_holdings, code))),
+    }
+
+    branches: Dict[str, Any] = {}
+
+    async def _collect(name: str) -> None:
+        try:
+            # shield: 超时只放弃等待，不取消分支（结果仍会写入缓存）
+            branches[name] = await asyncio.wait_for(
+                asyncio.shield(tasks[name]), max(0.0, ends_at - time.monotonic())
+            )
+        except asyncio.TimeoutError:
+            timed_out.append(name)
+        except Exception as e:
+            logger.warning(f"Fund detail branch {name} failed for {code}: {e}")
+
+    await _collect("pingzhong")
+    tasks["indicators"] = asyncio.ensure_future(
+        _timed("indicators", _in_threadpool(_get_indicators, code, branches.get("pingzhong", {})))
+    )
+    for name in ("valuation", "holdings", "indicators"):
+        await _collect(name)
+
+    return await _in_threadpool(finish_fund_detail, code, branches, timings, timed_out)
+
+
+async def get_fund_quotes_async(codes: List[str]) -> List[Dict[str, Any]]:
+    """
+    Batch watchlist quotes: shared valuation cache + batched upstream,
+    no PingZhong / holdings / indicators.
+    """
+    codes = list(dict.fromkeys(c for c in codes if c))
+    valuations = await get_combined_valuations_async(codes)
+    return await _in_threadpool(build_fund_quotes, codes, valuations)
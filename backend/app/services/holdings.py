@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+基金股票持仓（季报披露）的持久化存储。
+
+持仓构成每季度才披露一次，因此按 (code, report_period) 存入 fund_holdings 表，
+由后台任务在有新报告期"应披露"时才向 AkShare 拉取；详情页只读数据库
+（经内存 read-through 缓存），不再每次请求都调用 ak.fund_portfolio_hold_em。
+只有从未同步过的基金会在首次访问时冷启动拉取一次。
+
+报告期格式：YYYYQn（如 2024Q4），字符串可直接比较大小。
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+import akshare as ak
+import pandas as pd
+
+from ..config import Config
+from ..db import get_db_connection, select_in_chunks
+from .cache import TTLCache
+from . import deadline, rate_limit
+
+logger = logging.getLogger(__name__)
+
+_PERIOD_RE = r"(\d{4})年(\d)季度"
+
+# 持仓构成 read-through 缓存：数据库为准，同步任务写入新报告期后主动失效
+_holdings_cache = TTLCache(
+    "holdings", max_size=Config.DETAIL_CACHE_MAX_SIZE,
+    ttl=Config.DETAIL_HOLDINGS_TTL, stale_ttl=Config.DETAIL_STALE_TTL
+)
+
+
+def _quarter_end(period: str) -> date:
+    year, quarter = int(period[:4]), int(period[-1])
+    if quarter == 4:
+        return date(year, 12, 31)
+    return date(year, quarter * 3 + 1, 1) - timedelta(days=1)
+
+
+def latest_closed_period(today: Optional[date] = None) -> str:
+    """Most recent quarter that has already ended (its report may be out)."""
+    today = today or datetime.now().date()
+    quarter = (today.month - 1) // 3  # 当前季度之前的季度
+    if quarter == 0:
+        return f"{today.year - 1}Q4"
+    return f"{today.year}Q{quarter}"
+
+
+def _is_due(stored_period: Optional[str], checked_at: Optional[str], now: datetime) -> bool:
+    """
+    是否需要向上游拉取：
+    - 从未同步过：需要
+    - 已有最新已结束季度的数据：不需要
+    - 否则在披露窗口内（季末后 HOLDINGS_DISCLOSURE_WINDOW_DAYS 天）每 HOLDINGS_RECHECK_HOURS 检查一次，
+      窗口外（如债基无股票持仓、基金延迟披露）每 HOLDINGS_IDLE_RECHECK_DAYS 天检查一次
+    """
+    if checked_at is None:
+        return True
+    target = latest_closed_period(now.date())
+    if stored_period and stored_period >= target:
+        return False
+    try:
+        last_check = datetime.fromisoformat(str(checked_at))
+    except ValueError:
+        return True
+    in_window = now.date() <= _quarter_end(target) + timedelta(days=Config.HOLDINGS_DISCLOSURE_WINDOW_DAYS)
+    interval = (
+        timedelta(hours=Config.HOLDINGS_RECHECK_HOURS) if in_window
+        else timedelta(days=Config.HOLDINGS_IDLE_RECHECK_DAYS)
+    )
+    return now - last_check >= interval
+
+
+def normalize_holdings_frame(df: pd.DataFrame, fallback_period: str) -> pd.DataFrame:
+    """
+    Clean an ak.fund_portfolio_hold_em frame (vectorized).
+
+    Returns:
+        DataFrame[report_period, stock_code, stock_name, percent]，
+        只保留最新报告期，按股票去重，按占比降序
+    """
+    columns = ["report_period", "stock_code", "stock_name", "percent"]
+    if df is None or df.empty or "股票代码" not in df.columns:
+        return pd.DataFrame(columns=columns)
+
+    if "季度" in df.columns:
+        parts = df["季度"].astype(str).str.extract(_PERIOD_RE)
+        period = (parts[0] + "Q" + parts[1]).fillna(fallback_period)
+    else:
+        period = pd.Series(fallback_period, index=df.index)
+
+    if "占净值比例" in df.columns:
+        percent = pd.to_numeric(
+            df["占净值比例"].astype(str).str.rstrip("%"), errors="coerce"
+        ).fillna(0.0)
+    else:
+        percent = pd.Series(0.0, index=df.index)
+
+    out = pd.DataFrame({
+        "report_period": period,
+        "stock_code": df["股票代码"].astype(str).str.strip(),
+        "stock_name": df["股票名称"].astype(str).str.strip() if "股票名称" in df.columns else "",
+        "percent": percent.astype(float),
+    })
+    out = out[(out["stock_code"] != "") & (out["stock_code"] != "nan")]
+    if out.empty:
+        return out[columns]
+    out = out[out["report_period"] == out["report_period"].max()]
+    out = out.sort_values("percent", ascending=False, kind="stable")
+    return out.drop_duplicates("stock_code", keep="first")[columns].reset_index(drop=True)
+
+
+def _fetch_year(code: str, year: int) -> pd.DataFrame:
+    deadline.check()
+    rate_limit.wait(Config.AKSHARE_RATE_LIMIT_HOST, timeout=deadline.remaining())
+    return ak.fund_portfolio_hold_em(symbol=code, date=str(year))
+
+
+def _get_sync_state(cursor, code: str):
+    cursor.execute("SELECT report_period, checked_at FROM fund_holdings_sync WHERE code = ?", (code,))
+    return cursor.fetchone()
+
+
+def sync_fund_holdings(code: str) -> Optional[str]:
+    """
+    Fetch the latest disclosed holdings for one fund and persist them.
+
+    Returns:
+        写入的报告期；上游无持仓数据返回 None。上游请求失败时抛出异常（不记录检查时间）。
+    """
+    target = latest_closed_period()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    state = _get_sync_state(cursor, code)
+    stored_period = state["report_period"] if state else None
+
+    frame = normalize_holdings_frame(_fetch_year(code, int(target[:4])), target)
+    if frame.empty and not stored_period:
+        # 年初本年度尚无披露（或首次同步）：回退到上一年
+        prev_year = int(target[:4]) - 1
+        frame = normalize_holdings_frame(_fetch_year(code, prev_year), f"{prev_year}Q4")
+
+    period = None
+    if not frame.empty:
+        period = frame["report_period"].iat[0]
+        if stored_period and period < stored_period:
+            period = None  # 上游返回了旧报告期，保留已有数据
+
+    try:
+        if period:
+            cursor.execute(
+                "DELETE FROM fund_holdings WHERE code = ? AND report_period = ?", (code, period)
+            )
+            cursor.executemany("""
+                INSERT INTO fund_holdings (code, report_period, stock_code, stock_name, percent)
+                VALUES (?, ?, ?, ?, ?)
+            """, [
+                (code, period, stock_code, stock_name, float(percent))
+                for stock_code, stock_name, percent in zip(
+                    frame["stock_code"], frame["stock_name"], frame["percent"]
+                )
+            ])
+        cursor.execute("""
+            INSERT INTO fund_holdings_sync (code, report_period, checked_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(code) DO UPDATE SET
+                report_period = COALESCE(excluded.report_period, fund_holdings_sync.report_period),
+                checked_at = excluded.checked_at
+        """, (code, period or stored_period, datetime.now().isoformat(timespec="seconds")))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    if period:
+        _holdings_cache.invalidate(code)
+    return period
+
+
+def refresh_due_holdings(codes: Iterable[str]) -> Dict[str, int]:
+    """
+    Background job body: sync only funds whose next report period is due.
+
+    Returns:
+        {"checked": n, "updated": n, "failed": n}
+    """
+    codes = list(dict.fromkeys(c for c in codes if c))
+    result = {"checked": 0, "updated": 0, "failed": 0}
+    if not codes:
+        return result
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    states = {}
+    for row in select_in_chunks(cursor, """
+        SELECT code, report_period, checked_at FROM fund_holdings_sync
+        WHERE code IN ({placeholders})
+    """, codes):
+        states[row["code"]] = (row["report_period"], row["checked_at"])
+
+    now = datetime.now()
+    for code in codes:
+        stored_period, checked_at = states.get(code, (None, None))
+        if not _is_due(stored_period, checked_at, now):
+            continue
+        result["checked"] += 1
+        try:
+            period = sync_fund_holdings(code)
+            if period and period != stored_period:
+                result["updated"] += 1
+        except Exception as e:
+            result["failed"] += 1
+            logger.warning(f"Holdings sync failed for {code}: {e}")
+    return result
+
+
+def _read_latest_holdings(code: str) -> Optional[Dict[str, Any]]:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT report_period, stock_code, stock_name, percent FROM fund_holdings
+        WHERE code = ? AND report_period = (
+            SELECT MAX(report_period) FROM fund_holdings WHERE code = ?
+        )
+        ORDER BY percent DESC
+    """, (code, code))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    return {
+        "report_period": rows[0]["report_period"],
+        "rows": [(row["stock_code"], row["stock_name"], row["percent"]) for row in rows],
+        "concentration": float(sum(row["percent"] for row in rows[:10])),
+    }
+
+
+def load_latest_holdings(codes: Iterable[str]) -> Dict[str, list]:
+    """
+    Batch read of the latest stored report period per fund (DB only, never upstream).
+
+    Returns:
+        {code: [(stock_code, percent), ...]}，无持仓记录的基金不出现在结果中
+    """
+    codes = list(dict.fromkeys(c for c in codes if c))
+    result: Dict[str, list] = {}
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    for row in select_in_chunks(cursor, """
+        SELECT h.code, h.stock_code, h.percent FROM fund_holdings h
+        JOIN (
+            SELECT code, MAX(report_period) AS report_period FROM fund_holdings
+            WHERE code IN ({placeholders})
+            GROUP BY code
+        ) latest ON latest.code = h.code AND latest.report_period = h.report_period
+    """, codes):
+        result.setdefault(row["code"], []).append((row["stock_code"], row["percent"]))
+    return result
+
+
+def _load_composition(code: str) -> Optional[Dict[str, Any]]:
+    composition = _read_latest_holdings(code)
+    if composition is not None:
+        return composition
+
+    conn = get_db_connection()
+    if _get_sync_state(conn.cursor(), code) is None:
+        # 冷启动：从未同步过的基金拉取一次，之后交给后台任务
+        try:
+            sync_fund_holdings(code)
+        except Exception as e:
+            logger.warning(f"Holdings fetch error for {code}: {e}")
+            return None
+        composition = _read_latest_holdings(code)
+    return composition or {"report_period": None, "rows": [], "concentration": 0.0}
+
+
+def get_holdings_composition(code: str) -> Optional[Dict[str, Any]]:
+    """
+    Latest disclosed stock holdings (from the DB, via the read-through cache).
+
+    Returns:
+        {"report_period", "rows": [(stock_code, name, percent), ...] 按占比降序, "concentration": 前十占比}，
+        冷启动拉取失败返回 None（不缓存）
+    """
+    return _holdings_cache.get_or_refresh(code, _load_composition)
+
+
+def get_holdings_cache_stats() -> Dict[str, Any]:
+    return _holdings_cache.stats()
@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+"""
+技术指标批量计算引擎（夏普 / 波动率 / 最大回撤 / 年化收益）。
+
+把多只基金最近 INDICATOR_WINDOW 个净值从 fund_history 载入一个右对齐、
+NaN 填充的二维数组（每行一只基金），用掩码处理长短不一的序列，一次性
+向量化算出所有基金的指标，并按 (code, as_of_date) 持久化到 fund_indicators。
+详情页 / AI 分析只需按基金代码查表。
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import Config
+from ..db import get_db_connection, select_in_chunks
+
+logger = logging.getLogger(__name__)
+
+INDICATOR_WINDOW = 250   # 约一年交易日
+TRADING_DAYS = 250.0
+RISK_FREE_RATE = 0.02
+MIN_POINTS = 10          # 少于该净值个数不计算
+
+_EMPTY = {
+    "sharpe": "--",
+    "volatility": "--",
+    "max_drawdown": "--",
+    "annual_return": "--"
+}
+
+
+def empty_indicators() -> Dict[str, Any]:
+    return dict(_EMPTY)
+
+
+def compute_indicators(navs: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Vectorized indicators over a right-aligned, NaN-padded NAV matrix.
+
+    Args:
+        navs: shape (n_funds, window)，每行按日期升序，左侧不足部分为 NaN
+
+    Returns:
+        {"sharpe", "volatility", "max_drawdown", "annual_return", "sample_size", "valid",
+         "first", "last", "peak", "drawdown_peak", "ret_count", "ret_mean", "ret_m2"}，
+        各为 shape (n_funds,) 的数组（比例值，未乘 100）
+    """
+    navs = np.atleast_2d(np.asarray(navs, dtype=float))
+    n_funds, window = navs.shape
+    present = ~np.isnan(navs)
+    sample_size = present.sum(axis=1)
+    # 右对齐：第一个有效净值的列下标
+    first_col = np.clip(window - sample_size, 0, window - 1)
+    rows = np.arange(n_funds)
+    first = navs[rows, first_col]
+    last = navs[:, -1]
+    valid = (sample_size >= MIN_POINTS) & (first > 0) & (last > 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # 1. Returns (Daily)：任一端为 NaN 的收益为 NaN，被 nan* 聚合忽略
+        daily_returns = np.diff(navs, axis=1) / navs[:, :-1]
+        ret_count = (~np.isnan(daily_returns)).sum(axis=1)
+        ret_sum = np.nansum(daily_returns, axis=1)
+        ret_mean = np.where(ret_count > 0, ret_sum / np.maximum(ret_count, 1), 0.0)
+        ret_m2 = np.nansum((daily_returns - ret_mean[:, None]) ** 2, axis=1)
+
+        # 2. Annualized Return (years approximated from sample size)
+        total_return = last / first - 1
+        years = sample_size / TRADING_DAYS
+        annual_return = np.where(valid, (1 + total_return) ** (1 / np.where(years > 0, years, 1)) - 1, 0.0)
+
+        # 3. Annualized Volatility
+        volatility = np.where(valid, np.nanstd(np.where(valid[:, None], daily_returns, 0.0), axis=1), 0.0)
+        volatility = volatility * np.sqrt(TRADING_DAYS)
+
+        # 4. Sharpe Ratio
+        sharpe = np.where(volatility > 0, (annual_return - RISK_FREE_RATE) / volatility, 0.0)
+
+        # 5. Max Drawdown (fmax skips the NaN padding; also kept for short series, see state)
+        rolling_max = np.fmax.accumulate(navs, axis=1)
+        drawdowns = navs / rolling_max - 1
+        drawdowns = np.where(present, drawdowns, 0.0)
+        max_drawdown = drawdowns.min(axis=1)
+        # 最大回撤对应的峰值净值（增量维护时判断移出最旧点是否影响回撤）
+        trough = drawdowns.argmin(axis=1)
+        drawdown_peak = np.where(max_drawdown < 0, rolling_max[rows, trough], 0.0)
+
+    return {
+        "sharpe": sharpe,
+        "volatility": volatility,
+        "max_drawdown": max_drawdown,
+        "annual_return": annual_return,
+        "sample_size": sample_size,
+        "valid": valid,
+        # 增量状态所需的中间量
+        "first": first,
+        "last": last,
+        "peak": rolling_max[:, -1],
+        "drawdown_peak": drawdown_peak,
+        "ret_count": ret_count,
+        "ret_mean": ret_mean,
+        "ret_m2": ret_m2,
+    }
+
+
+def series_matrix(series: List[List[float]], window: int = INDICATOR_WINDOW) -> np.ndarray:
+    """Right-align ragged NAV lists (ascending) into a NaN-padded matrix."""
+    matrix = np.full((len(series), window), np.nan)
+    for i, values in enumerate(series):
+        values = values[-window:]
+        if values:
+            matrix[i, window - len(values):] = values
+    return matrix
+
+
+def format_indicators(sharpe: float, volatility: float, max_drawdown: float, annual_return: float) -> Dict[str, Any]:
+    return {
+        "sharpe": round(float(sharpe), 2),
+        "volatility": f"{round(float(volatility) * 100, 2)}%",
+        "max_drawdown": f"{round(float(max_drawdown) * 100, 2)}%",
+        "annual_return": f"{round(float(annual_return) * 100, 2)}%"
+    }
+
+
+def indicators_from_history(history: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Single-fund convenience wrapper (history ascending, [{"date", "nav"}, ...])."""
+    if not history or len(history) < MIN_POINTS:
+        return empty_indicators()
+    result = compute_indicators(series_matrix([[float(item["nav"]) for item in history]], len(history)))
+    if not result["valid"][0]:
+        return empty_indicators()
+    return format_indicators(
+        result["sharpe"][0], result["volatility"][0], result["max_drawdown"][0], result["annual_return"][0]
+    )
+
+
+def load_nav_matrix(
+    codes: List[str], window: int = INDICATOR_WINDOW
+) -> Tuple[List[str], np.ndarray, List[str], List[str]]:
+    """
+    Load the latest `window` NAVs per fund from fund_history.
+
+    Returns:
+        (codes, navs matrix (n, window), first_dates, as_of_dates)，只包含有净值记录的基金
+    """
+    series: Dict[str, List[float]] = {}
+    first_date: Dict[str, str] = {}
+    as_of: Dict[str, str] = {}
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    for row in select_in_chunks(cursor, """
+        SELECT code, date, nav FROM (
+            SELECT code, date, nav,
+                   ROW_NUMBER() OVER (PARTITION BY code ORDER BY date DESC) AS rn
+            FROM fund_history
+            WHERE code IN ({placeholders})
+        )
+        WHERE rn <= ?
+        ORDER BY code, date
+    """, codes, after=[window]):
+        series.setdefault(row["code"], []).append(row["nav"])
+        first_date.setdefault(row["code"], row["date"])
+        as_of[row["code"]] = row["date"]
+
+    found = [c for c in codes if c in series]
+    return (
+        found,
+        series_matrix([series[c] for c in found], window),
+        [first_date[c] for c in found],
+        [as_of[c] for c in found],
+    )
+
+
+def save_indicators(rows: List[tuple]) -> None:
+    """rows: [(code, as_of_date, sharpe, volatility, max_drawdown, annual_return, sample_size), ...]"""
+    if not rows:
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany("""
+            INSERT OR REPLACE INTO fund_indicators
+                (code, as_of_date, sharpe, volatility, max_drawdown, annual_return, sample_size, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def refresh_indicators(codes: Iterable[str]) -> int:
+    """
+    Recompute and persist indicators for many funds in one vectorized pass
+    per chunk (nightly job body). Also rebuilds the incremental state, which
+    doubles as the periodic full recompute that bounds floating-point drift.
+
+    Returns:
+        Number of funds written
+    """
+    codes = list(dict.fromkeys(c for c in codes if c))
+    written = 0
+    for i in range(0, len(codes), Config.INDICATORS_BATCH_SIZE):
+        found, navs, first_dates, as_of_dates = load_nav_matrix(codes[i:i + Config.INDICATORS_BATCH_SIZE])
+        if not found:
+            continue
+        result = compute_indicators(navs)
+        rows = [
+            (code, as_of, float(result["sharpe"][j]), float(result["volatility"][j]),
+             float(result["max_drawdown"][j]), float(result["annual_return"][j]), int(result["sample_size"][j]))
+            for j, (code, as_of) in enumerate(zip(found, as_of_dates))
+            if result["valid"][j]
+        ]
+        states = [
+            _state_from_result(code, first_date, as_of, result, j)
+            for j, (code, first_date, as_of) in enumerate(zip(found, first_dates, as_of_dates))
+        ]
+        save_indicators(rows)
+        _save_states(states)
+        written += len(rows)
+    return written
+
+
+def load_indicators(codes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Latest persisted indicators per fund.
+
+    Returns:
+        {code: {"as_of_date", "sample_size", "sharpe", "volatility", "max_drawdown", "annual_return"}}
+        指标为展示格式（同 format_indicators）
+    """
+    codes = list(dict.fromkeys(c for c in codes if c))
+    result = {}
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    for row in select_in_chunks(cursor, """
+        SELECT i.* FROM fund_indicators i
+        JOIN (
+            SELECT code, MAX(as_of_date) AS as_of_date FROM fund_indicators
+            WHERE code IN ({placeholders})
+            GROUP BY code
+        ) latest ON latest.code = i.code AND latest.as_of_date = i.as_of_date
+    """, codes):
+        result[row["code"]] = {
+            "as_of_date": row["as_of_date"],
+            "sample_size": row["sample_size"],
+            **format_indicators(row["sharpe"], row["volatility"], row["max_drawdown"], row["annual_return"]),
+        }
+    return result
+
+
+def get_fund_indicators(code: str, history: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Indicators for one fund: persisted row when it is current, otherwise
+    computed from `history` (ascending) and persisted.
+
+    Returns:
+        {"sharpe", "volatility", "max_drawdown", "annual_return"}（无数据为 "--"）
+    """
+    stored = load_indicators([code]).get(code)
+    history = (history or [])[-INDICATOR_WINDOW:]
+    if stored and (not history or stored["as_of_date"] >= history[-1]["date"]):
+        return {key: stored[key] for key in _EMPTY}
+    if not history:
+        return empty_indicators()
+
+    result = compute_indicators(series_matrix([[float(item["nav"]) for item in history]]))
+    if not result["valid"][0]:
+        return empty_indicators()
+    values = (result["sharpe"][0], result["volatility"][0], result["max_drawdown"][0], result["annual_return"][0])
+    try:
+        save_indicators([(code, history[-1]["date"], *map(float, values), int(result["sample_size"][0]))])
+    except Exception as e:
+        logger.warning(f"Failed to persist indicators for {code}: {e}")
+    return format_indicators(*values)
+
+
+def prune_indicators(keep_days: int) -> int:
+    cutoff = (datetime.now() - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM fund_indicators WHERE as_of_date < ?", (cutoff,))
+    deleted = cursor.rowcount
+    conn.commit()
+    return deleted
+
+
+# ----------------------------------------------------------------------------
+# Incremental maintenance
+#
+# fund_indicator_state 保存每只基金窗口内的运行量：日收益的 Welford 均值/M2、
+# 窗口端点（首/末日期与净值）、窗口最高净值、最大回撤及其峰值净值。追加一个新净值时：
+#   - 加入新收益（Welford add），更新峰值与回撤
+#   - 窗口超出 INDICATOR_WINDOW 时移出最旧净值 x0 及其收益（Welford remove）
+# 只要 x0 既不是窗口最高点也不是最大回撤的峰值（x0 < peak 且 x0 < drawdown_peak，
+# 或没有回撤），移出 x0 不改变窗口最高值和最大回撤，可精确 O(1) 维护；
+# 否则对该基金做一次全量重算。
+# 每 INDICATORS_FULL_RECOMPUTE_EVERY 次增量更新做一次全量重算并校验偏差。
+# ----------------------------------------------------------------------------
+
+_STATE_FIELDS = (
+    "first_date", "last_date", "first_nav", "last_nav", "sample_size",
+    "ret_count", "ret_mean", "ret_m2", "peak", "max_drawdown", "drawdown_peak", "updates_since_full",
+)
+
+
+def _state_from_result(code: str, first_date: str, last_date: str, result: Dict[str, np.ndarray], j: int) -> Dict[str, Any]:
+    return {
+        "code": code,
+        "first_date": first_date,
+        "last_date": last_date,
+        "first_nav": float(result["first"][j]),
+        "last_nav": float(result["last"][j]),
+        "sample_size": int(result["sample_size"][j]),
+        "ret_count": int(result["ret_count"][j]),
+        "ret_mean": float(result["ret_mean"][j]),
+        "ret_m2": float(result["ret_m2"][j]),
+        "peak": float(result["peak"][j]),
+        "max_drawdown": float(result["max_drawdown"][j]),
+        "drawdown_peak": float(result["drawdown_peak"][j]),
+        "updates_since_full": 0,
+    }
+
+
+def _save_states(states: List[Dict[str, Any]]) -> None:
+    if not states:
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    columns = ("code",) + _STATE_FIELDS
+    try:
+        cursor.executemany(f"""
+            INSERT OR REPLACE INTO fund_indicator_state ({', '.join(columns)}, updated_at)
+            VALUES ({', '.join('?' * len(columns))}, CURRENT_TIMESTAMP)
+        """, [tuple(state[c] for c in columns) for state in states])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _load_state(code: str) -> Optional[Dict[str, Any]]:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM fund_indicator_state WHERE code = ?", (code,))
+    row = cursor.fetchone()
+    return dict(row) if row else None
+
+
+def indicators_from_state(state: Dict[str, Any]) -> Optional[Tuple[float, float, float, float]]:
+    """
+    Indicator values from an incremental state, using the same formulas as
+    compute_indicators.
+
+    Returns:
+        (sharpe, volatility, max_drawdown, annual_return)，样本不足返回 None
+    """
+    n = state["sample_size"]
+    if n < MIN_POINTS or state["first_nav"] <= 0 or state["last_nav"] <= 0:
+        return None
+    total_return = state["last_nav"] / state["first_nav"] - 1
+    annual_return = (1 + total_return) ** (TRADING_DAYS / n) - 1
+    variance = max(state["ret_m2"], 0.0) / state["ret_count"] if state["ret_count"] else 0.0
+    volatility = float(np.sqrt(variance) * np.sqrt(TRADING_DAYS))
+    sharpe = (annual_return - RISK_FREE_RATE) / volatility if volatility > 0 else 0.0
+    return sharpe, volatility, state["max_drawdown"], annual_return
+
+
+def _persist_state(state: Dict[str, Any]) -> Optional[Tuple[float, float, float, float]]:
+    _save_states([state])
+    values = indicators_from_state(state)
+    if values is not None:
+        save_indicators([(state["code"], state["last_date"], *map(float, values), state["sample_size"])])
+    return values
+
+
+def rebuild_indicator_state(code: str) -> Optional[Dict[str, Any]]:
+    """Full recompute of one fund's state (and indicators row) from fund_history."""
+    found, navs, first_dates, as_of_dates = load_nav_matrix([code])
+    if not found:
+        return None
+    result = compute_indicators(navs)
+    state = _state_from_result(code, first_dates[0], as_of_dates[0], result, 0)
+    _persist_state(state)
+    return state
+
+
+def _check_drift(code: str, incremental: Dict[str, Any], rebuilt: Optional[Dict[str, Any]]) -> None:
+    """Compare the incremental state with a full recompute before discarding it."""
+    if rebuilt is None or incremental["last_date"] != rebuilt["last_date"]:
+        return
+    inc, full = indicators_from_state(incremental), indicators_from_state(rebuilt)
+    if inc is None or full is None:
+        return
+    drift = max(abs(a - b) for a, b in zip(inc, full))
+    if drift > Config.INDICATORS_DRIFT_TOLERANCE:
+        logger.warning(f"Indicator state drift for {code}: {drift:.2e} (reset by full recompute)")
+
+
+def apply_nav(code: str, nav_date: str, nav: float) -> Optional[Tuple[float, float, float, float]]:
+    """
+    Incrementally fold one newly appended NAV into the fund's indicator state.
+
+    O(1)：一次状态读取 + 最多一次两行的索引查询（窗口已满时取移出的净值）。
+    无状态、日期不连续、最旧点影响回撤或到达全量重算周期时改为全量重算。
+
+    Returns:
+        (sharpe, volatility, max_drawdown, annual_return)，样本不足为 None
+    """
+    state = _load_state(code)
+    if state is None or nav_date <= state["last_date"] or state["last_nav"] <= 0:
+        rebuilt = rebuild_indicator_state(code)
+        return indicators_from_state(rebuilt) if rebuilt else None
+
+    state["code"] = code
+    prev_nav = state["last_nav"]
+
+    # 1. Append: Welford add of the new daily return, running peak / drawdown
+    r = nav / prev_nav - 1
+    state["ret_count"] += 1
+    delta = r - state["ret_mean"]
+    state["ret_mean"] += delta / state["ret_count"]
+    state["ret_m2"] += delta * (r - state["ret_mean"])
+    state["sample_size"] += 1
+    state["last_date"], state["last_nav"] = nav_date, nav
+    state["peak"] = max(state["peak"], nav)
+    drawdown = nav / state["peak"] - 1
+    if drawdown < state["max_drawdown"]:
+        state["max_drawdown"], state["drawdown_peak"] = drawdown, state["peak"]
+
+    # 2. Slide: drop the oldest NAV once the window is exceeded
+    if state["sample_size"] > INDICATOR_WINDOW:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT date, nav FROM fund_history
+            WHERE code = ? AND date >= ?
+            ORDER BY date
+            LIMIT 2
+        """, (code, state["first_date"]))
+        rows = cursor.fetchall()
+        if len(rows) < 2 or rows[0]["date"] != state["first_date"]:
+            rebuilt = rebuild_indicator_state(code)
+            return indicators_from_state(rebuilt) if rebuilt else None
+        x0, x1 = float(rows[0]["nav"]), float(rows[1]["nav"])
+        affects_drawdown = state["max_drawdown"] < 0 and x0 >= state["drawdown_peak"]
+        if x0 >= state["peak"] or affects_drawdown:
+            rebuilt = rebuild_indicator_state(code)
+            return indicators_from_state(rebuilt) if rebuilt else None
+        dropped = x1 / x0 - 1
+        state["ret_count"] -= 1
+        delta = dropped - state["ret_mean"]
+        state["ret_mean"] -= delta / state["ret_count"]
+        state["ret_m2"] -= delta * (dropped - state["ret_mean"])
+        state["sample_size"] -= 1
+        state["first_date"], state["first_nav"] = rows[1]["date"], x1
+
+    # 3. Periodic full recompute bounds floating-point drift
+    state["updates_since_full"] += 1
+    if state["updates_since_full"] >= Config.INDICATORS_FULL_RECOMPUTE_EVERY:
+        rebuilt = rebuild_indicator_state(code)
+        _check_drift(code, state, rebuilt)
+        return indicators_from_state(rebuilt) if rebuilt else None
+
+    return _persist_state(state)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+盘中估值快照的列式存储。
+
+每个 (fund_code, date) 一行：estimates 为按分钟排列的 float32 数组（小端），
+下标 i 对应 start_minute + i（当日零点起的分钟数），未采集的分钟为 NaN。
+整日读取只需取一行；采集间隔 1 分钟时一只基金一天约 1KB。
+"""
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..db import get_db_connection, select_in_chunks
+
+logger = logging.getLogger(__name__)
+
+_DTYPE = np.dtype("<f4")
+
+
+def _to_minute(time_str: str) -> int:
+    """'HH:MM' -> minutes since midnight"""
+    hour, minute = time_str.split(":")[:2]
+    return int(hour) * 60 + int(minute)
+
+
+def _to_time(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def encode_series(values: np.ndarray) -> bytes:
+    return np.asarray(values, dtype=_DTYPE).tobytes()
+
+
+def decode_series(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=_DTYPE)
+
+
+def _place(start_minute: Optional[int], values: np.ndarray, minute: int, estimate: float):
+    """Write one value into a series, growing it (NaN-filled) in either direction."""
+    if start_minute is None or len(values) == 0:
+        return minute, np.array([estimate], dtype=_DTYPE)
+
+    new_start = min(start_minute, minute)
+    new_end = max(start_minute + len(values), minute + 1)
+    if new_start != start_minute or new_end != start_minute + len(values):
+        grown = np.full(new_end - new_start, np.nan, dtype=_DTYPE)
+        offset = start_minute - new_start
+        grown[offset:offset + len(values)] = values
+        values = grown
+    else:
+        values = values.copy()
+    values[minute - new_start] = estimate
+    return new_start, values
+
+
+def append_snapshots(date: str, time_str: str, estimates: Dict[str, float]) -> int:
+    """
+    Append one collection tick for many funds (one read + one batched write).
+
+    Args:
+        date: YYYY-MM-DD
+        time_str: HH:MM
+        estimates: {fund_code: estimate}
+
+    Returns:
+        Number of series written
+    """
+    if not estimates:
+        return 0
+    minute = _to_minute(time_str)
+    codes = list(estimates)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    if not conn.in_transaction:
+        cursor.execute("BEGIN IMMEDIATE")
+    try:
+        existing = {}
+        for row in select_in_chunks(cursor, """
+            SELECT fund_code, start_minute, estimates FROM fund_intraday_series
+            WHERE date = ? AND fund_code IN ({placeholders})
+        """, codes, before=[date]):
+            existing[row["fund_code"]] = (row["start_minute"], decode_series(row["estimates"]))
+
+        rows = []
+        for code in codes:
+            start, values = existing.get(code, (None, None))
+            start, values = _place(start, values, minute, float(estimates[code]))
+            rows.append((code, date, start, encode_series(values)))
+
+        cursor.executemany("""
+            INSERT OR REPLACE INTO fund_intraday_series (fund_code, date, start_minute, estimates, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows)
+
+
+def append_snapshot(code: str, date: str, time_str: str, estimate: float) -> None:
+    append_snapshots(date, time_str, {code: estimate})
+
+
+def read_snapshots(code: str, date: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, float]]:
+    """
+    Read one fund's snapshots for a day, optionally limited to [start, end] (HH:MM).
+
+    Returns:
+        [{"time": "HH:MM", "estimate": float}, ...] ascending by time
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT start_minute, estimates FROM fund_intraday_series
+        WHERE fund_code = ? AND date = ?
+    """, (code, date))
+    row = cursor.fetchone()
+    if not row:
+        return []
+
+    start_minute = row["start_minute"]
+    values = decode_series(row["estimates"])
+    lo = 0 if start is None else max(0, _to_minute(start) - start_minute)
+    hi = len(values) if end is None else min(len(values), _to_minute(end) - start_minute + 1)
+    if lo >= hi:
+        return []
+
+    window = values[lo:hi]
+    idx = np.flatnonzero(~np.isnan(window))
+    return [
+        {"time": _to_time(start_minute + lo + int(i)), "estimate": round(float(window[i]), 4)}
+        for i in idx
+    ]
+
+
+def delete_before(cutoff_date: str) -> int:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM fund_intraday_series WHERE date < ?", (cutoff_date,))
+    deleted = cursor.rowcount
+    conn.commit()
+    return deleted
+
+
+def migrate_row_snapshots(cursor) -> int:
+    """
+    One-off migration from the legacy row table fund_intraday_snapshots
+    (one row per fund/date/time) into fund_intraday_series, then drop it.
+    Runs inside init_db's transaction.
+
+    Returns:
+        Number of series written
+    """
+    cursor.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type='table' AND name='fund_intraday_snapshots'
+    """)
+    if not cursor.fetchone():
+        return 0
+
+    cursor.execute("""
+        SELECT fund_code, date, time, estimate FROM fund_intraday_snapshots
+        ORDER BY fund_code, date
+    """)
+    points: Dict[tuple, list] = {}
+    for row in cursor.fetchall():
+        try:
+            point = (_to_minute(row["time"]), float(row["estimate"]))
+        except (ValueError, TypeError):
+            continue
+        points.setdefault((row["fund_code"], row["date"]), []).append(point)
+
+    series = {}
+    for key, pts in points.items():
+        minutes = np.array([m for m, _ in pts])
+        start = int(minutes.min())
+        values = np.full(int(minutes.max()) - start + 1, np.nan, dtype=_DTYPE)
+        values[minutes - start] = [v for _, v in pts]
+        series[key] = (start, values)
+
+    cursor.executemany("""
+        INSERT OR REPLACE INTO fund_intraday_series (fund_code, date, start_minute, estimates)
+        VALUES (?, ?, ?, ?)
+    """, [(code, date, start, encode_series(values)) for (code, date), (start, values) in series.items()])
+    cursor.execute("DROP TABLE fund_intraday_snapshots")
+    logger.info(f"Migrated intraday snapshots into {len(series)} series")
+    return len(series)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+后台任务调度器。
+
+每个任务有独立的触发器（固定间隔 / 类 cron 的整点触发），由一个调度线程
+按下次触发时间分发到工作线程池执行，任务之间互不阻塞。
+同一任务上一次尚未结束时到达的触发记为 overrun 并跳过（不会并发执行同一任务）。
+"""
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from ..db import release_db_connection, releasing_db_connection
+
+logger = logging.getLogger(__name__)
+
+# China Standard Time (UTC+8)
+CST = timezone(timedelta(hours=8))
+
+
+class IntervalTrigger:
+    """
+    Fire every `seconds` seconds.
+
+    Args:
+        seconds: 间隔秒数，或返回秒数的函数（每次计算下次触发时重新读取，便于热更新配置）
+        align: 对齐到整倍数的墙钟时间（如 5 分钟间隔触发在 :00/:05/:10），避免累积漂移
+    """
+
+    def __init__(self, seconds: Union[float, Callable[[], float]], align: bool = False):
+        self._seconds = seconds
+        self.align = align
+        self._last: Optional[float] = None if callable(seconds) else max(1.0, float(seconds))
+
+    @property
+    def seconds(self) -> float:
+        value = self._seconds() if callable(self._seconds) else self._seconds
+        self._last = max(1.0, float(value))
+        return self._last
+
+    def next_fire(self, after: datetime) -> datetime:
+        interval = self.seconds
+        if not self.align:
+            return after + timedelta(seconds=interval)
+        ts = after.timestamp()
+        return datetime.fromtimestamp((ts // interval + 1) * interval, tz=after.tzinfo)
+
+    def __repr__(self):
+        # 不重新读取（函数可能查询数据库），显示最近一次计算下次触发时用的值
+        return f"every {self._last:g}s" if self._last is not None else "every ?s"
+
+
+class CronTrigger:
+    """
+    Fire at `minute` past the hour, for the given hours (CST).
+
+    Args:
+        hour: 小时（int / 可迭代），None 表示每小时
+        minute: 分钟
+    """
+
+    def __init__(self, hour: Union[None, int, Iterable[int]] = None, minute: int = 0):
+        if hour is None:
+            self.hours = set(range(24))
+        elif isinstance(hour, int):
+            self.hours = {hour}
+        else:
+            self.hours = set(hour)
+        self.minute = minute
+
+    def next_fire(self, after: datetime) -> datetime:
+        local = after.astimezone(CST)
+        candidate = local.replace(minute=self.minute, second=0, microsecond=0)
+        if candidate <= local:
+            candidate += timedelta(hours=1)
+        for _ in range(24 * 2):
+            if candidate.hour in self.hours:
+                return candidate
+            candidate += timedelta(hours=1)
+        raise ValueError("CronTrigger has no valid hours")
+
+    def __repr__(self):
+        return f"cron(hours={sorted(self.hours)}, minute={self.minute})"
+
+
+@releasing_db_connection
+def _next_fire(trigger, after: datetime) -> datetime:
+    """trigger.next_fire；调度线程长期存活，读过数据库的触发器用完即归还连接"""
+    return trigger.next_fire(after)
+
+
+class Job:
+    def __init__(self, name: str, func: Callable[[], Any], trigger, run_at_start: bool = False):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.run_at_start = run_at_start
+        self.next_run: Optional[datetime] = None
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.overruns = 0
+        self.last_started: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "trigger": repr(self.trigger),
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "overruns": self.overruns,
+            "last_started": self.last_started.isoformat() if self.last_started else None,
+            "last_duration": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "last_error": self.last_error,
+            "next_run": self.next_run.isoformat() if self.next_run else None,
+        }
+
+
+class JobScheduler:
+    """
+    Dispatcher thread + worker pool.
+
+    Usage:
+        scheduler = JobScheduler(max_workers=4)
+        scheduler.add_job("collect", collect_intraday_snapshots, IntervalTrigger(300, align=True))
+        scheduler.start()
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._heap: List[tuple] = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def add_job(self, name: str, func: Callable[[], Any], trigger, run_at_start: bool = False) -> Job:
+        job = Job(name, func, trigger, run_at_start)
+        now = datetime.now(CST)
+        first = now if run_at_start else _next_fire(trigger, now)
+        with self._cond:
+            if name in self._jobs:
+                raise ValueError(f"Job {name} already registered")
+            self._jobs[name] = job
+            self._schedule(job, first)
+            self._cond.notify()
+        return job
+
+    def _schedule(self, job: Job, when: datetime) -> None:
+        job.next_run = when
+        self._seq += 1
+        heapq.heappush(self._heap, (when.timestamp(), self._seq, job))
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._dispatch_loop, name="job-scheduler", daemon=True)
+        self._thread.start()
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if self._heap:
+                        delay = self._heap[0][0] - time.time()
+                        if delay <= 0:
+                            break
+                        self._cond.wait(timeout=min(delay, 60))
+                    else:
+                        self._cond.wait(timeout=60)
+                if self._stopped:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+                fire_at = job.next_run
+                if job.running:
+                    # 上一次执行还没结束：记录 overrun，跳过本次触发
+                    job.overruns += 1
+                    logger.warning(f"Job {job.name} overran its schedule (still running at {fire_at:%H:%M:%S}), skipping")
+                else:
+                    job.running = True
+                    self._pool.submit(self._run_job, job)
+            # 下次触发从计划时间（而不是执行完成时间）推算，保证节奏不受执行耗时影响。
+            # 触发器可能读数据库（如采集间隔配置），在锁外计算，不阻塞 add_job / shutdown
+            next_run = _next_fire(job.trigger, max(fire_at, datetime.now(CST) - timedelta(seconds=1)))
+            with self._cond:
+                if self._stopped:
+                    return
+                self._schedule(job, next_run)
+
+    def _run_job(self, job: Job) -> None:
+        started = time.monotonic()
+        job.last_started = datetime.now(CST)
+        try:
+            job.func()
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            logger.error(f"Job {job.name} failed: {e}")
+        finally:
+            # 工作线程长期存活，任务结束即归还数据库连接
+            release_db_connection()
+            job.last_duration = time.monotonic() - started
+            job.runs += 1
+            with self._cond:
+                job.running = False
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._cond:
+            return {name: job.stats() for name, job in self._jobs.items()}
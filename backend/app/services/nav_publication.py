@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+基金净值发布追踪（fund_nav_publication 表）。
+
+16:00 之后缓存里没有当日净值时，原逻辑每次调用 get_fund_history 都会向上游查一次，
+净值公布前整个晚上都在重复请求。这里按基金记录"某时刻查过、某日净值尚未公布"：
+
+- 未公布：按 NAV_CHECK_BACKOFF_BASE 起指数退避（上限 NAV_CHECK_BACKOFF_MAX）
+- 已公布：用最后一次未命中与本次命中之间的中点估计发布时刻，
+  以"净值日期 15:00 之后的分钟数"做 EWMA，得到该基金的典型发布延迟
+- 等待新净值时，在学习到的发布时刻之前不检查（QDII 等 T+2 基金同样适用），
+  避免所有基金在 16:00 同时打向上游
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from ..config import Config
+from ..db import get_db_connection
+from .trading_calendar import is_trading_day, next_trading_day, previous_trading_day
+
+logger = logging.getLogger(__name__)
+
+_stats_lock = threading.Lock()
+_stats = {"checks": 0, "skipped": 0, "published": 0, "missed": 0}
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def expected_nav_date(now: Optional[datetime] = None) -> str:
+    """Latest NAV date that could already be published at `now`."""
+    now = now or datetime.now()
+    today = now.date()
+    if is_trading_day(today) and now.hour >= Config.NAV_PUBLISH_HOUR:
+        return today.strftime("%Y-%m-%d")
+    return previous_trading_day(today).strftime("%Y-%m-%d")
+
+
+def _market_close(nav_date: str) -> datetime:
+    return datetime.fromisoformat(nav_date[:10]).replace(hour=15)
+
+
+def _default_delay_minutes() -> float:
+    return (Config.NAV_PUBLISH_HOUR - 15) * 60.0
+
+
+def _get_state(cursor, code: str) -> Optional[Dict[str, Any]]:
+    cursor.execute("SELECT * FROM fund_nav_publication WHERE code = ?", (code,))
+    row = cursor.fetchone()
+    return dict(row) if row else None
+
+
+def _parse_ts(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def refresh_due(code: str, latest_nav_date: str, now: Optional[datetime] = None) -> bool:
+    """
+    缓存最新净值早于 expected_nav_date 时，是否应向上游检查新净值。
+
+    - 正在等待同一日期的净值：到 next_check_at 才检查
+    - 开始等待新日期：到该基金学习到的发布时刻才检查（未学习时为 NAV_PUBLISH_HOUR）
+    """
+    now = now or datetime.now()
+    awaited = next_trading_day(datetime.fromisoformat(latest_nav_date[:10]).date()).strftime("%Y-%m-%d")
+    state = _get_state(get_db_connection().cursor(), code)
+
+    if state and state["pending_date"] == awaited:
+        next_check = _parse_ts(state["next_check_at"])
+        due = next_check is None or now >= next_check
+    else:
+        delay = state["delay_minutes"] if state and state["delay_minutes"] is not None else _default_delay_minutes()
+        due = now >= _market_close(awaited) + timedelta(minutes=delay)
+
+    _count("checks" if due else "skipped")
+    return due
+
+
+def record_check(code: str, previous_nav_date: str, latest_nav_date: Optional[str], now: Optional[datetime] = None) -> None:
+    """
+    Record the outcome of an upstream check made because refresh_due() said so.
+
+    Args:
+        previous_nav_date: 检查前缓存中的最新净值日期
+        latest_nav_date: 检查后的最新净值日期（检查失败时传 None，按未公布处理）
+    """
+    now = now or datetime.now()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    state = _get_state(cursor, code) or {
+        "pending_date": None, "misses": 0, "checked_at": None, "delay_minutes": None, "samples": 0
+    }
+    awaited = next_trading_day(datetime.fromisoformat(previous_nav_date[:10]).date()).strftime("%Y-%m-%d")
+
+    if latest_nav_date and latest_nav_date > previous_nav_date:
+        _count("published")
+        delay, samples = state["delay_minutes"], state["samples"]
+        last_miss = _parse_ts(state["checked_at"]) if state["pending_date"] == latest_nav_date[:10] else None
+        if last_miss is not None:
+            # 发布时刻在上次未命中与本次命中之间，取中点
+            observed = last_miss + (now - last_miss) / 2
+            minutes = (observed - _market_close(latest_nav_date)).total_seconds() / 60
+            minutes = min(max(minutes, 0.0), Config.NAV_PUBLISH_DELAY_MAX_HOURS * 60.0)
+            alpha = Config.NAV_PUBLISH_DELAY_ALPHA
+            delay = minutes if delay is None else (1 - alpha) * delay + alpha * minutes
+            samples += 1
+        values = (None, 0, now.isoformat(timespec="seconds"), None, delay, samples)
+    else:
+        _count("missed")
+        misses = state["misses"] + 1 if state["pending_date"] == awaited else 1
+        backoff = min(Config.NAV_CHECK_BACKOFF_BASE * 2 ** (misses - 1), Config.NAV_CHECK_BACKOFF_MAX)
+        values = (
+            awaited, misses, now.isoformat(timespec="seconds"),
+            (now + timedelta(seconds=backoff)).isoformat(timespec="seconds"),
+            state["delay_minutes"], state["samples"]
+        )
+
+    cursor.execute("""
+        INSERT INTO fund_nav_publication (code, pending_date, misses, checked_at, next_check_at, delay_minutes, samples)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(code) DO UPDATE SET
+            pending_date = excluded.pending_date,
+            misses = excluded.misses,
+            checked_at = excluded.checked_at,
+            next_check_at = excluded.next_check_at,
+            delay_minutes = excluded.delay_minutes,
+            samples = excluded.samples
+    """, (code, *values))
+    conn.commit()
+
+
+def get_publication_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+天天基金 PingZhongData（pingzhongdata/{code}.js）解析与原始响应缓存。
+
+该 JS 文件有数百 KB，原实现对整段文本跑约 8 次正则（其中 Data_netWorthTrend
+是 re.DOTALL 懒惰匹配），再逐点 time.localtime 转换日期。这里：
+
+- 一次扫描找出所有 `var X = ...;` 赋值的位置，只对需要的变量用 orjson 解码
+  （值的边界取到下一个赋值之前，去掉结尾的注释和分号；个别值解码失败时
+  回退到 json raw_decode 从起点解析）
+- 净值日期用 numpy 向量化换算（时间戳为北京时间 0 点，按 UTC+8 取日期，
+  与服务器时区无关）
+- 原始响应存磁盘（disk_cache.ResponseDiskCache），下次请求带 If-None-Match /
+  If-Modified-Since，304 时直接解析本地副本；上游失败时也用本地副本兜底
+"""
+import json
+import logging
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+
+import numpy as np
+import orjson
+
+from ..config import Config
+from .disk_cache import CachedResponse, ResponseDiskCache
+
+logger = logging.getLogger(__name__)
+
+# 不加 \b：以字面量开头的模式可走 re 的前缀快速查找（前一个字符在 extract_vars 中检查）
+_ASSIGN_RE = re.compile(rb"var\s+(\w+)\s*=\s*")
+
+PERFORMANCE_KEYS = ("syl_1n", "syl_6y", "syl_3y", "syl_1y")
+WANTED_VARS = frozenset((
+    "fS_name", "fS_code", "Data_currentFundManager", "Data_performanceEvaluation", "Data_netWorthTrend",
+    *PERFORMANCE_KEYS,
+))
+
+# x 为北京时间当日 0 点的毫秒时间戳
+_CST_OFFSET_MS = 8 * 3600 * 1000
+_DAY_MS = 86400 * 1000
+
+# 日序号 -> "YYYY-MM-DD"。各基金的净值日期基本都是同一批交易日，
+# 只为没见过的日期调用 np.datetime_as_string；取值范围即自然日总数，有界
+_day_names: Dict[int, str] = {}
+
+
+def _value_end(payload: bytes, start: int, stop: int) -> int:
+    """End of the value in payload[start:stop]: drop trailing whitespace, /* comments */ and `;`."""
+    while stop > start:
+        while stop > start and payload[stop - 1] in b" \t\r\n":
+            stop -= 1
+        if payload.endswith(b"*/", start, stop):
+            comment = payload.rfind(b"/*", start, stop - 2)
+            if comment < 0:
+                break
+            stop = comment
+            continue
+        if payload.endswith(b";", start, stop):
+            stop -= 1
+            continue
+        break
+    return stop
+
+
+def extract_vars(payload: bytes, names: Iterable[str] = WANTED_VARS) -> Dict[str, Any]:
+    """
+    Decode the `var X = <json>;` assignments named in `names` with one scan of the payload.
+
+    Returns:
+        {name: decoded value}，缺失或无法解码的变量不出现在结果中
+    """
+    wanted = set(names)
+    assignments = [
+        m for m in _ASSIGN_RE.finditer(payload)
+        if m.start() == 0 or not (payload[m.start() - 1:m.start()].isalnum() or payload[m.start() - 1] == 0x5F)
+    ]
+    values = {}
+    for i, match in enumerate(assignments):
+        name = match.group(1).decode("ascii", "replace")
+        if name not in wanted or name in values:
+            continue
+        start = match.end()
+        stop = assignments[i + 1].start() if i + 1 < len(assignments) else len(payload)
+        try:
+            values[name] = orjson.loads(memoryview(payload)[start:_value_end(payload, start, stop)])
+        except orjson.JSONDecodeError:
+            # 值里含有类似 "var x =" 的文本时边界会截错，从起点按 JSON 语法解析
+            try:
+                values[name] = json.JSONDecoder().raw_decode(payload[start:].decode("utf-8", "replace"))[0]
+            except ValueError:
+                logger.debug(f"PingZhong variable {name} is not JSON")
+    return values
+
+
+def nav_history(points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Data_netWorthTrend points -> [{"date": "YYYY-MM-DD", "nav": float}, ...] (vectorized)."""
+    points = [p for p in points if "x" in p and "y" in p]
+    if not points:
+        return []
+    xs = np.array([p["x"] for p in points], dtype=np.int64)
+    navs = np.array([p["y"] for p in points], dtype=float)
+    keep = np.isfinite(navs)
+    days = ((xs[keep] + _CST_OFFSET_MS) // _DAY_MS).tolist()
+    unseen = list(set(days).difference(_day_names))
+    if unseen:
+        _day_names.update(zip(unseen, np.datetime_as_string(np.array(unseen, dtype="datetime64[D]")).tolist()))
+    return [{"date": _day_names[d], "nav": v} for d, v in zip(days, navs[keep].tolist())]
+
+
+def parse_pingzhong(payload: Union[bytes, str], code: str) -> Dict[str, Any]:
+    """
+    Parse PingZhongData JS payload into name/manager/returns/performance/history.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    values = extract_vars(payload)
+    data = {}
+
+    for key, field in (("fS_name", "name"), ("fS_code", "code"), *((k, k) for k in PERFORMANCE_KEYS)):
+        if isinstance(values.get(key), str):
+            data[field] = values[key]
+
+    managers = values.get("Data_currentFundManager")
+    if isinstance(managers, list) and managers:
+        try:
+            data["manager"] = ", ".join([m["name"] for m in managers])
+        except (KeyError, TypeError):
+            pass
+
+    # Performance Evaluation (Capability Scores): {"avr":"72.25","categories":[...],"data":[80.0,70.0...]}
+    perf = values.get("Data_performanceEvaluation")
+    if isinstance(perf, dict) and "data" in perf and "categories" in perf:
+        data["performance"] = dict(zip(perf["categories"], perf["data"]))
+
+    # Full History: [{"x":1536076800000,"y":1.0,...},...]
+    raw_hist = values.get("Data_netWorthTrend")
+    if raw_hist is None:
+        # Data_netWorthTrend not found - may be 货币基金 or new page structure
+        logger.warning(f"Data_netWorthTrend not found for {code}")
+    elif not raw_hist:
+        logger.warning(f"Empty Data_netWorthTrend for {code}")
+    else:
+        try:
+            data["history"] = nav_history(raw_hist)
+        except Exception as e:
+            logger.error(f"Failed to parse Data_netWorthTrend for {code}: {e}")
+
+    return data
+
+
+_disk_cache: Optional[ResponseDiskCache] = None
+
+
+def _get_disk_cache() -> Optional[ResponseDiskCache]:
+    global _disk_cache
+    if _disk_cache is None and Config.PINGZHONG_DISK_CACHE_DIR:
+        _disk_cache = ResponseDiskCache("pingzhong", Config.PINGZHONG_DISK_CACHE_DIR, suffix=".js")
+    return _disk_cache
+
+
+_stats_lock = threading.Lock()
+_stats = {"revalidated": 0, "downloaded": 0, "fallback": 0, "invalid": 0}
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def load_cached(code: str) -> Optional[CachedResponse]:
+    cache = _get_disk_cache()
+    return cache.load(code) if cache else None
+
+
+def conditional_headers(cached: Optional[CachedResponse]) -> Dict[str, str]:
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    return headers
+
+
+def payload_from_response(
+    code: str,
+    cached: Optional[CachedResponse],
+    status_code: Optional[int] = None,
+    content: Optional[bytes] = None,
+    headers: Optional[Mapping[str, str]] = None
+) -> Optional[bytes]:
+    """
+    The payload to parse for a (conditional) PingZhong request.
+
+    - 200：响应体确为 PingZhongData（能解出 fS_code）时保存到磁盘并返回；
+      否则（如状态码 200 的 HTML 错误页）不保存，按请求失败处理
+    - 304：返回本地副本
+    - 请求失败（不传 status_code）或其他状态码：有本地副本时返回副本兜底
+    """
+    cache = _get_disk_cache()
+    if status_code == 200 and content:
+        if "fS_code" in extract_vars(content, ("fS_code",)):
+            _count("downloaded")
+            if cache:
+                cache.store(code, content, headers.get("ETag") if headers else None,
+                            headers.get("Last-Modified") if headers else None)
+            return content
+        _count("invalid")
+        logger.warning(f"PingZhong response for {code} is not a PingZhongData payload, not cached")
+    if cached is None:
+        return None
+    if status_code == 304:
+        _count("revalidated")
+        cache.touch(code)
+    else:
+        _count("fallback")
+        logger.info(f"Serving cached PingZhong payload for {code} (upstream status {status_code})")
+    return cached.body
+
+
+def prune_disk_cache() -> int:
+    cache = _get_disk_cache()
+    return cache.prune(Config.PINGZHONG_DISK_CACHE_MAX_AGE_DAYS * 86400) if cache else 0
+
+
+def get_disk_cache_stats() -> Dict[str, Any]:
+    cache = _get_disk_cache()
+    with _stats_lock:
+        return {**(cache.stats() if cache else {}), **_stats}
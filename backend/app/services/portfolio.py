@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+持仓估值引擎。
+
+输入持仓表（account_id, code, shares, cost）和估值，一次性用 NumPy 计算
+所有持仓的市值 / 收益 / 收益率，供单账户持仓和跨账户聚合共用。
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from ..db import get_db_connection, select_in_chunks
+from .fund import guess_fund_type, get_fund_category
+
+logger = logging.getLogger(__name__)
+
+# 估算涨跌幅超过该值时视为异常（ETF / 联接基金除外）
+MAX_VALID_EST_RATE = 10.0
+
+_EMPTY_SUMMARY = {
+    "total_market_value": 0.0,
+    "total_cost": 0.0,
+    "total_income": 0.0,
+    "total_return_rate": 0.0,
+    "total_day_income": 0.0
+}
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def load_fund_meta(codes: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """
+    Batch lookup of fund name/type and latest cached NAV date.
+
+    Returns:
+        (fund_info_map {code: {"name", "type"}}, nav_date_map {code: latest_date})
+    """
+    fund_info_map = {}
+    nav_date_map = {}
+    if not codes:
+        return fund_info_map, nav_date_map
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    for row in select_in_chunks(cursor, """
+        SELECT code, name, type FROM funds WHERE code IN ({placeholders})
+    """, codes):
+        fund_info_map[row["code"]] = {"name": row["name"], "type": row["type"]}
+
+    for row in select_in_chunks(cursor, """
+        SELECT code, MAX(date) as latest_date
+        FROM fund_history
+        WHERE code IN ({placeholders})
+        GROUP BY code
+    """, codes):
+        nav_date_map[row["code"]] = row["latest_date"]
+    return fund_info_map, nav_date_map
+
+
+def value_positions(rows: list, valuations: Dict[str, Dict[str, Any]], aggregate: bool = False) -> Dict[str, Any]:
+    """
+    Compute per-position PnL and portfolio summary.
+
+    Args:
+        rows: 持仓行（需包含 code, shares, cost）
+        valuations: {code: valuation}（get_combined_valuations 的结果）
+        aggregate: True 时按基金代码跨账户合并（份额相加，成本按份额加权平均）
+
+    Returns:
+        {"summary": {...}, "positions": [...]}，positions 按估算市值降序
+    """
+    if not rows:
+        return {"summary": dict(_EMPTY_SUMMARY), "positions": []}
+
+    row_codes = np.array([row["code"] for row in rows])
+    row_shares = np.array([_to_float(row["shares"]) for row in rows])
+    row_cost = np.array([_to_float(row["cost"]) for row in rows])
+
+    if aggregate:
+        codes, inverse = np.unique(row_codes, return_inverse=True)
+        shares = np.bincount(inverse, weights=row_shares)
+        cost_basis_sum = np.bincount(inverse, weights=row_shares * row_cost)
+        keep = shares > 0
+        codes, shares, cost_basis_sum = codes[keep], shares[keep], cost_basis_sum[keep]
+        cost = cost_basis_sum / shares
+    else:
+        codes, shares, cost = row_codes, row_shares, row_cost
+
+    codes = codes.tolist()
+    fund_info_map, nav_date_map = load_fund_meta(list(dict.fromkeys(codes)))
+    today_str = datetime.now().strftime("%Y-%m-%d")
+
+    data_list = [valuations.get(code) or {} for code in codes]
+    names = [
+        data.get("name") or fund_info_map.get(code, {}).get("name") or code
+        for code, data in zip(codes, data_list)
+    ]
+    nav = np.array([_to_float(d.get("nav", 0.0)) for d in data_list])
+    estimate = np.array([_to_float(d.get("estimate", 0.0)) for d in data_list])
+    est_rate = np.array([_to_float(d.get("est_rate", d.get("estRate", 0.0))) for d in data_list])
+    volatile_ok = np.array(["ETF" in name or "联接" in name for name in names], dtype=bool)
+
+    # 1. Base Metrics
+    nav_market_value = nav * shares
+    cost_basis = cost * shares
+
+    # 2. Estimate & Reliability Check
+    # Validation: If estRate is absurdly high for a fund (abs > 10%), ignore estimate
+    # (ETFs / 联接 allowed higher volatility). Linus: "Trust, but verify."
+    is_est_valid = (estimate > 0) & (nav > 0) & ((np.abs(est_rate) < MAX_VALID_EST_RATE) | volatile_ok)
+
+    # 3. Derived Metrics
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # A. Confirmed (Based on Yesterday's NAV)
+        accumulated_income = nav_market_value - cost_basis
+        accumulated_return_rate = np.where(cost_basis > 0, accumulated_income / cost_basis * 100, 0.0)
+
+        # B. Intraday (Based on Real-time Estimate); fallback to confirmed value
+        day_income = np.where(is_est_valid, (estimate - nav) * shares, 0.0)
+        est_market_value = np.where(is_est_valid, estimate * shares, nav_market_value)
+
+        # C. Total Projected
+        total_income = accumulated_income + day_income
+        total_return_rate = np.where(cost_basis > 0, total_income / cost_basis * 100, 0.0)
+
+    rounded = {
+        key: np.round(values, 2).tolist()
+        for key, values in (
+            ("cost_basis", cost_basis),
+            ("nav_market_value", nav_market_value),
+            ("est_market_value", est_market_value),
+            ("accumulated_income", accumulated_income),
+            ("accumulated_return_rate", accumulated_return_rate),
+            ("day_income", day_income),
+            ("total_income", total_income),
+            ("total_return_rate", total_return_rate),
+        )
+    }
+
+    positions = []
+    for i, code in enumerate(codes):
+        data = data_list[i]
+        fund_type = fund_info_map.get(code, {}).get("type") or guess_fund_type(names[i])
+        latest_date = nav_date_map.get(code)
+        positions.append({
+            "code": code,
+            "name": names[i],
+            "type": fund_type,
+            "category": get_fund_category(fund_type),
+            "cost": float(cost[i]),
+            "shares": float(shares[i]),
+            "nav": float(nav[i]),
+            "nav_date": data.get("navDate", "--"),
+            "nav_updated_today": latest_date == today_str if latest_date else False,
+            "estimate": float(estimate[i]),
+            "est_rate": float(est_rate[i]),
+            "is_est_valid": bool(is_est_valid[i]),
+
+            # Values
+            "cost_basis": rounded["cost_basis"][i],
+            "nav_market_value": rounded["nav_market_value"][i],
+            "est_market_value": rounded["est_market_value"][i],
+
+            # PnL
+            "accumulated_income": rounded["accumulated_income"][i],
+            "accumulated_return_rate": rounded["accumulated_return_rate"][i],
+            "day_income": rounded["day_income"][i],
+            "total_income": rounded["total_income"][i],
+            "total_return_rate": rounded["total_return_rate"][i],
+
+            "update_time": data.get("time", "--")
+        })
+
+    total_market_value = float(est_market_value.sum())  # Projected
+    total_cost = float(cost_basis.sum())
+    total_day_income = float(day_income.sum())
+    total_income_sum = total_market_value - total_cost
+    total_return_rate_sum = (total_income_sum / total_cost * 100) if total_cost > 0 else 0.0
+
+    return {
+        "summary": {
+            "total_market_value": round(total_market_value, 2),
+            "total_cost": round(total_cost, 2),
+            "total_day_income": round(total_day_income, 2),
+            "total_income": round(total_income_sum, 2),
+            "total_return_rate": round(total_return_rate_sum, 2)
+        },
+        "positions": sorted(positions, key=lambda x: x["est_market_value"], reverse=True)
+    }
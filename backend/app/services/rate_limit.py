@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+按上游 host 的令牌桶限流。
+
+取代循环里硬编码的 time.sleep：突发请求在桶容量内立即放行，
+持续请求被平滑到配置的速率，多个线程（调度任务、API 请求）共享同一个桶。
+
+同步调用（fund._http_get）阻塞等待令牌，异步调用（fund_async._get）用 acquire_async
+在协程中等待，两者共用同一个按 host 的桶，共享同一个速率上限。
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from ..config import Config
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Args:
+        rate: 每秒补充的令牌数
+        capacity: 桶容量（允许的突发请求数）
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._acquired = 0
+        self._waited = 0
+        self._wait_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens without blocking. Returns False if the bucket is short."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self._acquired += 1
+                return True
+            return False
+
+    def _take(self, tokens: float, started: float, waited: bool) -> float:
+        """Take tokens if available (returns 0), otherwise the seconds until they will be."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self._acquired += 1
+                if waited:
+                    self._waited += 1
+                    self._wait_seconds += now - started
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        Block until tokens are available.
+
+        Returns:
+            True if acquired, False if timeout expired first
+        """
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        waited = False
+        while True:
+            delay = self._take(tokens, started, waited)
+            if not delay:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                delay = min(delay, remaining)
+            waited = True
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """acquire() for coroutines: waits with asyncio.sleep instead of blocking the thread."""
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        waited = False
+        while True:
+            delay = self._take(tokens, started, waited)
+            if not delay:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                delay = min(delay, remaining)
+            waited = True
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate,
+                "capacity": self.capacity,
+                "tokens": round(self._tokens, 2),
+                "acquired": self._acquired,
+                "waited": self._waited,
+                "wait_seconds": round(self._wait_seconds, 3),
+            }
+
+
+class RateLimitTimeout(RuntimeError):
+    """No token for the host within the wait limit (RATE_LIMIT_MAX_WAIT or the caller's timeout)."""
+
+    def __init__(self, host: str):
+        super().__init__(f"Rate limit wait for {host} timed out")
+        self.host = host
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(host: str) -> TokenBucket:
+    """Get (or lazily create) the shared bucket for an upstream host."""
+    bucket = _buckets.get(host)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(host)
+            if bucket is None:
+                rate, capacity = Config.HOST_RATE_LIMITS.get(host, Config.DEFAULT_HOST_RATE_LIMIT)
+                bucket = _buckets[host] = TokenBucket(rate, capacity)
+    return bucket
+
+
+def acquire(host: str, timeout: Optional[float] = None) -> bool:
+    """
+    Block until one request to `host` is allowed.
+
+    Args:
+        timeout: 最长等待秒数，None 为 RATE_LIMIT_MAX_WAIT（不会无限等待）
+
+    Returns:
+        True if acquired, False if the wait timed out
+    """
+    return get_bucket(host).acquire(timeout=Config.RATE_LIMIT_MAX_WAIT if timeout is None else timeout)
+
+
+def acquire_for_url(url: str, timeout: Optional[float] = None) -> bool:
+    return acquire(urlsplit(url).hostname or "", timeout=timeout)
+
+
+async def acquire_async(host: str, timeout: Optional[float] = None) -> bool:
+    """Async acquire() from the same bucket (timeout None: RATE_LIMIT_MAX_WAIT)."""
+    return await get_bucket(host).acquire_async(timeout=Config.RATE_LIMIT_MAX_WAIT if timeout is None else timeout)
+
+
+def wait(host: str, timeout: Optional[float] = None) -> None:
+    """acquire() that raises RateLimitTimeout instead of returning False."""
+    if not acquire(host, timeout=timeout):
+        raise RateLimitTimeout(host)
+
+
+def get_rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    return {host: bucket.stats() for host, bucket in list(_buckets.items())}
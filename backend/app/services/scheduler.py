@@ -1,15 +1,18 @@
 import logging
-import threading
 import time
 from datetime import datetime, timedelta, timezone
 import akshare as ak
 import pandas as pd
-from ..db import get_db_connection
+from ..db import get_db_connection, reap_db_connections
 from ..config import Config
-from ..services.fund import get_combined_valuation
+from ..services.fund import get_combined_valuations
 from ..services.subscription import get_active_subscriptions, update_notification_time
 from ..services.email import send_email
 from ..services.trade import process_pending_transactions
+from ..services.intraday_store import append_snapshots, delete_before
+from ..services.holdings import refresh_due_holdings
+from ..services.indicators import refresh_indicators, prune_indicators
+from ..services.pingzhong import prune_disk_cache
 
 logger = logging.getLogger(__name__)
 
@@ -77,25 +80,8 @@ def fetch_and_update_funds():
 from ..services.subscription import get_active_subscriptions, update_notification_time, update_digest_time
 from ..services.trading_calendar import is_trading_day
 
-def collect_intraday_snapshots():
-    """
-    Collect intraday valuation snapshots for holdings + watchlist (every N minutes during trading hours).
-    Only runs on trading days between 09:35-15:05.
-    Interval is configurable via INTRADAY_COLLECT_INTERVAL setting.
-    """
-    now_cst = datetime.now(CST)
-    today = now_cst.date()
-
-    # 1. Check if trading day
-    if not is_trading_day(today):
-        return
-
-    # 2. Check if within collection window (09:35-15:05)
-    current_time = now_cst.strftime("%H:%M")
-    if current_time < "09:35" or current_time > "15:05":
-        return
-
-    # 3. Get holdings + watchlist (all funds users care about)
+def get_tracked_fund_codes():
+    """Funds users care about: all positions + every watchlist (deduplicated)."""
     conn = get_db_connection()
     cursor = conn.cursor()
 
@@ -137,6 +123,29 @@ def collect_intraday_snapshots():
 
     # Remove duplicates and filter out empty strings
     codes = list(set([c for c in codes if c and isinstance(c, str)]))
+    return codes
+
+
+def collect_intraday_snapshots():
+    """
+    Collect intraday valuation snapshots for holdings + watchlist (every N minutes during trading hours).
+    Only runs on trading days between 09:35-15:05.
+    Interval is configurable via INTRADAY_COLLECT_INTERVAL setting.
+    """
+    now_cst = datetime.now(CST)
+    today = now_cst.date()
+
+    # 1. Check if trading day
+    if not is_trading_day(today):
+        return
+
+    # 2. Check if within collection window (09:35-15:05)
+    current_time = now_cst.strftime("%H:%M")
+    if current_time < "09:35" or current_time > "15:05":
+        return
+
+    # 3. Get holdings + watchlist (all funds users care about)
+    codes = get_tracked_fund_codes()
 
     if not codes:
         return
@@ -145,26 +154,24 @@ def collect_intraday_snapshots():
     date_str = today.strftime("%Y-%m-%d")
     time_str = now_cst.strftime("%H:%M")
 
-    collected = 0
+    # Batch fetch: Eastmoney fan-out on a bounded pool + multi-symbol Sina requests
+    valuations = get_combined_valuations(codes)
+
+    estimates = {}
     skipped = 0
     for code in codes:
-        try:
-            data = get_combined_valuation(code)
-            if data and data.get("estimate"):
-                cursor.execute("""
-                    INSERT OR REPLACE INTO fund_intraday_snapshots
-                    (fund_code, date, time, estimate)
-                    VALUES (?, ?, ?, ?)
-                """, (code, date_str, time_str, float(data["estimate"])))
-                collected += 1
-            else:
-                skipped += 1
-                logger.warning(f"Skipped {code}: no estimate data (data={data})")
-            time.sleep(0.2)  # Avoid API rate limiting (reduced from 0.5s)
-        except Exception as e:
-            logger.error(f"Intraday collect failed for {code}: {e}")
+        data = valuations.get(code)
+        if data and data.get("estimate"):
+            estimates[code] = float(data["estimate"])
+        else:
+            skipped += 1
+            logger.warning(f"Skipped {code}: no estimate data (data={data})")
 
-    conn.commit()
+    collected = 0
+    try:
+        collected = append_snapshots(date_str, time_str, estimates)
+    except Exception as e:
+        logger.error(f"Intraday collect failed at {time_str}: {e}")
 
     if collected > 0:
         logger.info(f"Collected {collected} intraday snapshots at {time_str} (skipped {skipped})")
@@ -177,14 +184,16 @@ def cleanup_old_intraday_data():
     now_cst = datetime.now(CST)
     cutoff = (now_cst - timedelta(days=30)).strftime("%Y-%m-%d")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM fund_intraday_snapshots WHERE date < ?", (cutoff,))
-    deleted = cursor.rowcount
-    conn.commit()
+    deleted = delete_before(cutoff)
     if deleted > 0:
         logger.info(f"Cleaned up {deleted} old intraday records (before {cutoff})")
 
+def cleanup_pingzhong_cache():
+    # 长期未访问的 PingZhongData 原始响应文件
+    removed = prune_disk_cache()
+    if removed:
+        logger.info(f"Pruned {removed} cached PingZhong payloads")
+
 def update_holdings_nav():
     """
     Update NAV (net asset value) for all holdings.
@@ -192,7 +201,7 @@ def update_holdings_nav():
     Runs between 16:00-24:00 on trading days.
     Only counts as success if today's NAV is available.
     """
-    from .fund import get_fund_history
+    from .fund import get_fund_histories
     from .trading_calendar import is_trading_day
 
     now_cst = datetime.now(CST)
@@ -217,24 +226,21 @@ def update_holdings_nav():
     if not codes:
         return
 
-    # Update NAV for each fund
+    # Update NAV for all funds in parallel (paced by per-host rate limits)
     updated = 0  # Today's NAV available
     pending = 0  # Today's NAV not yet published
 
-    for code in codes:
-        try:
-            # Fetch latest 5 days history
-            history = get_fund_history(code, limit=5)
-            if history:
-                # Check if latest NAV is today's
-                latest_date = history[-1]["date"]
-                if latest_date == today_str:
-                    updated += 1
-                else:
-                    pending += 1
-            time.sleep(0.3)  # Avoid API rate limiting
-        except Exception as e:
-            logger.error(f"Failed to update NAV for {code}: {e}")
+    for code, history in get_fund_histories(codes, limit=5).items():
+        if isinstance(history, Exception):
+            logger.error(f"Failed to update NAV for {code}: {history}")
+            continue
+        if history:
+            # Check if latest NAV is today's
+            latest_date = history[-1]["date"]
+            if latest_date == today_str:
+                updated += 1
+            else:
+                pending += 1
 
     if updated > 0 or pending > 0:
         logger.info(f"NAV update: {updated} updated, {pending} pending (total {len(codes)})")
@@ -252,19 +258,15 @@ def check_subscriptions():
     today_str = now_cst.strftime("%Y-%m-%d")
     current_time_str = now_cst.strftime("%H:%M")
 
-    # Cache valuations during this run to avoid duplicate API calls
-    valuations = {}
+    # Fetch valuations for all subscribed funds in one batch
+    valuations = get_combined_valuations([sub["code"] for sub in subs])
 
     for sub in subs:
         code = sub["code"]
         sub_id = sub["id"]
         email = sub["email"]
         
-        # 1. Fetch data if needed
-        if code not in valuations:
-            valuations[code] = get_combined_valuation(code)
-        
-        data = valuations[code]
+        data = valuations.get(code)
         if not data: continue
         
         est_rate = data.get("estRate", 0.0)
@@ -319,76 +321,110 @@ def check_subscriptions():
                     if send_email(email, subject, content, is_html=True):
                         update_digest_time(sub_id)
 
-def start_scheduler():
-    """
-    Simple background thread to check if data needs update.
-    """
-    def _run():
-        # 1. Initial fund list update
+def _get_collect_interval_seconds() -> float:
+    """INTRADAY_COLLECT_INTERVAL setting (minutes, single-user scope), default 5."""
+    try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT count(*) as cnt FROM funds")
-        count = cursor.fetchone()["cnt"]
-        
+        cursor.execute("""
+            SELECT value FROM settings
+            WHERE key = 'INTRADAY_COLLECT_INTERVAL' AND user_id IS NULL
+        """)
+        row = cursor.fetchone()
+        return int(row["value"]) * 60 if row and row["value"] else 300
+    except Exception as e:
+        logger.warning(f"Failed to read INTRADAY_COLLECT_INTERVAL: {e}")
+        return 300
 
-        if count == 0:
-            logger.info("DB is empty. Performing initial fetch.")
-            fetch_and_update_funds()
 
-        # 2. Main loop
-        last_cleanup_date = None
-        last_nav_update_hour = None
-        last_session_cleanup_hour = None  # Track session cleanup
+def apply_pending_transactions():
+    # 待确认加仓/减仓：用当日已公布净值更新持仓
+    n = process_pending_transactions()
+    if n:
+        logger.info(f"Applied {n} pending add/reduce transactions.")
 
-        while True:
-            try:
-                now_cst = datetime.now(CST)
-                today_str = now_cst.strftime("%Y-%m-%d")
-
-                # Get collection interval from settings (single-user mode: user_id IS NULL)
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT value FROM settings
-                    WHERE key = 'INTRADAY_COLLECT_INTERVAL' AND user_id IS NULL
-                """)
-                row = cursor.fetchone()
-                interval_minutes = int(row["value"]) if row and row["value"] else 5
-
-                # 24/7 Monitoring
-                check_subscriptions()
-
-                # Intraday data collection (trading hours only)
-                collect_intraday_snapshots()
-
-                # 待确认加仓/减仓：用当日已公布净值更新持仓
-                n = process_pending_transactions()
-                if n:
-                    logger.info(f"Applied {n} pending add/reduce transactions.")
-
-                # Daily cleanup (once per day at 00:00)
-                if last_cleanup_date != today_str and now_cst.hour == 0:
-                    cleanup_old_intraday_data()
-                    last_cleanup_date = today_str
-
-                # NAV update (once per hour between 16:00-24:00)
-                if 16 <= now_cst.hour <= 23 and last_nav_update_hour != now_cst.hour:
-                    update_holdings_nav()
-                    last_nav_update_hour = now_cst.hour
-
-                # Session cleanup (once per hour to prevent memory leak)
-                if last_session_cleanup_hour != now_cst.hour:
-                    from ..auth import cleanup_expired_sessions
-                    cleaned = cleanup_expired_sessions()
-                    if cleaned > 0:
-                        logger.info(f"Cleaned up {cleaned} expired sessions")
-                    last_session_cleanup_hour = now_cst.hour
 
-            except Exception as e:
-                logger.error(f"Scheduler loop error: {e}")
+def cleanup_sessions():
+    # Session cleanup (once per hour to prevent memory leak)
+    from ..auth import cleanup_expired_sessions
+    cleaned = cleanup_expired_sessions()
+    if cleaned > 0:
+        logger.info(f"Cleaned up {cleaned} expired sessions")
+
 
-            # Sleep for configured interval (default 5 minutes)
-            time.sleep(interval_minutes * 60)
-    
-    t = threading.Thread(target=_run, daemon=True)
-    t.start()
+def sync_holdings():
+    # 季报持仓：只有新报告期应披露时才拉取
+    result = refresh_due_holdings(get_tracked_fund_codes())
+    if result["checked"]:
+        logger.info(
+            f"Holdings sync: checked {result['checked']}, updated {result['updated']}, failed {result['failed']}"
+        )
+
+
+def update_indicators():
+    # 夜间批量重算技术指标（净值更新之后）
+    started = time.monotonic()
+    written = refresh_indicators(get_tracked_fund_codes())
+    pruned = prune_indicators(Config.INDICATORS_RETENTION_DAYS)
+    logger.info(f"Indicators refreshed for {written} funds in {time.monotonic() - started:.2f}s (pruned {pruned})")
+
+
+def ensure_fund_list():
+    # Initial fund list update
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT count(*) as cnt FROM funds")
+    count = cursor.fetchone()["cnt"]
+
+    if count == 0:
+        logger.info("DB is empty. Performing initial fetch.")
+        fetch_and_update_funds()
+
+
+_scheduler = None
+
+
+def start_scheduler():
+    """
+    Start background jobs. Each job has its own trigger and runs on a shared
+    worker pool, so a slow job no longer delays the others.
+    """
+    global _scheduler
+    if _scheduler is not None:
+        return _scheduler
+
+    from .jobs import JobScheduler, IntervalTrigger, CronTrigger
+
+    scheduler = JobScheduler(max_workers=Config.SCHEDULER_WORKERS)
+    scheduler.add_job("fund_list", ensure_fund_list, IntervalTrigger(Config.FUND_LIST_UPDATE_INTERVAL), run_at_start=True)
+    # 24/7 Monitoring
+    scheduler.add_job("subscriptions", check_subscriptions, IntervalTrigger(_get_collect_interval_seconds, align=True), run_at_start=True)
+    # Intraday data collection (trading hours only), aligned to wall-clock interval boundaries
+    scheduler.add_job("intraday_snapshots", collect_intraday_snapshots, IntervalTrigger(_get_collect_interval_seconds, align=True))
+    scheduler.add_job("pending_transactions", apply_pending_transactions, IntervalTrigger(_get_collect_interval_seconds, align=True), run_at_start=True)
+    # Daily cleanup at 00:00
+    scheduler.add_job("intraday_cleanup", cleanup_old_intraday_data, CronTrigger(hour=0, minute=0))
+    scheduler.add_job("pingzhong_cache_cleanup", cleanup_pingzhong_cache, CronTrigger(hour=0, minute=30))
+    # NAV update once per hour between 16:00-24:00
+    scheduler.add_job("holdings_nav", update_holdings_nav, CronTrigger(hour=range(16, 24), minute=0))
+    # Quarterly holdings, checked twice a day (no-op unless a report period is due)
+    scheduler.add_job("fund_holdings", sync_holdings, CronTrigger(hour=(8, 20), minute=30), run_at_start=True)
+    # Technical indicators after the evening NAV updates
+    scheduler.add_job("fund_indicators", update_indicators, CronTrigger(hour=23, minute=30))
+    scheduler.add_job("session_cleanup", cleanup_sessions, CronTrigger(minute=0), run_at_start=True)
+    scheduler.add_job("db_pool_reap", reap_db_connections, IntervalTrigger(60))
+    scheduler.start()
+
+    _scheduler = scheduler
+    return scheduler
+
+
+def stop_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.shutdown()
+        _scheduler = None
+
+
+def get_scheduler_stats():
+    return _scheduler.stats() if _scheduler is not None else {}
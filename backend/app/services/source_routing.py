@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+估值数据源按基金路由（fund_source_capability 表）。
+
+货币基金、许多 QDII 和新发基金在 fundgz / Sina 上没有估值，但每次轮询仍要
+对两个源各发一次请求（5 秒超时 + 重试）才走到历史兜底。这里按 (基金, 数据源)
+记录观测到的"有估值 / 无估值"次数：
+
+- 证据按 SOURCE_ROUTING_HALF_LIFE_HOURS 半衰期指数衰减，且总量不超过
+  SOURCE_ROUTING_MAX_EVIDENCE（新观测始终有足够权重）
+- 覆盖概率 (成功 + 1) / (总数 + 2) 低于 SOURCE_ROUTING_SKIP_BELOW 时跳过该数据源
+- 被跳过的组合每 SOURCE_ROUTING_PROBE_INTERVAL 秒探测一次，探测命中即清空失败证据
+- 请求失败（网络错误、整批失败）不是基金级信息，不计入
+
+状态常驻内存，按需从数据库加载；有失败观测、探测恢复或距上次落盘超过
+SOURCE_ROUTING_FLUSH_INTERVAL 时写回数据库，健康基金的轮询不会每次都写库。
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+from ..config import Config
+from ..db import get_db_connection, select_in_chunks
+
+logger = logging.getLogger(__name__)
+
+EASTMONEY = "eastmoney"
+SINA = "sina"
+
+
+class _Capability:
+    __slots__ = ("successes", "failures", "updated_at", "checked_at", "flushed_at")
+
+    def __init__(self, successes=0.0, failures=0.0, updated_at=0.0, checked_at=0.0, flushed_at=0.0):
+        self.successes = successes
+        self.failures = failures
+        self.updated_at = updated_at
+        self.checked_at = checked_at
+        self.flushed_at = flushed_at
+
+    def decay(self, now: float) -> None:
+        if self.updated_at and now > self.updated_at:
+            factor = 0.5 ** ((now - self.updated_at) / (Config.SOURCE_ROUTING_HALF_LIFE_HOURS * 3600))
+            self.successes *= factor
+            self.failures *= factor
+        self.updated_at = now
+
+    def coverage(self) -> float:
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def skipped(self) -> bool:
+        return self.coverage() < Config.SOURCE_ROUTING_SKIP_BELOW
+
+
+_lock = threading.Lock()
+_states: Dict[tuple, _Capability] = {}
+_loaded: set = set()
+_stats = {"skipped": 0, "probes": 0}
+
+
+def _ts(value) -> float:
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts).isoformat(timespec="seconds")
+
+
+def _ensure_loaded(source: str, codes: List[str]) -> None:
+    with _lock:
+        missing = [c for c in codes if (c, source) not in _loaded]
+    if not missing:
+        return
+
+    rows = {}
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    for row in select_in_chunks(cursor, """
+        SELECT code, successes, failures, updated_at, checked_at FROM fund_source_capability
+        WHERE source = ? AND code IN ({placeholders})
+    """, missing, before=[source]):
+        rows[row["code"]] = row
+
+    with _lock:
+        for code in missing:
+            key = (code, source)
+            if key in _loaded:
+                continue
+            row = rows.get(code)
+            if row is not None and key not in _states:
+                updated = _ts(row["updated_at"])
+                _states[key] = _Capability(
+                    float(row["successes"]), float(row["failures"]), updated, _ts(row["checked_at"]), updated
+                )
+            _loaded.add(key)
+
+
+def select_codes(source: str, codes: Iterable[str]) -> List[str]:
+    """
+    Codes worth requesting from `source`: everything except funds it is known
+    not to cover, unless their recovery probe is due.
+    """
+    codes = list(codes)
+    if not codes:
+        return []
+    _ensure_loaded(source, codes)
+
+    now = time.time()
+    selected = []
+    with _lock:
+        for code in codes:
+            state = _states.get((code, source))
+            if state is None:
+                selected.append(code)
+                continue
+            state.decay(now)
+            if not state.skipped():
+                selected.append(code)
+            elif now - state.checked_at >= Config.SOURCE_ROUTING_PROBE_INTERVAL:
+                state.checked_at = now  # 同一时刻只让一个请求去探测
+                _stats["probes"] += 1
+                selected.append(code)
+            else:
+                _stats["skipped"] += 1
+    return selected
+
+
+def record_results(source: str, queried: Iterable[str], hits: Iterable[str], failed: Iterable[str] = ()) -> None:
+    """
+    Record one round of observations for `source`.
+
+    Args:
+        queried: 本轮请求的基金
+        hits: 返回了有效估值的基金
+        failed: 请求本身失败的基金（不计入）
+    """
+    hits, failed = set(hits), set(failed)
+    now = time.time()
+    dirty = []
+    with _lock:
+        for code in queried:
+            if code in failed:
+                continue
+            key = (code, source)
+            state = _states.get(key)
+            if state is None:
+                state = _states[key] = _Capability(updated_at=now)
+            state.decay(now)
+            hit = code in hits
+            recovered = hit and state.skipped()
+            if recovered:
+                logger.info(f"Valuation source {source} recovered for {code}")
+                state.failures = 0.0
+            if hit:
+                state.successes += 1
+            else:
+                state.failures += 1
+            total = state.successes + state.failures
+            if total > Config.SOURCE_ROUTING_MAX_EVIDENCE:
+                scale = Config.SOURCE_ROUTING_MAX_EVIDENCE / total
+                state.successes *= scale
+                state.failures *= scale
+            state.checked_at = now
+            if not hit or recovered or now - state.flushed_at >= Config.SOURCE_ROUTING_FLUSH_INTERVAL:
+                state.flushed_at = now
+                dirty.append((code, source, state.successes, state.failures, _iso(now), _iso(now)))
+
+    if not dirty:
+        return
+    try:
+        conn = get_db_connection()
+        conn.cursor().executemany("""
+            INSERT INTO fund_source_capability (code, source, successes, failures, updated_at, checked_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(code, source) DO UPDATE SET
+                successes = excluded.successes,
+                failures = excluded.failures,
+                updated_at = excluded.updated_at,
+                checked_at = excluded.checked_at
+        """, dirty)
+        conn.commit()
+    except Exception as e:
+        logger.warning(f"Failed to persist source capability: {e}")
+
+
+def get_routing_stats() -> Dict[str, Any]:
+    with _lock:
+        now = time.time()
+        uncovered = {}
+        for (code, source), state in _states.items():
+            state.decay(now)
+            if state.skipped():
+                uncovered[source] = uncovered.get(source, 0) + 1
+        return {**_stats, "tracked": len(_states), "uncovered": uncovered}
@@ -23,6 +23,14 @@ def next_trading_day(d: date) -> date:
     return n
 
 
+def previous_trading_day(d: date) -> date:
+    """上一交易日"""
+    p = d - timedelta(days=1)
+    while not is_trading_day(p):
+        p -= timedelta(days=1)
+    return p
+
+
 def get_confirm_date(trade_ts: Optional[datetime] = None) -> date:
     """
     根据交易时间计算确认净值日期。
@@ -45,3 +53,43 @@ def get_confirm_date(trade_ts: Optional[datetime] = None) -> date:
 
 def confirm_date_to_str(d: date) -> str:
     return d.strftime("%Y-%m-%d")
+
+
+# 交易时段（上午 09:30-11:30，下午 13:00-15:00）
+TRADING_SESSIONS = (((9, 30), (11, 30)), ((13, 0), (15, 0)))
+
+
+def is_trading_time(ts: Optional[datetime] = None) -> bool:
+    """是否处于交易时段内（交易日 + 盘中）"""
+    if ts is None:
+        ts = datetime.now()
+    if not is_trading_day(ts.date()):
+        return False
+    hm = (ts.hour, ts.minute)
+    return any(start <= hm < end for start, end in TRADING_SESSIONS)
+
+
+def latest_session_date(ts: Optional[datetime] = None) -> date:
+    """最近一个已开盘的交易日（实时行情的涨跌幅对应的交易日）"""
+    if ts is None:
+        ts = datetime.now()
+    d = ts.date()
+    if is_trading_day(d) and (ts.hour, ts.minute) >= TRADING_SESSIONS[0][0]:
+        return d
+    return previous_trading_day(d)
+
+
+def seconds_until_next_session(ts: Optional[datetime] = None) -> float:
+    """距离下一个交易时段开盘的秒数（盘中返回 0）"""
+    if ts is None:
+        ts = datetime.now()
+    if is_trading_time(ts):
+        return 0.0
+    d = ts.date()
+    while True:
+        if is_trading_day(d):
+            for (h, m), _ in TRADING_SESSIONS:
+                start = datetime(d.year, d.month, d.day, h, m)
+                if start > ts:
+                    return (start - ts).total_seconds()
+        d = next_trading_day(d)
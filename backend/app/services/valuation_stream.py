@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+实时估值推送（SSE fan-out）。
+
+所有连接共享一个上游轮询协程：每个 tick 只对当前被订阅的去重基金集合
+拉取一次估值（走共享估值缓存 + 批量数据源），然后把发生变化的基金
+推送给订阅了它们的客户端。N 个打开的看板的上游成本为 O(不同基金数)，
+而不是 O(客户端数 × 基金数)。
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from ..config import Config
+from .fund_async import get_combined_valuations_async
+
+logger = logging.getLogger(__name__)
+
+# 用于判断估值是否变化的字段
+_DELTA_FIELDS = ("nav", "estimate", "estRate", "time", "navDate")
+
+
+class Subscription:
+    def __init__(self, codes: List[str]):
+        self.codes = set(codes)
+        # 只保留最新一次待发送的变化：消费慢的客户端收到合并后的 delta，而不是积压
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.event = asyncio.Event()
+
+    def push(self, delta: Dict[str, Dict[str, Any]]) -> None:
+        self.pending.update(delta)
+        self.event.set()
+
+    async def next_delta(self, timeout: float) -> Dict[str, Dict[str, Any]]:
+        """Wait for the next delta; returns {} on timeout (caller sends a keep-alive)."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self.event.clear()
+        delta, self.pending = self.pending, {}
+        return delta
+
+
+class ValuationHub:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._subs: Set[Subscription] = set()
+        self._refcount: Dict[str, int] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.ticks = 0
+        self.upstream_codes = 0
+
+    def subscribe(self, codes: List[str]) -> Subscription:
+        sub = Subscription(codes)
+        self._subs.add(sub)
+        new_codes = False
+        for code in sub.codes:
+            self._refcount[code] = self._refcount.get(code, 0) + 1
+            new_codes = new_codes or code not in self._last
+        # 已有数据的基金立即推送快照，新基金等下一次（立即触发的）tick
+        snapshot = {c: self._last[c] for c in sub.codes if c in self._last}
+        if snapshot:
+            sub.push(snapshot)
+        self._ensure_running()
+        if new_codes:
+            self._wakeup.set()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        if sub not in self._subs:
+            return
+        self._subs.discard(sub)
+        for code in sub.codes:
+            count = self._refcount.get(code, 0) - 1
+            if count <= 0:
+                self._refcount.pop(code, None)
+                self._last.pop(code, None)
+            else:
+                self._refcount[code] = count
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._subs:
+            try:
+                await self._tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Valuation stream tick failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _tick(self) -> None:
+        codes = list(self._refcount)
+        if not codes:
+            return
+        valuations = await get_combined_valuations_async(codes)
+        self.ticks += 1
+        self.upstream_codes += len(codes)
+
+        changed = {}
+        for code, data in valuations.items():
+            if code not in self._refcount:
+                continue
+            previous = self._last.get(code)
+            if previous is None or any(previous.get(f) != data.get(f) for f in _DELTA_FIELDS):
+                self._last[code] = data
+                changed[code] = data
+        if not changed:
+            return
+
+        for sub in list(self._subs):
+            delta = {c: changed[c] for c in sub.codes if c in changed}
+            if delta:
+                sub.push(delta)
+
+    async def close(self) -> None:
+        self._subs.clear()
+        self._refcount.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subs),
+            "codes": len(self._refcount),
+            "ticks": self.ticks,
+            "upstream_codes": self.upstream_codes,
+        }
+
+
+hub = ValuationHub(interval=Config.VALUATION_STREAM_INTERVAL)
@@ -1,12 +1,29 @@
 """
 工具函数
 """
+import inspect
 from typing import Optional
 from fastapi import HTTPException, status
-from .db import get_db_connection
+from fastapi.routing import APIRoute
+from .db import get_db_connection, releasing_db_connection
 from .auth import User
 
 
+class PooledConnectionRoute(APIRoute):
+    """
+    APIRoute that returns the DB connection to the pool once a sync endpoint finishes.
+
+    Sync endpoints run on FastAPI's threadpool, whose worker threads live for the whole
+    process; without a release every worker would keep a pooled connection leased.
+    (Sync dependencies run as separate threadpool calls, see auth.require_auth.)
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = releasing_db_connection(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
 def verify_account_ownership(account_id: int, user: User) -> None:
     """
     验证账户所有权
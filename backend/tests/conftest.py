@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Fresh SQLite database per test (pooled connections are closed afterwards)."""
+    from app.db import _pool, get_db_connection, init_db, release_db_connection
+
+    monkeypatch.setattr(Config, "DB_TYPE", "sqlite")
+    monkeypatch.setattr(Config, "DB_PATH", str(tmp_path / "fund.db"))
+    init_db()
+    yield get_db_connection()
+    release_db_connection()
+    _pool.close_all()
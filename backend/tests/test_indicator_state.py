@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+增量技术指标（apply_nav）与批量公式（compute_indicators）的一致性：
+逐日追加净值，每一步都与最近 250 个净值的全量计算对比。
+"""
+import numpy as np
+import pandas as pd
+
+from app.services.indicators import (
+    apply_nav, compute_indicators, indicators_from_state, load_nav_matrix, _load_state,
+)
+
+TOLERANCE = 1e-9
+
+
+def test_apply_nav_matches_batch_formula(db):
+    rng = np.random.default_rng(7)
+    days = 300
+    dates = [d.strftime("%Y-%m-%d") for d in pd.bdate_range(end="2026-01-01", periods=days)]
+
+    checked = 0
+    for k in range(3):
+        code = f"{k:06d}"
+        navs = np.cumprod(1 + rng.normal(0.0003, 0.012, days))
+        for date, nav in zip(dates, navs):
+            db.execute("INSERT INTO fund_history (code, date, nav) VALUES (?, ?, ?)", (code, date, float(nav)))
+            db.commit()
+            apply_nav(code, date, float(nav))
+
+            _, matrix, _, _ = load_nav_matrix([code])
+            expected = compute_indicators(matrix)
+            if not expected["valid"][0]:
+                continue
+            want = (expected["sharpe"][0], expected["volatility"][0],
+                    expected["max_drawdown"][0], expected["annual_return"][0])
+            got = indicators_from_state(_load_state(code))
+            assert got is not None, f"{code} {date}: no incremental state"
+            np.testing.assert_allclose(got, want, rtol=0, atol=TOLERANCE, err_msg=f"{code} {date}")
+            checked += 1
+
+    assert checked > 0
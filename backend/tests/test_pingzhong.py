@@ -0,0 +1,55 @@
+"""
+PingZhongData 解析：用 benchmarks/fixtures/pingzhong 下的格式样本校验 parse_pingzhong。
+"""
+import glob
+import json
+import os
+
+import pytest
+
+from app.services.pingzhong import parse_pingzhong
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "benchmarks", "fixtures", "pingzhong")
+
+
+def _load(code: str) -> bytes:
+    with open(os.path.join(FIXTURE_DIR, f"{code}.js"), "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.js"))))
+def test_fixture_identity(path):
+    code = os.path.basename(path).split(".")[0]
+    with open(path, "rb") as f:
+        data = parse_pingzhong(f.read(), code)
+    assert data["code"] == code
+    assert data["name"]
+
+
+def test_value_containing_assignment_text_uses_raw_decode(monkeypatch):
+    # 900001 的一条 unitMoney 文本里含 "var splitRatio = ..."，按赋值切出的边界会截断
+    # Data_netWorthTrend，必须走 raw_decode 回退才能解出完整数组
+    calls = []
+    raw_decode = json.JSONDecoder.raw_decode
+
+    def _counting(self, s, idx=0):
+        calls.append(s[:40])
+        return raw_decode(self, s, idx)
+
+    monkeypatch.setattr(json.JSONDecoder, "raw_decode", _counting)
+    data = parse_pingzhong(_load("900001"), "900001")
+
+    assert calls, "raw_decode fallback was not exercised"
+    assert [p["date"] for p in data["history"]] == [
+        "2025-12-31", "2026-01-05", "2026-01-06", "2026-01-07", "2026-01-08", "2026-01-09",
+    ]
+    assert data["history"][-1]["nav"] == 1.0287
+    assert data["manager"] == "孙七"
+    assert data["performance"]["择时能力"] == 68.0
+    assert data["syl_1y"] == "-0.21"
+
+
+def test_fund_without_history():
+    # 货币基金没有 Data_netWorthTrend，新发基金的净值走势为空数组
+    assert "history" not in parse_pingzhong(_load("000198"), "000198")
+    assert "history" not in parse_pingzhong(_load("023456"), "023456")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PingZhongData 解析性能基准
+
+对比旧实现（8 次正则扫描 + json + 逐点 time.localtime）与新实现
+（services/pingzhong.py：单次扫描 + orjson + 向量化日期）的耗时，并校验两者
+结果一致（不一致时以非零状态码退出）。
+
+样本：
+- benchmarks/fixtures/pingzhong/*.js：随仓库提交的小样本，按线上文件格式
+  手工整理（不是原样抓取的响应）：变量间的注释、`=[...] ;` 写法、没有
+  Data_netWorthTrend 的货币基金、净值走势为空的新发基金，以及字符串值里含
+  "var x =" 字样、需走 raw_decode 回退的 900001；用于格式一致性校验
+  （backend/tests/test_pingzhong.py 也用这些样本）
+- benchmarks/payloads/*.js：本地抓取的完整响应（不入库），用于测真实体量：
+    python benchmarks/bench_pingzhong_parse.py --capture 000001 110022 161725
+- 合成的 --points 点样本（线上格式、完整体量），没有抓取样本时也能测速
+
+用法:
+    python benchmarks/bench_pingzhong_parse.py [payload.js ...] [--repeat 20]
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+os.environ["TZ"] = "Asia/Shanghai"  # 旧实现用 time.localtime，按服务器所在时区换算
+if hasattr(time, "tzset"):
+    time.tzset()
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import numpy as np
+
+from app.services.pingzhong import parse_pingzhong
+
+# 货币基金 / 新发基金样本每次解析都会记"Data_netWorthTrend not found"，计时时不输出
+logging.getLogger("app.services.pingzhong").setLevel(logging.ERROR)
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads")
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pingzhong")
+URL = "http://fund.eastmoney.com/pingzhongdata/{code}.js"
+
+
+def legacy_parse(text: str, code: str) -> dict:
+    """基线实现（与重构前 fund._parse_pingzhong 相同，去掉日志）"""
+    data = {}
+    name_match = re.search(r'fS_name\s*=\s*"(.*?)";', text)
+    if name_match: data["name"] = name_match.group(1)
+    code_match = re.search(r'fS_code\s*=\s*"(.*?)";', text)
+    if code_match: data["code"] = code_match.group(1)
+    manager_match = re.search(r'Data_currentFundManager\s*=\s*(\[.+?\])\s*;\s*/\*', text)
+    if manager_match:
+        try:
+            managers = json.loads(manager_match.group(1))
+            if managers:
+                data["manager"] = ", ".join([m["name"] for m in managers])
+        except:
+            pass
+    for key in ["syl_1n", "syl_6y", "syl_3y", "syl_1y"]:
+        m = re.search(rf'{key}\s*=\s*"(.*?)";', text)
+        if m: data[key] = m.group(1)
+    perf_match = re.search(r'Data_performanceEvaluation\s*=\s*(\{.+?\})\s*;\s*/\*', text)
+    if perf_match:
+        try:
+            perf = json.loads(perf_match.group(1))
+            if perf and "data" in perf and "categories" in perf:
+                data["performance"] = dict(zip(perf["categories"], perf["data"]))
+        except:
+            pass
+    history_match = re.search(r'Data_netWorthTrend\s*=\s*(\[.+?\])\s*;', text, re.DOTALL)
+    if history_match:
+        try:
+            raw_hist = json.loads(history_match.group(1))
+            if raw_hist:
+                data["history"] = [
+                    {"date": time.strftime('%Y-%m-%d', time.localtime(item['x']/1000)), "nav": float(item['y'])}
+                    for item in raw_hist
+                    if 'x' in item and 'y' in item
+                ]
+        except Exception:
+            pass
+    return data
+
+
+def make_payload(points: int) -> bytes:
+    """按真实 pingzhongdata 格式合成样本（变量顺序、注释、数据量级与线上一致）"""
+    rng = np.random.default_rng(42)
+    start_ms = 1104508800000  # 2005-01-01 00:00 +08:00
+    days = np.sort(rng.choice(np.arange(points * 1.5, dtype=np.int64), points, replace=False))
+    xs = start_ms + days * 86400000
+    navs = np.round(np.cumprod(1 + rng.normal(0.0003, 0.012, points)), 4)
+    trend = [{"x": int(x), "y": float(y), "equityReturn": round(float(r), 2), "unitMoney": ""}
+             for x, y, r in zip(xs, navs, rng.normal(0, 1.2, points))]
+    ac_trend = [[int(x), float(y)] for x, y in zip(xs, navs * 1.8)]
+    managers = [{"id": "30189741", "pic": "https://pdf.dfcfw.com/pdf/H8_PNG30189741_1.png",
+                 "name": "张三", "star": 4, "workTime": "9年又180天", "fundSize": "120.50亿(6只基金)",
+                 "power": {"avr": "61.37", "categories": ["经验值", "收益率", "抗风险", "稳定性", "择时能力"],
+                           "dsc": ["反映基金经理从业年限和管理基金的经验"] * 5, "data": [92.1, 45.6, 66.0, 20.3, 70.0],
+                           "jzrq": "2026-01-09"},
+                 "profit": {"categories": ["任期收益", "同类平均", "沪深300"],
+                            "series": [{"data": [{"name": None, "color": "#7cb5ec", "y": 120.33}]}], "jzrq": "2026-01-09"}}]
+    perf = {"avr": "72.25", "categories": ["选证能力", "收益率", "抗风险", "稳定性", "择时能力"],
+            "dsc": ["反映基金挑选证券而实现风险调整后获得超额收益的能力"] * 5, "data": [80.0, 70.0, 60.0, 50.0, 40.0]}
+    dumps = lambda v: json.dumps(v, ensure_ascii=False, separators=(",", ":"))
+    parts = [
+        '/*基金或股票信息*/var ishb=false;/*基金或股票信息*/var fS_name = "华夏成长混合";var fS_code = "000001";',
+        '/*原费率*/var fund_sourceRate="1.50";/*现费率*/var fund_Rate="0.15";/*最小申购金额*/var fund_minsg="10";',
+        '/*基金持仓股票代码*/var stockCodes=["6000001","3000591","0020271"];',
+        '/*收益率*//*近一年收益率*/var syl_1n="12.34";/*近6月收益率*/var syl_6y="5.6";',
+        '/*近三月收益率*/var syl_3y="-1.2";/*近一月收益率*/var syl_1y="0.8";',
+        f'/*单位净值走势 equityReturn-净值回报 unitMoney-每份派送金*/var Data_netWorthTrend = {dumps(trend)};',
+        f'/*累计净值走势*/var Data_ACWorthTrend = {dumps(ac_trend)};',
+        f'/*现任基金经理*/var Data_currentFundManager ={dumps(managers)} ;',
+        f'/*业绩评价 ['
+        '选股能力, 收益率, 抗风险, 稳定性,择时能力]*/var Data_performanceEvaluation = ' + dumps(perf) + ';',
+        '/*申购赎回*/var Data_buySedemption = {"series":[],"categories":[]};',
+    ]
+    return "".join(parts).encode("utf-8")
+
+
+def capture(codes, directory):
+    import requests
+
+    os.makedirs(directory, exist_ok=True)
+    for code in codes:
+        response = requests.get(URL.format(code=code), timeout=10, headers={"User-Agent": "Mozilla/5.0"})
+        response.raise_for_status()
+        path = os.path.join(directory, f"{code}.js")
+        with open(path, "wb") as f:
+            f.write(response.content)
+        print(f"  saved {path} ({len(response.content) / 1024:.0f} KB, ETag {response.headers.get('ETag')})")
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("payloads", nargs="*", help="captured pingzhongdata .js files")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--points", type=int, default=5000, help="synthetic sample size")
+    parser.add_argument("--capture", nargs="+", metavar="CODE", help="download real payloads and exit")
+    args = parser.parse_args()
+
+    if args.capture:
+        capture(args.capture, PAYLOAD_DIR)
+        return
+
+    files = args.payloads or (
+        sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.js"))) + sorted(glob.glob(os.path.join(PAYLOAD_DIR, "*.js")))
+    )
+    samples = []
+    for path in files:
+        with open(path, "rb") as f:
+            samples.append((os.path.basename(path), f.read()))
+    if not args.payloads:
+        samples.append((f"synthetic-{args.points}", make_payload(args.points)))
+
+    print(f"PingZhongData parse, best of {args.repeat}")
+    total_before = total_after = 0.0
+    mismatches = 0
+    for name, raw in samples:
+        code = name.split(".")[0]
+        text = raw.decode("utf-8")
+        legacy, current = legacy_parse(text, code), parse_pingzhong(raw, code)
+        status = "ok" if legacy == current else "MISMATCH"
+        mismatches += legacy != current
+        before = best_of(lambda: legacy_parse(raw.decode("utf-8"), code), args.repeat)
+        after = best_of(lambda: parse_pingzhong(raw, code), args.repeat)
+        total_before += before
+        total_after += after
+        print(f"  {name:<22} {len(raw) / 1024:6.0f} KB  {len(current.get('history', [])):5d} pts  "
+              f"legacy {before * 1000:7.2f} ms  new {after * 1000:6.2f} ms  {before / after:5.1f}x  {status}")
+    print(f"  total speedup {total_before / total_after:.1f}x")
+    if mismatches:
+        print(f"FAILED: {mismatches} payload(s) parsed differently")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
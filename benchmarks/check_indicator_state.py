@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量技术指标一致性检查 + 性能对比
+
+在临时数据库里为若干合成基金逐日追加净值，每次追加后用 apply_nav 增量更新
+指标状态，并与批量公式（compute_indicators 对最近 250 个净值全量计算）对比，
+任何一项偏差超过容差（或没有可比对的点）即以非零状态码退出。同时统计增量更新与全量重算的耗时。
+
+用法:
+    python benchmarks/check_indicator_state.py [--funds 20] [--days 400] [--tol 1e-9]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import numpy as np
+import pandas as pd
+
+from app.config import Config
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--funds", type=int, default=20)
+    parser.add_argument("--days", type=int, default=400)
+    parser.add_argument("--tol", type=float, default=1e-9)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    Config.DB_PATH = os.path.join(tmp, "check.db")
+
+    from app.db import init_db, get_db_connection
+    from app.services.indicators import (
+        apply_nav, compute_indicators, indicators_from_state, load_nav_matrix, _load_state,
+    )
+
+    init_db()
+    conn = get_db_connection()
+    rng = np.random.default_rng(7)
+    dates = [d.strftime("%Y-%m-%d") for d in pd.bdate_range(end="2026-01-01", periods=args.days)]
+
+    inc_time = full_time = 0.0
+    checked = worst = 0.0
+    failures = 0
+    for k in range(args.funds):
+        code = f"{k:06d}"
+        navs = np.cumprod(1 + rng.normal(0.0003, 0.012, args.days))
+        for date, nav in zip(dates, navs):
+            conn.execute("INSERT INTO fund_history (code, date, nav) VALUES (?, ?, ?)", (code, date, float(nav)))
+            conn.commit()
+
+            started = time.perf_counter()
+            apply_nav(code, date, float(nav))
+            inc_time += time.perf_counter() - started
+
+            started = time.perf_counter()
+            _, matrix, _, _ = load_nav_matrix([code])
+            expected = compute_indicators(matrix)
+            full_time += time.perf_counter() - started
+
+            got = indicators_from_state(_load_state(code))
+            if not expected["valid"][0]:
+                continue
+            want = (expected["sharpe"][0], expected["volatility"][0],
+                    expected["max_drawdown"][0], expected["annual_return"][0])
+            diff = max(abs(a - b) for a, b in zip(got, want))
+            worst = max(worst, diff)
+            checked += 1
+            if diff > args.tol:
+                failures += 1
+                if failures <= 5:
+                    print(f"MISMATCH {code} {date}: incremental={got} batch={want}")
+
+    steps = args.funds * args.days
+    print(f"checked {int(checked)} points, max abs diff {worst:.3e}, failures {failures}")
+    print(f"incremental apply_nav: {inc_time / steps * 1000:.3f} ms/update")
+    print(f"full recompute:        {full_time / steps * 1000:.3f} ms/update")
+    if failures or not checked:
+        # CI 中的一致性测试见 backend/tests/test_indicator_state.py，本脚本用于更大样本和计时
+        print("FAILED" if failures else "FAILED: no points checked")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+/*2026-01-09 15:30:02*/var ishb=false;/*基金或股票信息*/var fS_name = "华夏成长混合";var fS_code = "000001";/*原费率*/var fund_sourceRate="1.50";/*现费率*/var fund_Rate="0.15";/*最小申购金额*/var fund_minsg="10";/*基金持仓股票代码*/var stockCodes=["6005191","3007501","0008581"];/*基金持仓债券代码*/var zqCodes = "";/*基金持仓股票代码(新市场号)*/var stockCodesNew =["1.600519","0.300750","0.000858"];/*基金持仓债券代码（新市场号）*/var zqCodesNew = "";/*收益率*//*近一年收益率*/var syl_1n="15.27";/*近6月收益率*/var syl_6y="8.91";/*近三月收益率*/var syl_3y="-2.35";/*近一月收益率*/var syl_1y="1.04";/*股票仓位测算图*/var Data_fundSharesPositions = [[1766505600000,88.5],[1766592000000,87.2],[1766678400000,90.0],[1766937600000,89.1],[1767024000000,88.0]];/*单位净值走势 equityReturn-净值回报 unitMoney-每份派送金*/var Data_netWorthTrend = [{"x":1759852800000,"y":1.2005,"equityReturn":0.22,"unitMoney":""},{"x":1759939200000,"y":1.2049,"equityReturn":-0.51,"unitMoney":""},{"x":1760025600000,"y":1.2018,"equityReturn":0.14,"unitMoney":""},{"x":1760284800000,"y":1.1905,"equityReturn":-1.31,"unitMoney":""},{"x":1760371200000,"y":1.185,"equityReturn":-0.64,"unitMoney":""},{"x":1760457600000,"y":1.1725,"equityReturn":-0.22,"unitMoney":""},{"x":1760544000000,"y":1.1738,"equityReturn":0.99,"unitMoney":""},{"x":1760630400000,"y":1.1916,"equityReturn":1.26,"unitMoney":""},{"x":1760889600000,"y":1.1856,"equityReturn":-1.46,"unitMoney":""},{"x":1760976000000,"y":1.178,"equityReturn":-0.87,"unitMoney":""},{"x":1761062400000,"y":1.1848,"equityReturn":0.71,"unitMoney":""},{"x":1761148800000,"y":1.1899,"equityReturn":-2.19,"unitMoney":""},{"x":1761235200000,"y":1.1918,"equityReturn":-0.51,"unitMoney":""},{"x":1761494400000,"y":1.1801,"equityReturn":-0.11,"unitMoney":""},{"x":1761580800000,"y":1.1801,"equityReturn":1.38,"unitMoney":""},{"x":1761667200000,"y":1.1896,"equityReturn":0.76,"unitMoney":""},{"x":1761753600000,"y":1.1725,"equityReturn":-0.36,"unitMoney":""},{"x":1761840000000,"y":1.1671,"equityReturn":-0.41,"unitMoney":""},{"x":1762099200000,"y":1.1432,"equityReturn":-0.28,"unitMoney":""},{"x":1762185600000,"y":1.1274,"equityReturn":1.68,"unitMoney":""},{"x":1762272000000,"y":1.105,"equityReturn":-0.47,"unitMoney":""},{"x":1762358400000,"y":1.1026,"equityReturn":-0.33,"unitMoney":""},{"x":1762444800000,"y":1.0877,"equityReturn":0.39,"unitMoney":""},{"x":1762704000000,"y":1.0913,"equityReturn":-0.13,"unitMoney":""},{"x":1762790400000,"y":1.0937,"equityReturn":-0.22,"unitMoney":""},{"x":1762876800000,"y":1.0918,"equityReturn":-1.23,"unitMoney":""},{"x":1762963200000,"y":1.0621,"equityReturn":-0.01,"unitMoney":""},{"x":1763049600000,"y":1.0562,"equityReturn":-0.49,"unitMoney":""},{"x":1763308800000,"y":1.056,"equityReturn":1.28,"unitMoney":""},{"x":1763395200000,"y":1.0578,"equityReturn":0.72,"unitMoney":""},{"x":1763481600000,"y":1.0404,"equityReturn":-0.03,"unitMoney":"分红：每份派现金0.0150元"},{"x":1763568000000,"y":1.0354,"equityReturn":0.74,"unitMoney":""},{"x":1763654400000,"y":1.0246,"equityReturn":-0.37,"unitMoney":""},{"x":1763913600000,"y":1.0159,"equityReturn":1.16,"unitMoney":""},{"x":1764000000000,"y":1.0282,"equityReturn":-0.01,"unitMoney":""},{"x":1764086400000,"y":1.0195,"equityReturn":0.64,"unitMoney":""},{"x":1764172800000,"y":1.0195,"equityReturn":-1.42,"unitMoney":""},{"x":1764259200000,"y":1.0298,"equityReturn":0.38,"unitMoney":""},{"x":1764518400000,"y":1.0236,"equityReturn":-1.86,"unitMoney":""},{"x":1764604800000,"y":1.0228,"equityReturn":-2.24,"unitMoney":""},{"x":1764691200000,"y":1.0244,"equityReturn":-0.33,"unitMoney":""},{"x":1764777600000,"y":1.0256,"equityReturn":-0.99,"unitMoney":""},{"x":1764864000000,"y":1.0121,"equityReturn":0.18,"unitMoney":""},{"x":1765123200000,"y":1.0134,"equityReturn":2.47,"unitMoney":""},{"x":1765209600000,"y":1.029,"equityReturn":-0.91,"unitMoney":""},{"x":1765296000000,"y":1.0119,"equityReturn":-0.69,"unitMoney":""},{"x":1765382400000,"y":1.0218,"equityReturn":0.23,"unitMoney":""},{"x":1765468800000,"y":1.0236,"equityReturn":0.54,"unitMoney":""},{"x":1765728000000,"y":1.0168,"equityReturn":-0.19,"unitMoney":""},{"x":1765814400000,"y":1.0395,"equityReturn":-0.23,"unitMoney":""},{"x":1765900800000,"y":1.0487,"equityReturn":0.77,"unitMoney":""},{"x":1765987200000,"y":1.0353,"equityReturn":0.57,"unitMoney":""},{"x":1766073600000,"y":1.0365,"equityReturn":-1.14,"unitMoney":""},{"x":1766332800000,"y":1.0435,"equityReturn":-0.09,"unitMoney":""},{"x":1766419200000,"y":1.0418,"equityReturn":0.04,"unitMoney":""},{"x":1766505600000,"y":1.05,"equityReturn":-1.16,"unitMoney":""},{"x":1766592000000,"y":1.0497,"equityReturn":0.29,"unitMoney":""},{"x":1766678400000,"y":1.0578,"equityReturn":-0.94,"unitMoney":""},{"x":1766937600000,"y":1.0749,"equityReturn":1.07,"unitMoney":""},{"x":1767024000000,"y":1.0674,"equityReturn":0.21,"unitMoney":""}];/*累计净值走势*/var Data_ACWorthTrend = [[1759852800000,2.521],[1759939200000,2.5303],[1760025600000,2.5238],[1760284800000,2.5],[1760371200000,2.4885],[1760457600000,2.4623],[1760544000000,2.465],[1760630400000,2.5024],[1760889600000,2.4898],[1760976000000,2.4738],[1761062400000,2.4881],[1761148800000,2.4988],[1761235200000,2.5028],[1761494400000,2.4782],[1761580800000,2.4782],[1761667200000,2.4982],[1761753600000,2.4623],[1761840000000,2.4509],[1762099200000,2.4007],[1762185600000,2.3675],[1762272000000,2.3205],[1762358400000,2.3155],[1762444800000,2.2842],[1762704000000,2.2917],[1762790400000,2.2968],[1762876800000,2.2928],[1762963200000,2.2304],[1763049600000,2.218],[1763308800000,2.2176],[1763395200000,2.2214],[1763481600000,2.1848],[1763568000000,2.1743],[1763654400000,2.1517],[1763913600000,2.1334],[1764000000000,2.1592],[1764086400000,2.141],[1764172800000,2.141],[1764259200000,2.1626],[1764518400000,2.1496],[1764604800000,2.1479],[1764691200000,2.1512],[1764777600000,2.1538],[1764864000000,2.1254],[1765123200000,2.1281],[1765209600000,2.1609],[1765296000000,2.125],[1765382400000,2.1458],[1765468800000,2.1496],[1765728000000,2.1353],[1765814400000,2.183],[1765900800000,2.2023],[1765987200000,2.1741],[1766073600000,2.1766],[1766332800000,2.1914],[1766419200000,2.1878],[1766505600000,2.205],[1766592000000,2.2044],[1766678400000,2.2214],[1766937600000,2.2573],[1767024000000,2.2415]];/*规模变动 mom-较上期环比*/var Data_fluctuationScale = {"categories":["2025-06-30","2025-09-30"],"series":[{"y":40.12,"mom":"-3.21%"},{"y":41.55,"mom":"3.56%"}]};/*业绩评价 ['选股能力', '收益率', '抗风险', '稳定性','择时能力']*/var Data_performanceEvaluation = {"avr":"66.50","categories":["选证能力","收益率","抗风险","稳定性","择时能力"],"dsc":["反映基金挑选证券而实现风险调整后获得超额收益的能力","反映基金挑选证券而实现风险调整后获得超额收益的能力","反映基金挑选证券而实现风险调整后获得超额收益的能力","反映基金挑选证券而实现风险调整后获得超额收益的能力","反映基金挑选证券而实现风险调整后获得超额收益的能力"],"data":[70.0,80.0,60.0,50.0,72.5]};/*现任基金经理*/var Data_currentFundManager =[{"id":"30040164","pic":"https://pdf.dfcfw.com/pdf/H8_PNG30040164_1.jpg","name":"王五","star":4,"workTime":"11年又32天","fundSize":"88.21亿(5只基金)","power":{"avr":"58.42","categories":["经验值","收益率","抗风险","稳定性","择时能力"],"dsc":["反映基金经理从业年限和管理基金的经验","反映基金经理从业年限和管理基金的经验","反映基金经理从业年限和管理基金的经验","反映基金经理从业年限和管理基金的经验","反映基金经理从业年限和管理基金的经验"],"data":[90.2,41.3,60.5,35.0,65.1],"jzrq":"2026-01-09"},"profit":{"categories":["任期收益","同类平均","沪深300"],"series":[{"data":[{"name":null,"color":"#7cb5ec","y":85.5},{"name":null,"color":"#414c7b","y":40.2},{"name":null,"color":"#4e7fbb","y":12.7}]}],"jzrq":"2026-01-09"}},{"id":"30189741","pic":"","name":"赵六","star":3,"workTime":"2年又100天","fundSize":"10.00亿(1只基金)","power":{"avr":"暂无数据","categories":[],"dsc":[],"data":[],"jzrq":"2026-01-09"},"profit":{"categories":[],"series":[],"jzrq":"2026-01-09"}}] ;/*申购赎回*/var Data_buySedemption = {"series":[{"name":"期间申购","data":[1.2,0.8]},{"name":"期间赎回","data":[0.9,1.1]}],"categories":["2025-06-30","2025-09-30"]};/*同类型基金涨幅榜（页面底部通栏）*/var swithSameType = [["110011_易方达优质精选混合(QDII)_12.3","000001_华夏成长混合_1.2"]];
@@ -0,0 +1 @@
+/*2026-01-09 15:30:02*/var ishb=false;/*基金或股票信息*/var fS_name = "天弘余额宝货币";var fS_code = "000198";/*原费率*/var fund_sourceRate="1.50";/*现费率*/var fund_Rate="0.15";/*最小申购金额*/var fund_minsg="10";/*基金持仓股票代码*/var stockCodes=["6005191","3007501","0008581"];/*基金持仓债券代码*/var zqCodes = "";/*基金持仓股票代码(新市场号)*/var stockCodesNew =["1.600519","0.300750","0.000858"];/*基金持仓债券代码（新市场号）*/var zqCodesNew = "";/*收益率*//*近一年收益率*/var syl_1n="1.35";/*近6月收益率*/var syl_6y="0.66";/*近三月收益率*/var syl_3y="0.33";/*近一月收益率*/var syl_1y="";/*万份收益*/var Data_millionCopiesIncome = [[1759852800000,0.4257],[1759939200000,0.4586],[1760025600000,0.4026],[1760284800000,0.4452],[1760371200000,0.3453],[1760457600000,0.3397],[1760544000000,0.3726],[1760630400000,0.3359],[1760889600000,0.3692],[1760976000000,0.4896],[1761062400000,0.4147],[1761148800000,0.368],[1761235200000,0.3543],[1761494400000,0.4904],[1761580800000,0.3889],[1761667200000,0.4961],[1761753600000,0.4031],[1761840000000,0.4042],[1762099200000,0.4793],[1762185600000,0.4486],[1762272000000,0.4161],[1762358400000,0.3853],[1762444800000,0.4756],[1762704000000,0.3823],[1762790400000,0.4846],[1762876800000,0.3137],[1762963200000,0.386],[1763049600000,0.4039],[1763308800000,0.4902],[1763395200000,0.3502],[1763481600000,0.4612],[1763568000000,0.4353],[1763654400000,0.4434],[1763913600000,0.4259],[1764000000000,0.4943],[1764086400000,0.3665],[1764172800000,0.3797],[1764259200000,0.3406],[1764518400000,0.3101],[1764604800000,0.3426],[1764691200000,0.4831],[1764777600000,0.468],[1764864000000,0.3225],[1765123200000,0.4208],[1765209600000,0.3958],[1765296000000,0.4189],[1765382400000,0.4319],[1765468800000,0.3613],[1765728000000,0.4923],[1765814400000,0.3932],[1765900800000,0.4256],[1765987200000,0.427],[1766073600000,0.3368],[1766332800000,0.3124],[1766419200000,0.3823],[1766505600000,0.4528],[1766592000000,0.463],[1766678400000,0.446],[1766937600000,0.3226],[1767024000000,0.4827]];/*7日年化收益率*/var Data_sevenDaysYearIncome = [[1759852800000,1.554],[1759939200000,1.674],[1760025600000,1.469],[1760284800000,1.625],[1760371200000,1.26],[1760457600000,1.24],[1760544000000,1.36],[1760630400000,1.226],[1760889600000,1.348],[1760976000000,1.787],[1761062400000,1.514],[1761148800000,1.343],[1761235200000,1.293],[1761494400000,1.79],[1761580800000,1.419],[1761667200000,1.811],[1761753600000,1.471],[1761840000000,1.475],[1762099200000,1.749],[1762185600000,1.637],[1762272000000,1.519],[1762358400000,1.406],[1762444800000,1.736],[1762704000000,1.395],[1762790400000,1.769],[1762876800000,1.145],[1762963200000,1.409],[1763049600000,1.474],[1763308800000,1.789],[1763395200000,1.278],[1763481600000,1.683],[1763568000000,1.589],[1763654400000,1.618],[1763913600000,1.555],[1764000000000,1.804],[1764086400000,1.338],[1764172800000,1.386],[1764259200000,1.243],[1764518400000,1.132],[1764604800000,1.25],[1764691200000,1.763],[1764777600000,1.708],[1764864000000,1.177],[1765123200000,1.536],[1765209600000,1.445],[1765296000000,1.529],[1765382400000,1.576],[1765468800000,1.319],[1765728000000,1.797],[1765814400000,1.435],[1765900800000,1.553],[1765987200000,1.559],[1766073600000,1.229],[1766332800000,1.14],[1766419200000,1.395],[1766505600000,1.653],[1766592000000,1.69],[1766678400000,1.628],[1766937600000,1.177],[1767024000000,1.762]];/*资产配置*/var Data_assetAllocation = {"series":[{"name":"债券","type":null,"data":[12.5],"yAxis":0}],"categories":["2025-09-30"]};/*现任基金经理*/var Data_currentFundManager =[{"id":"30040164","pic":"https://pdf.dfcfw.com/pdf/H8_PNG30040164_1.jpg","name":"王五","star":4,"workTime":"11年又32天","fundSize":"88.21亿(5只基金)","power":{"avr":"58.42","categories":["经验值","收益率","抗风险","稳定性","择时能力"],"dsc":["反映基金经理从业年限和管理基金的经验","反映基金经理从业年限和管理基金的经验","反映基金经理从业年限和管理基金的经验","反映基金经理从业年限和管理基金的经验","反映基金经理从业年限和管理基金的经验"],"data":[90.2,41.3,60.5,35.0,65.1],"jzrq":"2026-01-09"},"profit":{"categories":["任期收益","同类平均","沪深300"],"series":[{"data":[{"name":null,"color":"#7cb5ec","y":85.5},{"name":null,"color":"#414c7b","y":40.2},{"name":null,"color":"#4e7fbb","y":12.7}]}],"jzrq":"2026-01-09"}},{"id":"30189741","pic":"","name":"赵六","star":3,"workTime":"2年又100天","fundSize":"10.00亿(1只基金)","power":{"avr":"暂无数据","categories":[],"dsc":[],"data":[],"jzrq":"2026-01-09"},"profit":{"categories":[],"series":[],"jzrq":"2026-01-09"}}] ;/*申购赎回*/var Data_buySedemption = {"series":[{"name":"期间申购","data":[1.2,0.8]},{"name":"期间赎回","data":[0.9,1.1]}],"categories":["2025-06-30","2025-09-30"]};/*同类型基金涨幅榜（页面底部通栏）*/var swithSameType = [["110011_易方达优质精选混合(QDII)_12.3","000001_华夏成长混合_1.2"]];
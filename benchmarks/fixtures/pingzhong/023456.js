@@ -0,0 +1 @@
+/*2026-01-09 15:30:02*/var ishb=false;/*基金或股票信息*/var fS_name = "某某科技创新混合发起A";var fS_code = "023456";/*原费率*/var fund_sourceRate="1.50";/*现费率*/var fund_Rate="0.15";/*最小申购金额*/var fund_minsg="10";/*基金持仓股票代码*/var stockCodes=["6005191","3007501","0008581"];/*基金持仓债券代码*/var zqCodes = "";/*基金持仓股票代码(新市场号)*/var stockCodesNew =["1.600519","0.300750","0.000858"];/*基金持仓债券代码（新市场号）*/var zqCodesNew = "";/*收益率*//*近一年收益率*/var syl_1n="";/*近6月收益率*/var syl_6y="";/*近三月收益率*/var syl_3y="";/*近一月收益率*/var syl_1y="";/*单位净值走势 equityReturn-净值回报 unitMoney-每份派送金*/var Data_netWorthTrend = [];/*累计净值走势*/var Data_ACWorthTrend = [];/*现任基金经理*/var Data_currentFundManager =[{"id":"30040164","pic":"https://pdf.dfcfw.com/pdf/H8_PNG30040164_1.jpg","name":"王五","star":4,"workTime":"11年又32天","fundSize":"88.21亿(5只基金)","power":{"avr":"58.42","categories":["经验值","收益率","抗风险","稳定性","择时能力"],"dsc":["反映基金经理从业年限和管理基金的经验","反映基金经理从业年限和管理基金的经验","反映基金经理从业年限和管理基金的经验","反映基金经理从业年限和管理基金的经验","反映基金经理从业年限和管理基金的经验"],"data":[90.2,41.3,60.5,35.0,65.1],"jzrq":"2026-01-09"},"profit":{"categories":["任期收益","同类平均","沪深300"],"series":[{"data":[{"name":null,"color":"#7cb5ec","y":85.5},{"name":null,"color":"#414c7b","y":40.2},{"name":null,"color":"#4e7fbb","y":12.7}]}],"jzrq":"2026-01-09"}},{"id":"30189741","pic":"","name":"赵六","star":3,"workTime":"2年又100天","fundSize":"10.00亿(1只基金)","power":{"avr":"暂无数据","categories":[],"dsc":[],"data":[],"jzrq":"2026-01-09"},"profit":{"categories":[],"series":[],"jzrq":"2026-01-09"}}] ;/*申购赎回*/var Data_buySedemption = {"series":[{"name":"期间申购","data":[1.2,0.8]},{"name":"期间赎回","data":[0.9,1.1]}],"categories":["2025-06-30","2025-09-30"]};/*同类型基金涨幅榜（页面底部通栏）*/var swithSameType = [["110011_易方达优质精选混合(QDII)_12.3","000001_华夏成长混合_1.2"]];
@@ -0,0 +1 @@
+/*2026-01-09 15:30:02*/var ishb=false;/*基金或股票信息*/var fS_name = "格式样本拆分混合C";var fS_code = "900001";/*原费率*/var fund_sourceRate="0.00";/*现费率*/var fund_Rate="0.00";/*最小申购金额*/var fund_minsg="10";/*基金持仓股票代码*/var stockCodes=[];/*基金持仓债券代码*/var zqCodes = "";/*基金持仓股票代码(新市场号)*/var stockCodesNew =[];/*基金持仓债券代码（新市场号）*/var zqCodesNew = "";/*收益率*//*近一年收益率*/var syl_1n="3.02";/*近6月收益率*/var syl_6y="1.10";/*近三月收益率*/var syl_3y="0.52";/*近一月收益率*/var syl_1y="-0.21";/*单位净值走势 equityReturn-净值回报 unitMoney-每份派送金*/var Data_netWorthTrend = [{"x":1767110400000,"y":1.0213,"equityReturn":0,"unitMoney":""},{"x":1767542400000,"y":1.0254,"equityReturn":0.4,"unitMoney":""},{"x":1767628800000,"y":1.0198,"equityReturn":-0.55,"unitMoney":"拆分：每份基金份额折算1.0213份（公告原文：var splitRatio = 1.0213）"},{"x":1767715200000,"y":1.0301,"equityReturn":1.01,"unitMoney":""},{"x":1767801600000,"y":1.0312,"equityReturn":0.11,"unitMoney":""},{"x":1767888000000,"y":1.0287,"equityReturn":-0.24,"unitMoney":""}];/*累计净值走势*/var Data_ACWorthTrend = [[1767110400000,1.0213],[1767542400000,1.0254],[1767628800000,1.0198],[1767715200000,1.0301],[1767801600000,1.0312],[1767888000000,1.0287]];/*Performance Evaluation*/var Data_performanceEvaluation = {"avr":"63.50","categories":["选证能力","收益率","抗风险","稳定性","择时能力"],"data":[70.0,55.0,65.0,60.0,68.0],"dsc":["反映基金挑选证券而实现风险调整后获得超额收益的能力","根据阶段收益评分，反映基金的盈利能力","反映基金投资收益的回撤情况","反映基金投资收益的波动性","反映基金根据对市场走势的判断，通过调整仓位及配置而跑赢基金业绩基准的能力"]};/*现任基金经理*/var Data_currentFundManager =[{"id":"30012345","pic":"","name":"孙七","star":3,"workTime":"5年又12天","fundSize":"3.10亿(2只基金)","power":{"avr":"61.00","categories":["经验值","收益率","抗风险","稳定性","择时能力"],"dsc":["反映基金经理从业年限和管理基金的经验","根据基金经理投资的阶段收益评分，反映基金经理投资的盈利能力","反映基金经理投资的回撤控制能力","反映基金经理投资收益的波动","反映基金经理根据对股市的判断，通过调整仓位及配置而跑赢业绩基准的能力"],"data":[60.0,58.0,66.0,62.0,59.0],"jzrq":"2026-01-09"},"profit":{"categories":["任期收益","同类平均","沪深300"],"series":[{"data":[{"name":null,"color":"#7cb5ec","y":20.1},{"name":null,"color":"#414c7b","y":15.3},{"name":null,"color":"#4e7fbb","y":9.8}]}],"jzrq":"2026-01-09"}}] ;/*申购赎回*/var Data_buySedemption = {"series":[],"categories":[]};
\ No newline at end of file
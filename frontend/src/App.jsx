@@ -17,7 +17,7 @@ import Login from './pages/Login';
 import UserManagement from './pages/UserManagement';
 import { SubscribeModal } from './components/SubscribeModal';
 import { AccountModal } from './components/AccountModal';
-import { searchFunds, getFundDetail, getAccountPositions, subscribeFund, getAccounts, getPreferences, updatePreferences } from './services/api';
+import { searchFunds, getFundDetail, getFundQuotes, getAccountPositions, subscribeFund, getAccounts, getPreferences, updatePreferences } from './services/api';
 import { useAuth } from './contexts/AuthContext';
 import packageJson from '../../package.json';
 
@@ -231,22 +231,21 @@ function AppContent({ currentUser, isMultiUserMode, isAdmin, logout }) {
   
   // --- Data Fetching ---
   
-  // Polling for updates
+  // Polling for updates: one lightweight batch quote request per tick
+  // (heavy detail is only fetched when a fund page is opened)
+  const watchlistKey = watchlist.map(f => f.id).join(',');
+
   useEffect(() => {
-    if (watchlist.length === 0) return;
+    if (!watchlistKey) return;
 
     const tick = async () => {
         try {
-            const updatedList = await Promise.all(watchlist.map(async (fund) => {
-                try {
-                    const detail = await getFundDetail(fund.id);
-                    return { ...fund, ...detail };
-                } catch (e) {
-                    console.error(e);
-                    return fund;
-                }
+            const quotes = await getFundQuotes(watchlistKey.split(','));
+            const quoteMap = new Map(quotes.map(q => [q.id, q]));
+            setWatchlist(prev => prev.map(fund => {
+                const quote = quoteMap.get(fund.id);
+                return quote ? { ...fund, ...quote } : fund;
             }));
-            setWatchlist(updatedList); 
         } catch (e) {
              console.error("Polling error", e);
         }
@@ -254,7 +253,7 @@ function AppContent({ currentUser, isMultiUserMode, isAdmin, logout }) {
 
     const interval = setInterval(tick, 15000);
     return () => clearInterval(interval);
-  }, [watchlist]); 
+  }, [watchlistKey]);
 
 
   // --- Handlers ---
@@ -373,6 +372,10 @@ function AppContent({ currentUser, isMultiUserMode, isAdmin, logout }) {
       }
     } else {
       setDetailFundId(fundId);
+      // 打开详情页时刷新重量级详情（持仓、指标等），轮询只更新估值
+      getFundDetail(fundId)
+        .then(detail => setWatchlist(prev => prev.map(f => f.id === fundId ? { ...f, ...detail } : f)))
+        .catch(e => console.error(e));
     }
 
     setCurrentView('detail');
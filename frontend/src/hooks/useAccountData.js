@@ -1,9 +1,10 @@
 import { useState, useEffect, useCallback } from 'react';
-import { getAccountPositions } from '../services/api';
+import { getAccountPositions, getValuationStreamUrl } from '../services/api';
+import { applyValuationDelta } from '../utils/positions';
 
 /**
  * 账户数据管理 Hook
- * 负责数据获取、轮询、重试、错误处理
+ * 负责数据获取、实时推送（SSE，必要时退回轮询）、重试、错误处理
  *
  * @param {number} currentAccount - 当前账户 ID
  * @param {boolean} isActive - 是否激活轮询
@@ -57,16 +58,50 @@ export function useAccountData(currentAccount, isActive = true) {
     fetchData();
   }, [currentAccount, fetchData]);
 
-  // 轮询机制：每 15 秒自动刷新数据
+  // 实时推送：订阅持仓基金的估值变化（SSE），推送的估值直接合并进持仓数据
+  // （公式同后端 value_positions），不再每次变化都重新请求整个持仓列表。
+  // 服务端所有连接共享同一个上游轮询，不再每个看板各自轮询
+  const codesKey = (data.positions || []).map(p => p.code).sort().join(',');
+
   useEffect(() => {
     if (!isActive) return;
 
-    const interval = setInterval(() => {
-      silentRefresh();
-    }, 15000);
+    let interval = null;
+    let source = null;
+
+    // 轮询兜底：每 15 秒静默刷新
+    const startPolling = () => {
+      if (!interval) interval = setInterval(silentRefresh, 15000);
+    };
+
+    // 不支持 EventSource 或暂无持仓时直接轮询
+    if (typeof EventSource === 'undefined' || !codesKey) {
+      startPolling();
+    } else {
+      source = new EventSource(getValuationStreamUrl(codesKey), { withCredentials: true });
+      source.addEventListener('valuation', (event) => {
+        try {
+          const delta = JSON.parse(event.data);
+          setData(prev => applyValuationDelta(prev, delta));
+        } catch (e) {
+          console.error('Invalid valuation event:', e);
+        }
+      });
+      // 推送连接出错（后端不可用、代理不支持 SSE 等）时关闭连接，退回轮询；
+      // 持仓列表变化或重新激活时会再次尝试 SSE
+      source.onerror = () => {
+        console.warn('Valuation stream failed, falling back to polling');
+        source.close();
+        silentRefresh();
+        startPolling();
+      };
+    }
 
-    return () => clearInterval(interval);
-  }, [isActive, silentRefresh]);
+    return () => {
+      if (source) source.close();
+      if (interval) clearInterval(interval);
+    };
+  }, [isActive, codesKey, silentRefresh]);
 
   return {
     data,
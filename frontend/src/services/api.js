@@ -27,6 +27,11 @@ export const getFundDetail = async (fundId) => {
   }
 };
 
+export const getFundQuotes = async (codes) => {
+    const response = await api.get('/funds/quotes', { params: { codes: codes.join(',') } });
+    return response.data.quotes || [];
+};
+
 export const getFundHistory = async (fundId, limit = 30, accountId = null) => {
     try {
         const params = { limit };
@@ -78,6 +83,10 @@ export const deleteAccount = async (accountId) => {
     return api.delete(`/accounts/${accountId}`);
 };
 
+// 估值实时推送（SSE）地址；EventSource 不经过 axios，单独拼接 API_BASE_URL
+export const getValuationStreamUrl = (codes) =>
+    `${API_BASE_URL}/stream/valuations?codes=${encodeURIComponent(codes)}`;
+
 // Position management
 export const getAccountPositions = async (accountId) => {
     try {
@@ -0,0 +1,110 @@
+/**
+ * 持仓估值工具函数
+ * 与后端 services/portfolio.py 的 value_positions 使用相同公式，
+ * 用于把 SSE 推送的估值变化直接合并进已有持仓数据，无需重新请求整个持仓列表
+ */
+
+import { formatDateYMD } from './date';
+
+// 估算涨跌幅超过该值时视为异常（ETF / 联接基金除外），同 MAX_VALID_EST_RATE
+const MAX_VALID_EST_RATE = 10.0;
+
+// 持仓字段同 np.round（x * 100 后四舍六入五成双）
+const round2 = (x) => {
+  const y = x * 100;
+  const r = Math.round(y);
+  return (r - y === 0.5 && r % 2 !== 0 ? r - 1 : r) / 100;
+};
+
+// 合计字段同 Python round（按浮点数的精确十进制值舍入）
+const roundTotal = (x) => Number(x.toFixed(2));
+
+const toNumber = (value) => {
+  const n = Number(value);
+  return Number.isFinite(n) ? n : 0;
+};
+
+/**
+ * 用一条估值重新计算单个持仓的市值和收益字段
+ * @param {Object} position - 持仓（/account/positions 返回的一项）
+ * @param {Object} valuation - 估值（SSE valuation 事件中的一项）
+ * @param {string} today - 今天 (YYYY-MM-DD)
+ * @returns {Object} 新的持仓对象
+ */
+function revaluePosition(position, valuation, today) {
+  const { shares, cost } = position;
+  const name = valuation.name || position.name;
+  const nav = toNumber(valuation.nav);
+  const estimate = toNumber(valuation.estimate);
+  const estRate = toNumber(valuation.est_rate ?? valuation.estRate);
+  const volatileOk = name.includes('ETF') || name.includes('联接');
+
+  const isEstValid = estimate > 0 && nav > 0 && (Math.abs(estRate) < MAX_VALID_EST_RATE || volatileOk);
+
+  const navMarketValue = nav * shares;
+  const costBasis = cost * shares;
+  const accumulatedIncome = navMarketValue - costBasis;
+  const dayIncome = isEstValid ? (estimate - nav) * shares : 0;
+  const estMarketValue = isEstValid ? estimate * shares : navMarketValue;
+  const totalIncome = accumulatedIncome + dayIncome;
+  const navDate = valuation.navDate || position.nav_date;
+
+  return {
+    ...position,
+    name,
+    nav,
+    nav_date: navDate,
+    // 新净值日期即为今天时视为当日净值已更新（其余情况沿用服务端判断）
+    nav_updated_today: navDate !== position.nav_date ? navDate === today : position.nav_updated_today,
+    estimate,
+    est_rate: estRate,
+    is_est_valid: isEstValid,
+    cost_basis: round2(costBasis),
+    nav_market_value: round2(navMarketValue),
+    est_market_value: round2(estMarketValue),
+    accumulated_income: round2(accumulatedIncome),
+    accumulated_return_rate: round2(costBasis > 0 ? accumulatedIncome / costBasis * 100 : 0),
+    day_income: round2(dayIncome),
+    total_income: round2(totalIncome),
+    total_return_rate: round2(costBasis > 0 ? totalIncome / costBasis * 100 : 0),
+    update_time: valuation.time || position.update_time,
+  };
+}
+
+/**
+ * 把估值变化（{code: valuation}）合并进持仓数据，重新计算合计并按估算市值排序
+ * @param {Object} data - { summary, positions }
+ * @param {Object} delta - SSE valuation 事件数据
+ * @returns {Object} 新的 { summary, positions }；没有相关持仓时返回原对象
+ */
+export function applyValuationDelta(data, delta) {
+  const positions = data.positions || [];
+  if (!positions.some(p => delta[p.code])) return data;
+
+  const today = formatDateYMD(new Date());
+  const revalued = positions.map(p => (delta[p.code] ? revaluePosition(p, delta[p.code], today) : p));
+
+  let totalMarketValue = 0;
+  let totalCost = 0;
+  let totalDayIncome = 0;
+  // 合计用未四舍五入的值（与服务端一致），由各持仓的净值 / 估值 / 份额重新算出
+  for (const p of revalued) {
+    totalMarketValue += (p.is_est_valid ? p.estimate : p.nav) * p.shares;
+    totalCost += p.cost * p.shares;
+    totalDayIncome += p.is_est_valid ? (p.estimate - p.nav) * p.shares : 0;
+  }
+  const totalIncome = totalMarketValue - totalCost;
+
+  return {
+    ...data,
+    summary: {
+      ...data.summary,
+      total_market_value: roundTotal(totalMarketValue),
+      total_cost: roundTotal(totalCost),
+      total_day_income: roundTotal(totalDayIncome),
+      total_income: roundTotal(totalIncome),
+      total_return_rate: roundTotal(totalCost > 0 ? totalIncome / totalCost * 100 : 0),
+    },
+    positions: revalued.sort((a, b) => b.est_market_value - a.est_market_value),
+  };
+}